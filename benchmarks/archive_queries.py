@@ -0,0 +1,148 @@
+"""
+Query latency of the proposal archive (src/archive.py) at a realistic history size.
+
+Fills a fresh SQLite archive with generated proposals (prose bodies, a few hundred spaces and proposers, a mix of
+states) and votes, then times the queries behind "show my proposals" and the archive API: listings by space,
+proposer, state and end time (first pages and pages deep into the history via keyset cursors), votes by voter and
+full-text searches for rare and common words. Reports p50/p95/p99 latency per query as JSON.
+
+Usage:
+  python -m benchmarks.archive_queries --proposals 300000 --votes 100000 --output archive_queries.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.proposal_memory import WORDS, random_body
+from src.archive import Archive
+from src.proposal_model import Proposal
+
+STATES = ("closed",) * 8 + ("active", "pending")
+
+
+def generate(count, spaces, proposers, body_chars, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield Proposal.from_snapshot({
+            "id": f"0x{i:064x}", "title": f"{random_body(rng, 50)} ref{i}",
+            "body": random_body(rng, body_chars), "choices": ["For", "Against", "Abstain"],
+            "start": 1600000000 + i * 300, "end": 1600600000 + i * 300, "state": rng.choice(STATES),
+            "author": f"0x{rng.randrange(proposers):040x}", "space": f"space{rng.randrange(spaces)}.eth",
+        })
+
+
+def percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+
+    def pick(fraction):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 3)
+
+    return {"p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99),
+            "mean_ms": round(statistics.mean(ordered), 3), "samples": len(ordered)}
+
+
+def timed(samples, query):
+    started = time.perf_counter()
+    result = query()
+    samples.append((time.perf_counter() - started) * 1000)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proposals", type=int, default=300000, help="Proposals to archive")
+    parser.add_argument("--votes", type=int, default=100000, help="Votes to archive")
+    parser.add_argument("--spaces", type=int, default=200, help="Distinct DAO spaces")
+    parser.add_argument("--proposers", type=int, default=500, help="Distinct proposer addresses")
+    parser.add_argument("--voters", type=int, default=50, help="Distinct voter addresses")
+    parser.add_argument("--body-chars", type=int, default=1000, help="Body length of each proposal")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed runs per query")
+    parser.add_argument("--db", help="Archive file to create (default: a temporary file)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="archive-bench-"), "archive.db")
+    archive = Archive(path)
+    rng = random.Random(1)
+
+    started = time.perf_counter()
+    batch = []
+    for proposal in generate(args.proposals, args.spaces, args.proposers, args.body_chars):
+        batch.append(proposal)
+        if len(batch) == 5000:
+            archive.record_proposals(batch)
+            batch = []
+    archive.record_proposals(batch)
+    for _ in range(args.votes):
+        archive.record_vote(f"0x{rng.randrange(args.proposals):064x}", f"0x{rng.randrange(args.voters):040x}",
+                            rng.choice(("yes", "no")), tx_hash=f"0x{rng.getrandbits(256):064x}", source="snapshot")
+    load_seconds = time.perf_counter() - started
+    archive._connection().execute("ANALYZE")
+
+    def space():
+        return f"space{rng.randrange(args.spaces)}.eth"
+
+    def proposer():
+        return f"0x{rng.randrange(args.proposers):040x}"
+
+    def voter():
+        return f"0x{rng.randrange(args.voters):040x}"
+
+    def deep_pages(pages, **filters):
+        """
+        Time each page of a listing walked `pages` deep with the cursor.
+        """
+        samples = []
+        cursor = None
+        for _ in range(pages):
+            rows, cursor = timed(samples, lambda: archive.list_proposals(cursor=cursor, **filters))
+            if cursor is None:
+                break
+        return samples
+
+    queries = {
+        "by_space": lambda: archive.list_proposals(space=space()),
+        "by_proposer": lambda: archive.list_proposals(proposer=proposer()),
+        "by_state_active": lambda: archive.list_proposals(state="active"),
+        "ending_after": lambda: archive.list_proposals(ends_after=1600600000 + rng.randrange(args.proposals) * 300),
+        "votes_by_voter": lambda: archive.list_votes(voter()),
+        "search_rare": lambda: archive.search(f"ref{rng.randrange(args.proposals)}"),
+        "search_common": lambda: archive.search(rng.choice(WORDS)),
+        "search_two_words": lambda: archive.search(f"{rng.choice(WORDS)} {rng.choice(WORDS)}"),
+    }
+    results = {}
+    for name, query in queries.items():
+        samples = []
+        for _ in range(args.repeat):
+            timed(samples, query)
+        results[name] = percentiles(samples)
+
+    deep = []
+    for _ in range(max(1, args.repeat // 50)):
+        deep.extend(deep_pages(50, state="closed"))
+    results["by_state_closed_50_pages"] = percentiles(deep)
+
+    report = {
+        "benchmark": "archive_queries",
+        "proposals": args.proposals,
+        "votes": args.votes,
+        "body_chars": args.body_chars,
+        "load_seconds": round(load_seconds, 1),
+        "db_mb": round(sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+                       / 2 ** 20, 1),
+        "queries": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Load test comparing the ASGI serving mode (src/asgi.py under uvicorn workers) with the current Flask app under
+gunicorn's default sync workers and under gunicorn gthread workers, with simulated upstream latency.
+
+All servers run the same number of worker processes against a local Ethereum RPC stand-in that sleeps for
+`--latency` seconds per call. The `/openai_query` "wallet balance" path is used because it is pure upstream I/O
+(connect + eth_getBalance), so the comparison isolates how many requests a process can keep in flight. The balance
+cache is off (BALANCE_CACHE_TTL=0), so every request makes the RPC calls.
+
+No route handler is async: the ASGI mode runs the Flask handlers on a pool of ASGI_THREADS threads per process. The
+gthread configuration gets the same number of threads (--threads), so it shows how much of the ASGI mode's gain
+comes from the thread count alone rather than from the async server.
+
+Usage:
+  python -m benchmarks.asgi_vs_wsgi --latency 0.2 --concurrency 64 --duration 20 --output asgi_vs_wsgi.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.loadgen import free_port, gunicorn_command, run_load, start_server, stop_server
+from benchmarks.standins import FakeRPC
+
+WALLET_ADDRESS = "0x000000000000000000000000000000000000dEaD"
+
+
+def benchmark_server(name, command, port, env, mix, args):
+    process = start_server(command, port, env)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        # Warm up connections and lazy initialization before measuring
+        run_load(base_url, mix, concurrency=min(4, args.concurrency), duration=1.0)
+        time.sleep(0.5)
+        result = run_load(base_url, mix, concurrency=args.concurrency, duration=args.duration)
+        result["server"] = name
+        return result
+    finally:
+        stop_server(process)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated upstream latency per RPC call (s)")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent client connections")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds per server")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes for every server")
+    parser.add_argument("--asgi-threads", type=int, default=100,
+                        help="ASGI_THREADS per ASGI worker, and threads per gthread worker")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="dao-agent-asgi-")
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    env.update({
+        "ASGI_THREADS": str(args.asgi_threads),
+        "LOG_FILE": os.path.join(work_dir, "dao_voting_agent.log"),
+        # Cached balances would answer without the RPC call this benchmark is about
+        "SHARED_CACHE_PATH": os.path.join(work_dir, "shared_cache"),
+        "BALANCE_CACHE_TTL": "0",
+    })
+
+    with FakeRPC(latency=args.latency) as rpc:
+        mix = [(1, "/openai_query", {"query": "wallet balance", "infura_url": rpc.url,
+                                     "wallet_address": WALLET_ADDRESS})]
+        results = []
+        for name, app_path, worker_class, threads in [
+                ("flask-gunicorn-sync", "src.app:app", None, 1),
+                ("flask-gunicorn-gthread", "src.app:app", "gthread", args.asgi_threads),
+                ("asgi-uvicorn", "src.asgi:app", "uvicorn.workers.UvicornWorker", 1)]:
+            port = free_port()
+            command = gunicorn_command(app_path, port, workers=args.workers, threads=threads, worker_class=worker_class)
+            results.append(benchmark_server(name, command, port, env, mix, args))
+
+        report = {
+            "benchmark": "asgi_vs_wsgi",
+            "upstream_latency_s": args.latency,
+            "workers": args.workers,
+            "threads": args.asgi_threads,
+            "concurrency": args.concurrency,
+            "results": results,
+            "upstream_calls": dict(rpc.calls),
+        }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
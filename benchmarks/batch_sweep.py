@@ -0,0 +1,107 @@
+"""
+Throughput of the batch runner (src/batch.py) for a sweep across many DAOs.
+
+Generates a manifest of DAOs against the local stand-ins (half Snapshot spaces, half on-chain governors with an
+unlocked wallet) and runs the full sweep (fetch, analyze and, with --vote, vote) for each worker count. Reports jobs
+per minute, wall time and CPU utilization of the worker processes, and checks that a second run over the same
+checkpoint skips every job.
+
+Usage:
+  python -m benchmarks.batch_sweep --daos 200 --workers 1,4,16 --llm-latency 0.5 --vote --output batch_sweep.json
+"""
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+
+from benchmarks.standins import ChainStandin, FakeLLM, FakeSnapshot
+
+
+def manifest(daos, chain, wallets):
+    entries = []
+    for i in range(daos):
+        if i % 2:
+            entries.append({"id": f"governor{i}", "abi": chain.governor_abi, "contract_address": chain.governor_address,
+                            "infura_url": chain.url, "wallet_address": wallets[i % len(wallets)]})
+        else:
+            entries.append({"id": f"space{i}", "space": f"space{i}.eth"})
+    return entries
+
+
+def children_cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--daos", type=int, default=200, help="DAOs in the manifest")
+    parser.add_argument("--workers", default="1,4,16", help="Comma-separated worker counts to compare")
+    parser.add_argument("--proposals", type=int, default=3, help="Proposals per DAO")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Added latency per completion (s)")
+    parser.add_argument("--snapshot-latency", type=float, default=0.05, help="Added latency per GraphQL call (s)")
+    parser.add_argument("--vote", action="store_true", help="Vote on the proposals as analyzed")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    chain = ChainStandin(proposal_count=args.proposals).start()
+    snapshot = FakeSnapshot(latency=args.snapshot_latency, proposal_count=args.proposals).start()
+    llm = FakeLLM(latency=args.llm_latency).start()
+
+    work_dir = tempfile.mkdtemp(prefix="dao-agent-batch-")
+    os.environ.update({
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-benchmark"),
+        "OPENAI_API_BASE": f"{llm.url}/v1",
+        "SNAPSHOT_GRAPHQL_URL": f"{snapshot.url}/graphql",
+        "LOG_FILE": os.path.join(work_dir, "dao_voting_agent.log"),
+        "ARCHIVE_DB": os.path.join(work_dir, "dao_archive.db"),
+        "SHARED_CACHE_PATH": os.path.join(work_dir, "shared_cache"),
+        # Every stand-in space serves the same proposals; analyze each DAO instead of reusing the first analysis
+        "SIMILARITY_REUSE_THRESHOLD": "1.1",
+    })
+    from src.batch import build_jobs, run_batch
+
+    jobs = build_jobs(manifest(args.daos, chain, chain.accounts[1:]))
+    runs = {}
+    try:
+        for workers in (int(value) for value in args.workers.split(",")):
+            checkpoint = os.path.join(work_dir, f"checkpoint-{workers}.jsonl")
+            cpu_before = children_cpu_seconds()
+            started = time.perf_counter()
+            summary = run_batch(jobs, workers, checkpoint, vote=args.vote)
+            wall = time.perf_counter() - started
+            resumed = run_batch(jobs, workers, checkpoint, vote=args.vote)
+            runs[str(workers)] = {
+                "jobs_per_minute": summary["jobs_per_minute"],
+                "wall_seconds": summary["wall_seconds"],
+                "succeeded": summary["succeeded"],
+                "failed": summary["failed"],
+                "proposals": summary["proposals"],
+                "votes_cast": summary["votes_cast"],
+                "vote_errors": summary["vote_errors"],
+                "cpu_utilization": round((children_cpu_seconds() - cpu_before) / (wall * os.cpu_count()), 3),
+                "resumed_run_skipped": resumed["skipped_from_checkpoint"],
+            }
+    finally:
+        for standin in (chain, snapshot, llm):
+            standin.stop()
+
+    report = {
+        "benchmark": "batch_sweep",
+        "daos": args.daos,
+        "cpus": os.cpu_count(),
+        "llm_latency_s": args.llm_latency,
+        "vote": args.vote,
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+HTTP load-test harness and capacity report for the Flask routes.
+
+Starts local stand-ins for the chain, Snapshot and the LLM, then, for every server configuration, runs the real app
+(benchmarks/capacity_app.py) under gunicorn and replays a weighted mix of /analyze_proposal, /openai_query and
+/user_query at increasing concurrency. For each configuration the report gives the latency curve (throughput,
+p50/p95/p99 and error rate per concurrency level), the saturation point and the highest throughput that still
+meets the p99 and error-rate objectives, so worker/thread settings can be chosen from data.
+The caches (balances, Snapshot proposals, LLM analyses and reused similar analyses) are off, so every request
+reaches the stand-ins.
+
+Server configurations are written as KIND:WORKERSxTHREADS, where KIND is "sync", "gthread" or "uvicorn" (the ASGI
+mode, where THREADS is ASGI_THREADS).
+
+Usage:
+  python -m benchmarks.capacity --configs sync:2x1,gthread:2x8,gthread:4x16,uvicorn:2x100 \\
+      --concurrency 1,4,16,64 --mix /openai_query=3,/user_query=1,/analyze_proposal=1 \\
+      --duration 15 --output capacity.json --markdown capacity.md
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.loadgen import free_port, gunicorn_command, run_load, start_server, stop_server
+from benchmarks.standins import ChainStandin, FakeLLM, FakeSnapshot
+
+SPACE = "standin.eth"
+
+
+def parse_config(spec):
+    """
+    Parse KIND:WORKERSxTHREADS (e.g. "gthread:4x16") into a dict.
+    """
+    kind, _, size = spec.partition(":")
+    workers, _, threads = size.partition("x")
+    if kind not in ("sync", "gthread", "uvicorn"):
+        raise ValueError(f"Unknown server kind in {spec!r}; expected sync, gthread or uvicorn")
+    return {"name": spec, "kind": kind, "workers": int(workers or 1), "threads": int(threads or 1)}
+
+
+def parse_mix(spec):
+    """
+    Parse "/route=weight,..." into a list of (weight, route) pairs.
+    """
+    mix = []
+    for item in spec.split(","):
+        route, _, weight = item.partition("=")
+        mix.append((float(weight or 1), route.strip()))
+    return mix
+
+
+def route_forms(chain, wallet_address):
+    """
+    Form payloads for each route, pointing at the stand-ins.
+    """
+    proposal = {"id": f"0x{1:064x}", "title": "Standin proposal 1", "body": "Fund work item 1.",
+                "choices": ["For", "Against", "Abstain"]}
+    return {
+        "/analyze_proposal": {"proposal": json.dumps(proposal), "wallet_address": wallet_address,
+                              "contract_address": chain.governor_address, "abi": json.dumps(chain.governor_abi),
+                              "infura_url": chain.url},
+        "/openai_query": {"query": "what is my wallet balance", "infura_url": chain.url,
+                          "wallet_address": wallet_address},
+        "/user_query": {"query": "show every proposal"},
+    }
+
+
+def server_command(config, port):
+    if config["kind"] == "uvicorn":
+        return gunicorn_command("benchmarks.capacity_app:asgi_app", port, workers=config["workers"],
+                                worker_class="uvicorn.workers.UvicornWorker")
+    if config["kind"] == "gthread":
+        return gunicorn_command("benchmarks.capacity_app:app", port, workers=config["workers"],
+                                threads=max(2, config["threads"]))
+    return gunicorn_command("benchmarks.capacity_app:app", port, workers=config["workers"])
+
+
+def analyze_curve(curve, p99_slo_ms, max_error_rate, gain_threshold=0.1):
+    """
+    Find the saturation point and the best throughput that meets the objectives on a latency curve.
+
+    The saturation point is the first concurrency level where raising concurrency improved throughput by less
+    than `gain_threshold`, or where the p99 or error-rate objective was first violated.
+    """
+    saturation = None
+    best = None
+    for previous, point in zip([None] + curve[:-1], curve):
+        meets_slo = point["error_rate"] <= max_error_rate and (point["p99_ms"] or 0) <= p99_slo_ms
+        if meets_slo and (best is None or point["rps"] > best["rps"]):
+            best = point
+        if saturation is None:
+            if not meets_slo:
+                saturation = previous or point
+            elif previous is not None and point["rps"] < previous["rps"] * (1 + gain_threshold):
+                saturation = previous
+    return {
+        "saturation_concurrency": saturation["concurrency"] if saturation else None,
+        "saturation_rps": saturation["rps"] if saturation else None,
+        "max_rps_within_slo": best["rps"] if best else 0.0,
+        "concurrency_at_max_rps_within_slo": best["concurrency"] if best else None,
+    }
+
+
+def markdown_report(report):
+    lines = ["# Capacity report", "",
+             f"Mix: {report['mix']}  ",
+             f"Objectives: p99 <= {report['p99_slo_ms']} ms, error rate <= {report['max_error_rate']}", "",
+             "| Config | Saturation (concurrency) | Saturation rps | Max rps within SLO |",
+             "|---|---|---|---|"]
+    for result in report["configs"]:
+        summary = result["summary"]
+        lines.append(f"| {result['config']} | {summary['saturation_concurrency']} | {summary['saturation_rps']} | "
+                     f"{summary['max_rps_within_slo']} |")
+    for result in report["configs"]:
+        lines += ["", f"## {result['config']}", "", "| Concurrency | rps | p50 ms | p95 ms | p99 ms | Error rate |",
+                  "|---|---|---|---|---|---|"]
+        for point in result["curve"]:
+            lines.append(f"| {point['concurrency']} | {point['rps']} | {point['p50_ms']} | {point['p95_ms']} | "
+                         f"{point['p99_ms']} | {point['error_rate']} |")
+    lines += ["", f"Recommended: {report['recommended_config']}"]
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", default="sync:2x1,gthread:2x8,uvicorn:2x100",
+                        help="Comma-separated server configurations (KIND:WORKERSxTHREADS)")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Comma-separated concurrency levels")
+    parser.add_argument("--mix", default="/openai_query=3,/user_query=1,/analyze_proposal=1",
+                        help="Comma-separated route=weight pairs")
+    parser.add_argument("--duration", type=float, default=15.0, help="Measured seconds per concurrency level")
+    parser.add_argument("--rpc-latency", type=float, default=0.02, help="Added latency per JSON-RPC call (s)")
+    parser.add_argument("--snapshot-latency", type=float, default=0.1, help="Added latency per GraphQL call (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Added latency per completion (s)")
+    parser.add_argument("--llm-rate-limit", type=int, default=0, help="Completions per second before HTTP 429")
+    parser.add_argument("--p99-slo-ms", type=float, default=5000.0, help="p99 latency objective (ms)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Error-rate objective")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--markdown", help="Write a Markdown summary to this file")
+    args = parser.parse_args()
+
+    configs = [parse_config(spec) for spec in args.configs.split(",")]
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    chain = ChainStandin(latency=args.rpc_latency).start()
+    snapshot = FakeSnapshot(latency=args.snapshot_latency).start()
+    llm = FakeLLM(latency=args.llm_latency, rate_limit=args.llm_rate_limit or None).start()
+    wallet_address = chain.accounts[0]
+    forms = route_forms(chain, wallet_address)
+    mix = [(weight, route, forms[route]) for weight, route in parse_mix(args.mix)]
+
+    work_dir = tempfile.mkdtemp(prefix="dao-agent-capacity-")
+    env = dict(os.environ)
+    env.update({
+        "LOG_FILE": os.path.join(work_dir, "dao_voting_agent.log"),
+        "ARCHIVE_DB": os.path.join(work_dir, "dao_archive.db"),
+        "SHARED_CACHE_PATH": os.path.join(work_dir, "shared_cache"),
+        # Measure the uncached paths: every request reaches the stand-ins
+        "BALANCE_CACHE_TTL": "0",
+        "SNAPSHOT_CACHE_TTL": "0",
+        "ANALYSIS_CACHE_TTL": "0",
+        "SIMILARITY_REUSE_THRESHOLD": "1.1",
+        "OPENAI_API_KEY": env.get("OPENAI_API_KEY", "sk-benchmark"),
+        "OPENAI_API_BASE": f"{llm.url}/v1",
+        "SNAPSHOT_GRAPHQL_URL": f"{snapshot.url}/graphql",
+        "BENCH_USER_INPUTS": json.dumps({"space": SPACE, "abi": None, "contract_address": None,
+                                         "infura_url": chain.url, "wallet_address": wallet_address}),
+    })
+
+    results = []
+    try:
+        for config in configs:
+            env["ASGI_THREADS"] = str(config["threads"])
+            port = free_port()
+            process = start_server(server_command(config, port), port, env)
+            curve = []
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                run_load(base_url, mix, concurrency=1, duration=1.0)
+                for level in levels:
+                    point = run_load(base_url, mix, concurrency=level, duration=args.duration)
+                    print(f"{config['name']} @ {level}: {point['rps']} rps, p99 {point['p99_ms']} ms, "
+                          f"errors {point['error_rate']}", file=sys.stderr)
+                    curve.append(point)
+                    time.sleep(1.0)
+            finally:
+                stop_server(process)
+            results.append({"config": config["name"], "server": config, "curve": curve,
+                            "summary": analyze_curve(curve, args.p99_slo_ms, args.max_error_rate)})
+    finally:
+        for standin in (chain, snapshot, llm):
+            standin.stop()
+
+    best = max(results, key=lambda result: result["summary"]["max_rps_within_slo"], default=None)
+    report = {
+        "benchmark": "capacity",
+        "mix": args.mix,
+        "upstream_latency_s": {"rpc": args.rpc_latency, "snapshot": args.snapshot_latency, "llm": args.llm_latency},
+        "p99_slo_ms": args.p99_slo_ms,
+        "max_error_rate": args.max_error_rate,
+        "configs": results,
+        "recommended_config": best["config"] if best else None,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    if args.markdown:
+        with open(args.markdown, "w") as f:
+            f.write(markdown_report(report))
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+The real API app, wired to the local stand-ins for load testing.
+
+The stand-in DAO configuration comes from the BENCH_USER_INPUTS environment variable (JSON), and interactive
+prompts reached from request paths are answered with "exit". Serve it with gunicorn as
+`benchmarks.capacity_app:app` (WSGI) or `benchmarks.capacity_app:asgi_app` (with uvicorn workers).
+"""
+import json
+import os
+import sys
+
+from benchmarks.standins import ScriptedStdin
+from src import web3_integration
+from src.app import app
+from src.asgi import app as asgi_app
+
+web3_integration.user_inputs_cache = json.loads(os.environ["BENCH_USER_INPUTS"])
+sys.stdin = ScriptedStdin()
+
+__all__ = ["app", "asgi_app"]
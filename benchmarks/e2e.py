@@ -0,0 +1,252 @@
+"""
+Hermetic end-to-end benchmark of the agent's entry points.
+
+Everything the agent talks to is replaced by a local stand-in (see benchmarks/standins.py):
+- an in-process EVM (eth-tester) served over JSON-RPC, with the sample governor deployed,
+- a Snapshot GraphQL hub returning generated active proposals,
+- an OpenAI-compatible chat/completions server with configurable latency and rate limit,
+- a Snapshot sequencer that checks signed votes.
+
+The real entry points run unmodified against them: fetch_active_proposals (on-chain and Snapshot),
+analyze_project_status, cast_vote (on-chain and Snapshot), on_user_query, handle_new_proposal and, when the theoriq
+SDK is installed, the Flask routes.
+Interactive prompts reached from these paths are answered with "exit".
+The caches (balances, Snapshot proposals, LLM analyses and reused similar analyses) are off, so every scenario
+measures the uncached path; see benchmarks/shared_cache.py for the caches themselves.
+
+Each scenario reports throughput, p50/p95/p99 latency, errors and upstream call counts as JSON. Pass a previous
+report with --baseline to add the relative change of each number.
+
+Usage:
+  python -m benchmarks.e2e --iterations 20 --llm-latency 0.3 --output e2e.json
+  python -m benchmarks.e2e --baseline e2e_main.json --output e2e.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.loadgen import summarize
+from benchmarks.standins import ChainStandin, FakeLLM, FakeSequencer, FakeSnapshot, ScriptedStdin
+
+SPACE = "standin.eth"
+
+
+def _snapshot_counts(standins):
+    return {standin.name: dict(standin.calls) for standin in standins}
+
+
+def _diff_counts(before, after):
+    diff = {}
+    for name, counts in after.items():
+        changed = {key: value - before[name].get(key, 0) for key, value in counts.items()
+                   if value - before[name].get(key, 0)}
+        diff[name] = dict(sorted(changed.items()))
+    return diff
+
+
+def run_scenario(name, func, iterations, concurrency, standins, warmup=1):
+    """
+    Run `func` `iterations` times (across `concurrency` threads) and summarize latency and upstream calls.
+    """
+    errors = []
+    error_lock = threading.Lock()
+
+    def call():
+        started = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            with error_lock:
+                errors.append(f"{type(e).__name__}: {e}")
+            return None
+        return time.perf_counter() - started
+
+    for _ in range(warmup):
+        call()
+    errors.clear()
+
+    before = _snapshot_counts(standins)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = [value for value in pool.map(lambda _: call(), range(iterations)) if value is not None]
+    elapsed = time.perf_counter() - started
+    after = _snapshot_counts(standins)
+
+    result = summarize(latencies, len(errors), elapsed)
+    result["throughput_ops"] = result.pop("rps")
+    result["upstream_calls"] = _diff_counts(before, after)
+    result["upstream_calls_per_op"] = {
+        standin: round(sum(counts.values()) / iterations, 2) for standin, counts in result["upstream_calls"].items()
+    }
+    if errors:
+        result["first_error"] = errors[0][:300]
+    print(f"{name}: {result['throughput_ops']} ops/s, p50 {result['p50_ms']} ms, errors {result['errors']}",
+          file=sys.stderr)
+    return result
+
+
+def build_scenarios(chain, wallet_address, voter_address):
+    """
+    Return (name, callable) pairs driving the real entry points, plus a dict of skipped scenarios.
+    """
+    from src import web3_integration
+    from src.analyze import analyze_project_status
+    from src.interaction import on_user_query
+    from src.proposals import fetch_active_proposals
+    from src.web3_integration import cast_vote, connect_to_web3
+
+    onchain_inputs = {"space": SPACE, "abi": chain.governor_abi, "contract_address": chain.governor_address,
+                      "infura_url": chain.url, "wallet_address": wallet_address}
+    snapshot_inputs = dict(onchain_inputs, abi=None, contract_address=None)
+
+    def with_inputs(user_inputs, func):
+        def run():
+            web3_integration.user_inputs_cache = user_inputs
+            return func()
+        return run
+
+    web3 = connect_to_web3(chain.url)
+    web3_integration.user_inputs_cache = snapshot_inputs
+    snapshot_proposals = fetch_active_proposals()
+    project_data = {key: snapshot_inputs[key] for key in ("infura_url", "contract_address", "abi", "wallet_address")}
+
+    scenarios = [
+        ("fetch_active_proposals.onchain", with_inputs(onchain_inputs, fetch_active_proposals)),
+        ("fetch_active_proposals.snapshot", with_inputs(snapshot_inputs, fetch_active_proposals)),
+        ("analyze_project_status", lambda: analyze_project_status(snapshot_proposals, project_data, 1)),
+        ("cast_vote", lambda: cast_vote(web3, voter_address, chain.governor_address, chain.governor_abi, 1, "yes")),
+        ("cast_vote.snapshot", lambda: cast_vote(web3, voter_address, None, None, snapshot_proposals[0].id, "yes",
+                                                 space=SPACE, choices=snapshot_proposals[0].choices)),
+        ("on_user_query.balance", with_inputs(onchain_inputs, lambda: on_user_query("what is my balance"))),
+        ("on_user_query.proposals", with_inputs(snapshot_inputs, lambda: on_user_query("show every proposal"))),
+    ]
+    skipped = {}
+
+    from src.main import handle_new_proposal
+
+    proposal = snapshot_proposals[0]
+    scenarios.append(("handle_new_proposal", with_inputs(snapshot_inputs, lambda: handle_new_proposal(
+        proposal, web3, wallet_address, chain.governor_address, chain.governor_abi))))
+
+    try:
+        from src.app import app
+    except ImportError as e:
+        for name in ("route./analyze_proposal", "route./openai_query", "route./user_query"):
+            skipped[name] = f"{type(e).__name__}: {e}"
+        return scenarios, skipped
+
+    client = app.test_client()
+
+    def post(path, form):
+        def run():
+            response = client.post(path, data=form)
+            if response.status_code >= 500:
+                raise RuntimeError(f"{path} returned {response.status_code}")
+        return run
+
+    scenarios += [
+        ("route./analyze_proposal", with_inputs(snapshot_inputs, post("/analyze_proposal", {
+            "proposal": json.dumps(proposal.to_dict()), "wallet_address": wallet_address,
+            "contract_address": chain.governor_address, "abi": json.dumps(chain.governor_abi),
+            "infura_url": chain.url}))),
+        ("route./openai_query", with_inputs(snapshot_inputs, post("/openai_query", {
+            "query": "what is my wallet balance", "infura_url": chain.url, "wallet_address": wallet_address}))),
+        ("route./user_query", with_inputs(snapshot_inputs, post("/user_query", {"query": "show every proposal"}))),
+    ]
+    return scenarios, skipped
+
+
+def compare(report, baseline):
+    """
+    Add the relative change (in percent) against a baseline report to each scenario.
+    """
+    for name, result in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        delta = {}
+        for key in ("throughput_ops", "p50_ms", "p95_ms", "p99_ms"):
+            if result.get(key) is not None and previous.get(key):
+                delta[key] = round((result[key] - previous[key]) / previous[key] * 100, 1)
+        result["delta_pct_vs_baseline"] = delta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20, help="Measured calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=1, help="Threads calling each entry point")
+    parser.add_argument("--proposals", type=int, default=5, help="Proposals on the governor and on Snapshot")
+    parser.add_argument("--rpc-latency", type=float, default=0.0, help="Added latency per JSON-RPC call (s)")
+    parser.add_argument("--snapshot-latency", type=float, default=0.05,
+                        help="Added latency per GraphQL call and vote submission (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Added latency per completion (s)")
+    parser.add_argument("--llm-rate-limit", type=int, default=0, help="Completions per second before HTTP 429")
+    parser.add_argument("--only", help="Comma-separated scenario names to run")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    chain = ChainStandin(latency=args.rpc_latency, proposal_count=args.proposals).start()
+    snapshot = FakeSnapshot(latency=args.snapshot_latency, proposal_count=args.proposals).start()
+    llm = FakeLLM(latency=args.llm_latency, rate_limit=args.llm_rate_limit or None).start()
+    sequencer = FakeSequencer(latency=args.snapshot_latency).start()
+    standins = [chain, snapshot, llm, sequencer]
+
+    work_dir = tempfile.mkdtemp(prefix="dao-agent-e2e-")
+    os.environ.update({
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-benchmark"),
+        "OPENAI_API_BASE": f"{llm.url}/v1",
+        "SNAPSHOT_GRAPHQL_URL": f"{snapshot.url}/graphql",
+        "LOG_FILE": os.path.join(work_dir, "dao_voting_agent.log"),
+        "ARCHIVE_DB": os.path.join(work_dir, "dao_archive.db"),
+        "SHARED_CACHE_PATH": os.path.join(work_dir, "shared_cache"),
+        # Measure the uncached paths: every request reaches the stand-ins
+        "BALANCE_CACHE_TTL": "0",
+        "SNAPSHOT_CACHE_TTL": "0",
+        "ANALYSIS_CACHE_TTL": "0",
+        "SIMILARITY_REUSE_THRESHOLD": "1.1",
+        "SNAPSHOT_SEQUENCER_URL": sequencer.url,
+        "SNAPSHOT_SIGNER_KEYS": ",".join(chain.account_keys[:2]),
+        # handle_new_proposal votes on the Snapshot proposal too, like a deployment that opted in
+        "SNAPSHOT_AUTO_VOTE": "true",
+    })
+
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            sys.stdin = ScriptedStdin()
+            scenarios, skipped = build_scenarios(chain, wallet_address=chain.accounts[0],
+                                                 voter_address=chain.accounts[1])
+            only = set(args.only.split(",")) if args.only else None
+            results = {}
+            for name, func in scenarios:
+                if only is None or name in only:
+                    results[name] = run_scenario(name, func, args.iterations, args.concurrency, standins)
+    finally:
+        for standin in standins:
+            standin.stop()
+
+    report = {
+        "benchmark": "e2e",
+        "config": {key: value for key, value in vars(args).items() if key not in ("baseline", "output")},
+        "scenarios": results,
+        "skipped": skipped,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Behaviour of the circuit breakers and retry budgets (src/resilience.py) during an upstream outage.
+
+Runs agent requests (fetch_active_proposals, get_wallet_balance and analyze_project_status for a Snapshot DAO)
+against the local stand-ins through three phases: healthy, an outage of one upstream (every call fails with an HTTP
+503, or hangs with --fault hang), and recovery after the faults are cleared. Each phase reports answered, degraded
+and failed requests, p50/p99 latency and upstream calls per request (the load the agent puts on the failing
+upstream), plus retries and fast failures. Recovery reports how long the breaker took to close again.
+
+The scenario runs once with the circuit breakers and once without (CIRCUIT_FAILURE_THRESHOLD=0), with the same
+retry budget.
+
+Usage:
+  python -m benchmarks.fault_injection --upstream llm --requests 60 --concurrency 4 --output fault_injection.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.loadgen import summarize
+from benchmarks.standins import ChainStandin, FakeLLM, FakeSnapshot
+
+# Breaker names of the upstreams, by stand-in
+UPSTREAMS = {"rpc": "chain", "snapshot": "snapshot", "llm": "llm"}
+
+
+def metric_total(metric, upstream):
+    return sum(sample.value for family in metric.collect() for sample in family.samples
+               if sample.name.endswith("_total") and sample.labels["upstream"] == upstream)
+
+
+def run_phase(request, requests, concurrency, standin, upstream):
+    from src.metrics import UPSTREAM_REJECTED, UPSTREAM_RETRIES
+
+    outcomes = []
+    outcome_lock = threading.Lock()
+
+    def one(i):
+        started = time.perf_counter()
+        try:
+            outcome = "degraded" if request(i).startswith("The analysis service is unavailable") else "answered"
+        except Exception as e:
+            outcome = f"error: {type(e).__name__}"
+        with outcome_lock:
+            outcomes.append(outcome)
+        return None if outcome.startswith("error") else time.perf_counter() - started
+
+    calls_before = sum(standin.calls.values())
+    retries_before = metric_total(UPSTREAM_RETRIES, upstream)
+    rejected_before = metric_total(UPSTREAM_REJECTED, upstream)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = [value for value in pool.map(one, range(requests)) if value is not None]
+    result = summarize(latencies, sum(outcome.startswith("error") for outcome in outcomes),
+                       time.perf_counter() - started)
+    result.update(
+        answered=outcomes.count("answered"),
+        degraded=outcomes.count("degraded"),
+        upstream_calls_per_request=round((sum(standin.calls.values()) - calls_before) / requests, 2),
+        retries=int(metric_total(UPSTREAM_RETRIES, upstream) - retries_before),
+        failed_fast=int(metric_total(UPSTREAM_REJECTED, upstream) - rejected_before),
+    )
+    errors = sorted({outcome for outcome in outcomes if outcome.startswith("error")})
+    if errors:
+        result["error_types"] = errors
+    return result
+
+
+def run_scenario(args, standins, breakers):
+    from src import resilience
+    from src.analyze import analyze_project_status
+    from src.deadline import deadline
+    from src.proposals import fetch_active_proposals
+    from src.shared_cache import get_cache
+    from src.tenants import Tenant, use_tenant
+    from src.web3_integration import get_wallet_balance
+
+    os.environ["CIRCUIT_FAILURE_THRESHOLD"] = "5" if breakers else "0"
+    resilience.reset()
+    get_cache().clear()
+    chain = standins["chain"]
+    standin = standins[UPSTREAMS[args.upstream]]
+    run = f"{'breakers' if breakers else 'no_breakers'}-{time.monotonic_ns()}"
+
+    def request(i):
+        # One tenant per request keeps the conversation histories (and prompts) small
+        tenant = Tenant(f"{run}-{i}", space="standin.eth", infura_url=chain.url, wallet_address=chain.accounts[1])
+        with use_tenant(tenant), deadline(args.deadline):
+            proposals = fetch_active_proposals()
+            # Without the balance while the RPC breaker is open, as analyze_proposals does
+            balance = get_wallet_balance(tenant.web3, tenant.wallet_address) if resilience.available("rpc") else None
+            project_data = {'infura_url': tenant.infura_url, 'contract_address': None, 'abi': None,
+                            'wallet_address': tenant.wallet_address}
+            return analyze_project_status(proposals, project_data, balance)
+
+    phases = {"healthy": run_phase(request, args.requests, args.concurrency, standin, args.upstream)}
+
+    if args.fault == "hang":
+        standin.inject_faults(hang_rate=1.0, hang=args.deadline)
+    else:
+        standin.inject_faults(error_rate=1.0)
+    phases["outage"] = run_phase(request, args.requests, args.concurrency, standin, args.upstream)
+    phases["outage"]["breaker_state"] = resilience.breaker_states().get(args.upstream)
+
+    standin.inject_faults()
+    started = time.perf_counter()
+    recovery_seconds = None
+    while time.perf_counter() - started < args.reset_timeout * 4 + 10:
+        try:
+            request(0)
+        except Exception:
+            pass
+        if resilience.breaker_states().get(args.upstream) == resilience.CLOSED:
+            recovery_seconds = round(time.perf_counter() - started, 2)
+            break
+        time.sleep(0.05)
+    phases["recovery"] = run_phase(request, args.requests, args.concurrency, standin, args.upstream)
+    phases["recovery"]["seconds_until_closed"] = recovery_seconds
+    print(f"{'with' if breakers else 'without'} breakers: outage {phases['outage']['upstream_calls_per_request']} "
+          f"{args.upstream} calls/request, p50 {phases['outage']['p50_ms']} ms", file=sys.stderr)
+    return phases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--upstream", choices=sorted(UPSTREAMS), default="llm", help="Upstream to take down")
+    parser.add_argument("--fault", choices=("error", "hang"), default="error", help="HTTP 503s or hung requests")
+    parser.add_argument("--requests", type=int, default=60, help="Requests per phase")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent requests")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Added latency per completion (s)")
+    parser.add_argument("--reset-timeout", type=float, default=2.0, help="CIRCUIT_RESET_TIMEOUT for the run (s)")
+    parser.add_argument("--upstream-timeout", type=float, default=1.0, help="UPSTREAM_TIMEOUT for the run (s)")
+    parser.add_argument("--deadline", type=float, default=10.0, help="Deadline of each request (s)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    standins = {"chain": ChainStandin().start(), "snapshot": FakeSnapshot(proposal_count=3).start(),
+                "llm": FakeLLM(latency=args.llm_latency).start()}
+    work_dir = tempfile.mkdtemp(prefix="dao-agent-faults-")
+    os.environ.update({
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-benchmark"),
+        "OPENAI_API_BASE": f"{standins['llm'].url}/v1",
+        "SNAPSHOT_GRAPHQL_URL": f"{standins['snapshot'].url}/graphql",
+        "LOG_FILE": os.path.join(work_dir, "dao_voting_agent.log"),
+        "ARCHIVE_DB": os.path.join(work_dir, "dao_archive.db"),
+        "SHARED_CACHE_PATH": os.path.join(work_dir, "shared_cache"),
+        # Analyze every request instead of reusing the first analysis, and call Snapshot and the RPC endpoint every
+        # time (stale proposals still cover Snapshot outages), so the upstream calls show the breakers alone
+        "SIMILARITY_REUSE_THRESHOLD": "1.1",
+        "SNAPSHOT_CACHE_TTL": "0",
+        "BALANCE_CACHE_TTL": "0",
+        "CIRCUIT_RESET_TIMEOUT": str(args.reset_timeout),
+        "UPSTREAM_TIMEOUT": str(args.upstream_timeout),
+    })
+
+    # fetch_active_proposals prints progress for interactive use
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        runs = {"breakers": run_scenario(args, standins, breakers=True),
+                "no_breakers": run_scenario(args, standins, breakers=False)}
+    finally:
+        sys.stdout = stdout
+        for standin in standins.values():
+            standin.stop()
+
+    report = {
+        "benchmark": "fault_injection",
+        "upstream": args.upstream,
+        "fault": args.fault,
+        "requests_per_phase": args.requests,
+        "concurrency": args.concurrency,
+        "reset_timeout_s": args.reset_timeout,
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Import-time (cold start) benchmark based on `python -X importtime`.
+
+Imports a module in a fresh interpreter several times and reports the median total import time, the time per
+top-level package (web3, openai, theoriq, flask, ...) and the slowest individual imports as JSON, so the numbers
+can be tracked between commits.
+
+Usage:
+  python -m benchmarks.import_time --module src.app --repeat 5 --output import_time.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+
+def parse_importtime(stderr):
+    """
+    Parse `-X importtime` output into a list of (module, self_us, cumulative_us) tuples.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # Skip the header line
+            continue
+        rows.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return rows
+
+
+def measure_once(module, env):
+    """
+    Import `module` in a fresh interpreter and return (wall seconds, parsed importtime rows).
+    """
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return wall, parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="src.app", help="Module to import (default: src.app)")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of fresh interpreters to measure")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to report")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+    walls, totals = [], []
+    by_package = defaultdict(list)
+    by_module = defaultdict(list)
+    for _ in range(args.repeat):
+        wall, rows = measure_once(args.module, env)
+        walls.append(wall)
+        totals.append(sum(self_us for _, self_us, _ in rows))
+        package_totals = defaultdict(int)
+        for name, self_us, cumulative_us in rows:
+            package_totals[name.lstrip().split(".")[0]] += self_us
+            by_module[name.strip()].append(cumulative_us)
+        for package, total in package_totals.items():
+            by_package[package].append(total)
+
+    packages = {package: round(statistics.median(values) / 1000, 2)
+                for package, values in by_package.items()}
+    slowest = sorted(((statistics.median(values), name) for name, values in by_module.items()), reverse=True)
+
+    report = {
+        "benchmark": "import_time",
+        "module": args.module,
+        "repeat": args.repeat,
+        "wall_ms": round(statistics.median(walls) * 1000, 2),
+        "import_ms": round(statistics.median(totals) / 1000, 2),
+        "packages_ms": dict(sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]),
+        "slowest_cumulative_ms": {name: round(us / 1000, 2) for us, name in slowest[:args.top]},
+        "loaded_heavy_packages": sorted(package for package in ("web3", "openai", "requests", "eth_account")
+                                        if package in by_package),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
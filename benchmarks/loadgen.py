@@ -0,0 +1,154 @@
+"""
+Closed-loop HTTP load generator used by the benchmark scripts.
+
+Each client thread keeps one keep-alive connection open and sends form-encoded requests back to back, so the
+number of threads is the number of requests in flight.
+"""
+import http.client
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies, errors, elapsed):
+    """
+    Build the JSON-friendly summary for one load run. Latencies are in seconds, reported in milliseconds.
+    """
+    latencies = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "duration_s": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+        "max_ms": _ms(latencies[-1] if latencies else None),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def run_load(base_url, mix, concurrency, duration, timeout=60.0, seed=0):
+    """
+    Run a closed-loop load test against `base_url` for `duration` seconds with `concurrency` clients.
+
+    `mix` is a list of (weight, path, form) tuples; every request picks one entry at random by weight.
+    Returns an overall summary plus one summary per path.
+    """
+    parts = urlsplit(base_url)
+    weights = [weight for weight, _, _ in mix]
+    encoded = [(path, urlencode(form)) for _, path, form in mix]
+    results = {path: {"latencies": [], "errors": 0} for path, _ in encoded}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        rng = random.Random(seed + index)
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+        latencies = {path: [] for path, _ in encoded}
+        errors = {path: 0 for path, _ in encoded}
+        while time.perf_counter() < deadline:
+            path, body = rng.choices(encoded, weights=weights)[0]
+            started = time.perf_counter()
+            try:
+                conn.request("POST", path, body=body,
+                             headers={"Content-Type": "application/x-www-form-urlencoded"})
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    errors[path] += 1
+                else:
+                    latencies[path].append(time.perf_counter() - started)
+            except (OSError, http.client.HTTPException):
+                errors[path] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+        conn.close()
+        with lock:
+            for path in latencies:
+                results[path]["latencies"].extend(latencies[path])
+                results[path]["errors"] += errors[path]
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    all_latencies = [value for result in results.values() for value in result["latencies"]]
+    all_errors = sum(result["errors"] for result in results.values())
+    summary = summarize(all_latencies, all_errors, elapsed)
+    summary["concurrency"] = concurrency
+    summary["routes"] = {path: summarize(result["latencies"], result["errors"], elapsed)
+                         for path, result in results.items()}
+    return summary
+
+
+def free_port():
+    """
+    Ask the OS for a free TCP port on localhost.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(command, port, env, startup_timeout=60.0):
+    """
+    Start an app server subprocess and wait until it accepts connections on `port`.
+    """
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited during startup: {process.stderr.read().decode(errors='replace')}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"Server did not start listening on port {port} within {startup_timeout}s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def gunicorn_command(app_path, port, workers=1, threads=1, worker_class=None):
+    """
+    Build a gunicorn command line for `app_path` (e.g. 'src.app:app').
+    """
+    command = [sys.executable, "-m", "gunicorn", app_path, "--bind", f"127.0.0.1:{port}",
+               "--workers", str(workers), "--backlog", "2048", "--timeout", "120"]
+    if worker_class:
+        command += ["--worker-class", worker_class]
+    if threads > 1:
+        command += ["--threads", str(threads)]
+    return command
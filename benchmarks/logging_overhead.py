@@ -0,0 +1,119 @@
+"""
+Microbenchmark of the request-path cost of logging, before and after the queue-based logging pipeline.
+
+"before" reproduces the original setup: a synchronous RotatingFileHandler with eagerly built f-strings containing
+full proposal lists. "after" uses the handlers from src/logging_config.py: lazy %-style formatting, a bounded
+queue and a background listener that formats capped JSON records. Only the time spent in the calling thread is
+measured, since that is what a request pays.
+
+Usage:
+  python -m benchmarks.logging_overhead --calls 20000 --output logging_overhead.json
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import statistics
+import tempfile
+import time
+from logging.handlers import QueueListener, RotatingFileHandler
+
+from src.logging_config import JsonFormatter, LazyQueueHandler, SamplingFilter
+
+
+def sample_payload(proposal_count=5, body_chars=4000):
+    """
+    A proposal list shaped like the Snapshot GraphQL response that the hot paths log.
+    """
+    return [{"id": f"0x{i:064x}", "title": f"Proposal {i}", "body": "x" * body_chars,
+             "choices": ["For", "Against", "Abstain"], "start": 1700000000, "end": 1700600000}
+            for i in range(proposal_count)]
+
+
+def time_calls(log_call, calls):
+    """
+    Return per-call latencies (seconds) of `log_call` in the calling thread.
+    """
+    latencies = []
+    for i in range(calls):
+        started = time.perf_counter()
+        log_call(i)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    return {
+        "mean_us": round(statistics.fmean(latencies) * 1e6, 2),
+        "p50_us": round(latencies[len(latencies) // 2] * 1e6, 2),
+        "p99_us": round(latencies[int(len(latencies) * 0.99) - 1] * 1e6, 2),
+    }
+
+
+def run_before(log_dir, payload, calls):
+    logger = logging.getLogger("benchmark.before")
+    logger.propagate = False
+    handler = RotatingFileHandler(os.path.join(log_dir, "before.log"), maxBytes=10 * 1024 * 1024, backupCount=7)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    try:
+        return time_calls(lambda i: logger.info(f"Off-chain proposals fetched successfully: {payload}"), calls)
+    finally:
+        handler.close()
+
+
+def run_after(log_dir, payload, calls, sample_rate):
+    logger = logging.getLogger("benchmark.after")
+    logger.propagate = False
+    file_handler = RotatingFileHandler(os.path.join(log_dir, "after.log"), maxBytes=10 * 1024 * 1024, backupCount=7)
+    file_handler.setFormatter(JsonFormatter(max_field_chars=2000))
+    queue_handler = LazyQueueHandler(queue.Queue(maxsize=10000))
+    if sample_rate < 1:
+        queue_handler.addFilter(SamplingFilter({"Off-chain proposals fetched successfully: %s": sample_rate}))
+    logger.addHandler(queue_handler)
+    logger.setLevel(logging.INFO)
+    listener = QueueListener(queue_handler.queue, file_handler)
+    listener.start()
+    try:
+        latencies = time_calls(lambda i: logger.info("Off-chain proposals fetched successfully: %s", payload), calls)
+    finally:
+        logger.removeHandler(queue_handler)
+        listener.stop()
+        file_handler.close()
+    return latencies, queue_handler.dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000, help="Log calls per variant")
+    parser.add_argument("--body-chars", type=int, default=4000, help="Size of each proposal body in the payload")
+    parser.add_argument("--sample-rate", type=float, default=0.1, help="Sampling rate for the sampled variant")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    payload = sample_payload(body_chars=args.body_chars)
+    with tempfile.TemporaryDirectory() as log_dir:
+        before = run_before(log_dir, payload, args.calls)
+        after, dropped = run_after(log_dir, payload, args.calls, sample_rate=1.0)
+        sampled, sampled_dropped = run_after(log_dir, payload, args.calls, sample_rate=args.sample_rate)
+
+    report = {
+        "benchmark": "logging_overhead",
+        "calls": args.calls,
+        "payload_chars": len(str(payload)),
+        "before_sync_fstring": summarize(before),
+        "after_queue_lazy_json": dict(summarize(after), dropped=dropped),
+        "after_queue_sampled": dict(summarize(sampled), dropped=sampled_dropped, sample_rate=args.sample_rate),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Memory footprint of historical proposals: Snapshot-style dicts of strings vs the compact Proposal model.
+
+Generates proposals with realistic bodies (random prose from a fixed vocabulary, so they compress like real text
+rather than like repeated filler), and measures the bytes allocated to hold them with tracemalloc. On-chain ABI
+tuples are measured the same way. Also reports the cost of reading a compressed body.
+
+Usage:
+  python -m benchmarks.proposal_memory --count 100000 --body-chars 2000 --output proposal_memory.json
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from src.proposal_model import Proposal
+
+WORDS = ("the proposal treasury fund grant allocate community members vote delegate governance protocol upgrade "
+         "token liquidity incentive rewards program budget quarter contributors security audit risk parameter "
+         "collateral market launch bridge chain network deploy timeline milestone report transparency multisig "
+         "council committee support growth ecosystem partners research development operations marketing legal "
+         "compliance framework review period quorum threshold execution onchain offchain snapshot forum").split()
+
+CHOICE_SETS = (["For", "Against", "Abstain"], ["Yes", "No"], ["For", "Against"])
+
+
+def random_body(rng, chars):
+    words = []
+    length = 0
+    while length < chars:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:chars]
+
+
+def snapshot_payloads(count, body_chars, seed=0):
+    """
+    Snapshot GraphQL results as JSON text; decoding them yields fresh strings per proposal, as in the agent.
+    """
+    rng = random.Random(seed)
+    return [json.dumps({
+        "id": f"0x{rng.getrandbits(256):064x}", "title": f"Proposal {i}: {random_body(rng, 60)}",
+        "body": random_body(rng, body_chars), "choices": rng.choice(CHOICE_SETS),
+        "start": 1700000000 + i, "end": 1700600000 + i,
+    }) for i in range(count)]
+
+
+def measure(build):
+    """
+    Return (object, bytes allocated by build()) as traced by tracemalloc.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100000, help="Number of proposals to hold")
+    parser.add_argument("--body-chars", type=int, default=2000, help="Body length of each Snapshot proposal")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    count = args.count
+    payloads = snapshot_payloads(count, args.body_chars)
+    dicts, dict_bytes = measure(lambda: [json.loads(payload) for payload in payloads])
+    del dicts
+    models, model_bytes = measure(lambda: [Proposal.from_snapshot(json.loads(payload)) for payload in payloads])
+
+    tuples, tuple_bytes = measure(lambda: [[i, i * 7] for i in range(count)])
+    onchain, onchain_bytes = measure(lambda: [Proposal.from_onchain(values, index=i, field_names=("id", "votes"))
+                                              for i, values in enumerate([i, i * 7] for i in range(count))])
+    del tuples, onchain
+
+    started = time.perf_counter()
+    for proposal in models[:1000]:
+        proposal.body
+    body_read_us = (time.perf_counter() - started) / min(count, 1000) * 1e6
+    assert models[0].body == json.loads(payloads[0])["body"]
+
+    report = {
+        "benchmark": "proposal_memory",
+        "count": count,
+        "body_chars": args.body_chars,
+        "snapshot": {
+            "dict_bytes_per_proposal": round(dict_bytes / count),
+            "model_bytes_per_proposal": round(model_bytes / count),
+            "dict_total_mb": round(dict_bytes / 2 ** 20, 1),
+            "model_total_mb": round(model_bytes / 2 ** 20, 1),
+            "model_vs_dict": round(model_bytes / dict_bytes, 3),
+        },
+        "onchain": {
+            "abi_list_bytes_per_proposal": round(tuple_bytes / count),
+            "model_bytes_per_proposal": round(onchain_bytes / count),
+        },
+        "body_read_us": round(body_read_us, 2),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
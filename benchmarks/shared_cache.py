@@ -0,0 +1,152 @@
+"""
+Shared cache across worker processes (src/shared_cache.py) vs a separate in-process cache per worker.
+
+Reports get/set latency of both caches for Snapshot proposal lists, then forks --workers processes (like gunicorn
+workers) that each fetch the proposals of --spaces Snapshot spaces --rounds times from the Snapshot stand-in, and
+counts the Snapshot calls they made in total. Finally a restarted worker fetches every space once more: with the shared
+cache it starts warm, with per-process caches it starts cold. Workers that start cold at the same time all miss the
+same spaces at once, so the shared run is repeated with the spaces preloaded in the parent first, as the gunicorn master
+does with PRELOAD_CACHES (see gunicorn.conf.py).
+
+Usage:
+  python -m benchmarks.shared_cache --workers 4 --spaces 20 --rounds 3 --output shared_cache.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.loadgen import percentile
+from benchmarks.standins import FakeSnapshot
+
+
+def space_names(count):
+    return [f"space{i}.eth" for i in range(count)]
+
+
+def time_operations(cache, value, repeat):
+    """
+    Return p50/p99 microseconds of set() and get() for `repeat` keys holding `value`.
+    """
+    timings = {"set": [], "get": []}
+    for i in range(repeat):
+        started = time.perf_counter()
+        cache.set(f"bench:{i}", value, 60)
+        timings["set"].append(time.perf_counter() - started)
+    for i in range(repeat):
+        started = time.perf_counter()
+        cache.get(f"bench:{i}")
+        timings["get"].append(time.perf_counter() - started)
+    result = {}
+    for operation, values in timings.items():
+        values.sort()
+        result[f"{operation}_p50_us"] = round(percentile(values, 50) * 1e6, 1)
+        result[f"{operation}_p99_us"] = round(percentile(values, 99) * 1e6, 1)
+    return result
+
+
+def worker(cache_path, spaces, rounds):
+    # A fresh process-wide cache in every worker, as in a gunicorn worker that opens it after the fork
+    os.environ["SHARED_CACHE_PATH"] = cache_path
+    from src.proposals import fetch_snapshot_proposals
+    from src.shared_cache import get_cache
+
+    get_cache.cache_clear()
+    for _ in range(rounds):
+        for space in spaces:
+            fetch_snapshot_proposals(space)
+
+
+def run_workers(snapshot, cache_path, workers, spaces, rounds):
+    """
+    Run `workers` forked processes concurrently and return the Snapshot calls they made.
+    """
+    calls_before = snapshot.calls["graphql"]
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=worker, args=(cache_path, spaces, rounds)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return snapshot.calls["graphql"] - calls_before
+
+
+def run_mode(snapshot, cache_path, args, preload=False):
+    from src.proposals import fetch_snapshot_proposals
+    from src.shared_cache import get_cache
+
+    spaces = space_names(args.spaces)
+    os.environ["SHARED_CACHE_PATH"] = cache_path
+    get_cache.cache_clear()
+    get_cache().clear()
+    preload_calls = 0
+    if preload:
+        calls_before = snapshot.calls["graphql"]
+        for space in spaces:
+            fetch_snapshot_proposals(space)
+        preload_calls = snapshot.calls["graphql"] - calls_before
+    started = time.perf_counter()
+    calls = run_workers(snapshot, cache_path, args.workers, spaces, args.rounds)
+    elapsed = time.perf_counter() - started
+    return {
+        "preload_calls": preload_calls,
+        "worker_calls": calls,
+        "worker_calls_per_fetch": round(calls / (args.workers * args.spaces * args.rounds), 3),
+        "duration_s": round(elapsed, 3),
+        "restarted_worker_calls": run_workers(snapshot, cache_path, 1, spaces, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="Forked worker processes")
+    parser.add_argument("--spaces", type=int, default=20, help="Snapshot spaces each worker fetches")
+    parser.add_argument("--rounds", type=int, default=3, help="Fetches of every space per worker")
+    parser.add_argument("--proposals", type=int, default=5, help="Proposals per space")
+    parser.add_argument("--repeat", type=int, default=2000, help="Operations per latency measurement")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="dao-agent-shared-cache-")
+    snapshot = FakeSnapshot(proposal_count=args.proposals).start()
+    os.environ.update({
+        "SNAPSHOT_GRAPHQL_URL": f"{snapshot.url}/graphql",
+        "LOG_FILE": os.path.join(work_dir, "dao_voting_agent.log"),
+        # Every fetch in the run finds the proposals fresh once they are cached
+        "SNAPSHOT_CACHE_TTL": "3600",
+    })
+    shared_path = os.path.join(work_dir, "shared_cache")
+
+    from src.proposal_model import Proposal
+    from src.shared_cache import LocalCache, SharedCache
+
+    value = [Proposal.from_snapshot(entry) for entry in snapshot.proposals]
+    operations = {"shared": time_operations(SharedCache(os.path.join(work_dir, "latency_cache")), value, args.repeat),
+                  "per_process": time_operations(LocalCache(), value, args.repeat)}
+
+    try:
+        modes = {"shared": run_mode(snapshot, shared_path, args),
+                 "shared_preloaded": run_mode(snapshot, shared_path, args, preload=True),
+                 "per_process": run_mode(snapshot, "", args)}
+    finally:
+        snapshot.stop()
+
+    report = {
+        "benchmark": "shared_cache",
+        "workers": args.workers,
+        "spaces": args.spaces,
+        "rounds": args.rounds,
+        "operations": operations,
+        "modes": modes,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Lookup latency and accuracy of the proposal similarity index (src/similarity.py).
+
+Stores analyses of generated proposals (prose bodies) in a temporary archive, loads them into the similarity index
+as the agent does on its first lookup, and then times lookups (signature + LSH query) for exact re-submissions,
+near-duplicates (a few percent of the words changed), parameter tweaks and unrelated proposals. Reports p50/p99
+latency, the share of lookups that would reuse an earlier analysis or add it as context, and the load time.
+
+Usage:
+  python -m benchmarks.similarity_lookup --entries 100000 --output similarity_lookup.json
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.archive_queries import percentiles, timed
+from benchmarks.proposal_memory import WORDS, random_body
+from src.proposal_model import Proposal
+
+
+def proposal(i, title, body):
+    return Proposal(f"0x{i:064x}", title, body=body)
+
+
+def near_duplicate(rng, text, fraction):
+    words = text.split()
+    for position in rng.sample(range(len(words)), max(1, int(len(words) * fraction))):
+        words[position] = rng.choice(WORDS)
+    return " ".join(words)
+
+
+def parameter_tweak(rng, text):
+    return f"{text} The amount is raised to {rng.randrange(1000, 9999)} tokens per month " \
+           f"for {rng.randrange(2, 12)} months."
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100000, help="Analyzed proposals in the index")
+    parser.add_argument("--body-chars", type=int, default=1500, help="Body length of each proposal")
+    parser.add_argument("--repeat", type=int, default=300, help="Lookups per kind")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="similarity-bench-")
+    os.environ["ARCHIVE_DB"] = os.path.join(work_dir, "archive.db")
+    os.environ.setdefault("LOG_FILE", os.path.join(work_dir, "dao_voting_agent.log"))
+
+    from src import similarity
+    from src.archive import get_archive
+
+    rng = random.Random(0)
+    bodies = [random_body(rng, args.body_chars) for _ in range(args.entries)]
+    titles = [f"Grant {i}: {random_body(rng, 40)}" for i in range(args.entries)]
+
+    archive = get_archive()
+    started = time.perf_counter()
+    signatures = [similarity.signature(f"{title}\n{body}") for title, body in zip(titles, bodies)]
+    signature_us = (time.perf_counter() - started) / args.entries * 1e6
+    with archive._connection() as connection:
+        connection.executemany(
+            "INSERT INTO analyses (tenant, source, proposal_id, title, analysis, signature, created_at) "
+            "VALUES ('', 'snapshot', ?, ?, ?, ?, 0)",
+            ((str(i), titles[i], f"Approve. Analysis of proposal {i}.", signatures[i].tobytes())
+             for i in range(args.entries)))
+    del signatures
+
+    started = time.perf_counter()
+    index = similarity.get_index("")
+    load_seconds = time.perf_counter() - started
+
+    kinds = {
+        "exact": lambda i: proposal(i, titles[i], bodies[i]),
+        "near_duplicate_1pct": lambda i: proposal(i, titles[i], near_duplicate(rng, bodies[i], 0.01)),
+        "near_duplicate_5pct": lambda i: proposal(i, titles[i], near_duplicate(rng, bodies[i], 0.05)),
+        "parameter_tweak": lambda i: proposal(i, titles[i], parameter_tweak(rng, bodies[i])),
+        "unrelated": lambda i: proposal(i, f"Unrelated {i}", random_body(rng, args.body_chars)),
+    }
+    reuse_threshold = float(os.environ.get("SIMILARITY_REUSE_THRESHOLD", 0.9))
+    context_threshold = float(os.environ.get("SIMILARITY_CONTEXT_THRESHOLD", 0.5))
+    results = {}
+    for name, build in kinds.items():
+        samples = []
+        reused = context = 0
+        for _ in range(args.repeat):
+            query = build(rng.randrange(args.entries))
+            matches = timed(samples, lambda: similarity.find_similar(query, min_similarity=0.0))
+            best = matches[0]['similarity'] if matches else 0.0
+            reused += best >= reuse_threshold
+            context += context_threshold <= best < reuse_threshold
+        results[name] = dict(percentiles(samples), reuse_rate=round(reused / args.repeat, 3),
+                             context_rate=round(context / args.repeat, 3))
+
+    report = {
+        "benchmark": "similarity_lookup",
+        "entries": len(index),
+        "body_chars": args.body_chars,
+        "signature_us": round(signature_us, 1),
+        "load_seconds": round(load_seconds, 2),
+        "lookups": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
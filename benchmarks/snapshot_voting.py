@@ -0,0 +1,145 @@
+"""
+Throughput of gasless Snapshot voting (src/snapshot_voting.py) vs on-chain votes.
+
+Builds one vote per wallet and proposal (--wallets x --proposals) and reports:
+- signing: votes/second signed one at a time with eth_account's generic typed-data signing, and in bulk with
+  sign_votes (shared domain separator and type hashes, one key per wallet, direct hashing),
+- submission: votes/second posted to the stand-in sequencer one at a time and concurrently with cast_snapshot_votes,
+  and how many votes the sequencer accepted,
+- on-chain: seconds and gas per vote for --onchain-votes cast_vote transactions on the eth-tester governor.
+
+The first --verify votes are submitted to a sequencer that recovers every signer, to check the signatures; the
+throughput runs skip the recovery, which is as slow as signing in pure Python.
+
+Usage:
+  python -m benchmarks.snapshot_voting --wallets 10 --proposals 50 --latency 0.05 --output snapshot_voting.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.standins import ChainStandin, FakeSequencer
+
+SPACE = "standin.eth"
+
+
+def rate(count, seconds):
+    return round(count / seconds, 1) if seconds else None
+
+
+def build_votes(accounts, proposals, timestamp):
+    from src.snapshot_voting import SnapshotVote
+
+    return [SnapshotVote(account.address, SPACE, proposal, 1 + i % 3, timestamp=timestamp)
+            for account in accounts for i, proposal in enumerate(proposals)]
+
+
+def submit(sequencer, votes, keys, concurrency):
+    from src.snapshot_voting import cast_snapshot_votes
+
+    os.environ["SNAPSHOT_SEQUENCER_URL"] = sequencer.url
+    started = time.perf_counter()
+    results = cast_snapshot_votes(votes, keys, concurrency=concurrency)
+    elapsed = time.perf_counter() - started
+    return {"votes_per_s": rate(len(votes), elapsed), "duration_s": round(elapsed, 3),
+            "accepted": sum("receipt" in result for result in results),
+            "errors": sorted({repr(result["error"]) for result in results if "error" in result})}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wallets", type=int, default=10, help="Voting wallets")
+    parser.add_argument("--proposals", type=int, default=50, help="Snapshot proposals each wallet votes on")
+    parser.add_argument("--latency", type=float, default=0.05, help="Added latency per vote submission (s)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent submissions")
+    parser.add_argument("--verify", type=int, default=20, help="Votes submitted with signature recovery")
+    parser.add_argument("--onchain-votes", type=int, default=20, help="On-chain votes for the baseline")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="dao-agent-snapshot-voting-")
+    os.environ.update({
+        "LOG_FILE": os.path.join(work_dir, "dao_voting_agent.log"),
+        "ARCHIVE_DB": os.path.join(work_dir, "dao_archive.db"),
+        "SHARED_CACHE_PATH": os.path.join(work_dir, "shared_cache"),
+    })
+
+    from eth_account import Account
+    from eth_account.messages import encode_typed_data
+
+    from src.snapshot_voting import sign_votes, signing_key
+
+    accounts = [Account.from_key((1000 + i).to_bytes(32, "big")) for i in range(args.wallets)]
+    proposals = [f"0x{i + 1:064x}" for i in range(args.proposals)]
+    votes = build_votes(accounts, proposals, timestamp=int(time.time()))
+    account_by_address = {account.address: account for account in accounts}
+
+    # Signing, one at a time through eth_account vs in bulk
+    domain_type = [{"name": "name", "type": "string"}, {"name": "version", "type": "string"}]
+    started = time.perf_counter()
+    for vote in votes:
+        data = vote.typed_data()
+        Account.sign_message(encode_typed_data(full_message={
+            "types": dict(data["types"], EIP712Domain=domain_type), "primaryType": "Vote",
+            "domain": data["domain"], "message": data["message"]}), account_by_address[vote.voter].key)
+    generic_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    keys = {account.address: signing_key(account) for account in accounts}
+    sign_votes(votes, keys)
+    bulk_seconds = time.perf_counter() - started
+    signing = {"generic_votes_per_s": rate(len(votes), generic_seconds),
+               "bulk_votes_per_s": rate(len(votes), bulk_seconds),
+               "speedup": round(generic_seconds / bulk_seconds, 2)}
+
+    with FakeSequencer(latency=args.latency) as verifying:
+        verified = submit(verifying, votes[:args.verify], keys, args.concurrency)
+    with FakeSequencer(latency=args.latency, verify=False) as sequencer:
+        # Later timestamps, so these are new votes rather than copies of the ones above
+        sequential = submit(sequencer, build_votes(accounts, proposals, int(time.time()) + 1), keys, 1)
+        concurrent = submit(sequencer, build_votes(accounts, proposals, int(time.time()) + 2), keys, args.concurrency)
+        distinct_votes = len(sequencer.votes)
+
+    # On-chain baseline: one transaction (and its gas) per vote
+    onchain = None
+    if args.onchain_votes:
+        from src.web3_integration import cast_vote, new_web3
+
+        with ChainStandin() as chain:
+            web3 = new_web3(chain.url)
+            # cast_vote prints the transaction hash for interactive use
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                started = time.perf_counter()
+                tx_hashes = [cast_vote(web3, chain.accounts[1], chain.governor_address, chain.governor_abi, 1, "yes")
+                             for _ in range(args.onchain_votes)]
+                elapsed = time.perf_counter() - started
+            gas = [chain.tester.get_transaction_receipt(f"0x{tx_hash.removeprefix('0x')}")["gas_used"]
+                   for tx_hash in tx_hashes]
+        onchain = {"votes_per_s": rate(len(tx_hashes), elapsed),
+                   "seconds_per_vote": round(elapsed / len(tx_hashes), 4),
+                   "gas_per_vote": round(sum(gas) / len(gas))}
+
+    report = {
+        "benchmark": "snapshot_voting",
+        "wallets": args.wallets,
+        "proposals": args.proposals,
+        "votes": len(votes),
+        "submission_latency_s": args.latency,
+        "signing": signing,
+        "verified_submission": verified,
+        "sequential_submission": sequential,
+        "concurrent_submission": dict(concurrent, concurrency=args.concurrency),
+        "distinct_votes_at_sequencer": distinct_votes,
+        "onchain": onchain,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,517 @@
+"""
+Local stand-ins for the upstream services the agent talks to, so benchmarks can run without Infura, Snapshot or OpenAI.
+
+Every stand-in is a threaded HTTP server on 127.0.0.1 with a configurable per-request latency and a per-method
+call counter, so a benchmark can report how many upstream calls each entry point made. Faults (HTTP errors and hung
+requests) can be injected into any stand-in with inject_faults().
+"""
+import io
+import json
+import random
+import re
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ScriptedStdin(io.TextIOBase):
+    """
+    Answers every interactive prompt with "exit", so entry points that fall into input() loops return.
+    """
+
+    def readable(self):
+        return True
+
+    def readline(self, size=-1):
+        return "exit\n"
+
+
+class _StandinHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open hundreds of concurrent connections; the default listen backlog of 5 would drop them
+    request_queue_size = 1024
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self._connections_lock:
+            self._connections.add(request)
+        super().process_request(request, client_address)
+
+    def shutdown_request(self, request):
+        with self._connections_lock:
+            self._connections.discard(request)
+        super().shutdown_request(request)
+
+    def close_connections(self):
+        """
+        Close the open keep-alive connections, so clients do not keep talking to a stopped stand-in (e.g. through a
+        pooled connection, when a new stand-in gets the same port).
+        """
+        with self._connections_lock:
+            connections = list(self._connections)
+        for request in connections:
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, keep-alive clients hit the 40ms delayed-ACK stall
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        status, body = self.server.standin.handle(self.path, payload)
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class Standin:
+    """
+    Base class for a local upstream stand-in. Subclasses implement `respond(path, payload)`.
+    """
+    name = "standin"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self._random = random.Random(0)
+        self.inject_faults()
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._server = _StandinHTTPServer(("127.0.0.1", 0), _StandinHandler)
+        self._server.standin = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name=f"{self.name}-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.close_connections()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def count(self, key):
+        with self._lock:
+            self.calls[key] += 1
+
+    def inject_faults(self, error_rate=0.0, status=503, hang_rate=0.0, hang=10.0):
+        """
+        Fail a share of the requests with HTTP `status`, and stall another share for `hang` seconds before answering.
+
+        Called without arguments, it turns faults off again.
+        """
+        self.error_rate = error_rate
+        self.error_status = status
+        self.hang_rate = hang_rate
+        self.hang = hang
+
+    def handle(self, path, payload):
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.error_rate:
+            self.count("injected_error")
+            return self.error_status, {"error": {"message": "Injected fault (stand-in).", "type": "server_error"}}
+        if roll < self.error_rate + self.hang_rate:
+            self.count("injected_hang")
+            time.sleep(self.hang)
+        if self.latency:
+            time.sleep(self.latency)
+        return self.respond(path, payload)
+
+    def respond(self, path, payload):
+        raise NotImplementedError
+
+
+class FakeRPC(Standin):
+    """
+    Minimal Ethereum JSON-RPC endpoint: enough for `connect_to_web3` and `get_wallet_balance`.
+    """
+    name = "rpc"
+
+    def __init__(self, latency=0.0, balance_wei=10 ** 18, chain_id=1337):
+        super().__init__(latency)
+        self.balance_wei = balance_wei
+        self.chain_id = chain_id
+        self.block_number = 1
+
+    def respond(self, path, payload):
+        method = payload.get("method")
+        self.count(method)
+        results = {
+            "web3_clientVersion": "standin/v1",
+            "net_version": str(self.chain_id),
+            "eth_chainId": hex(self.chain_id),
+            "eth_blockNumber": hex(self.block_number),
+            "eth_getBalance": hex(self.balance_wei),
+        }
+        if method not in results:
+            return 200, {"jsonrpc": "2.0", "id": payload.get("id"),
+                         "error": {"code": -32601, "message": f"Method {method} not supported by stand-in"}}
+        return 200, {"jsonrpc": "2.0", "id": payload.get("id"), "result": results[method]}
+
+
+# Sample governor contract deployed on the in-process chain. The runtime is hand-assembled so the benchmarks need
+# no Solidity compiler:
+#   proposalCount() -> uint256             number of proposals (set at deployment)
+#   proposals(uint256 id) -> (id, votes)    the proposal ID and the number of votes cast on it
+#   vote(uint256 id, string support)        records one vote on the proposal
+#   propose()                               adds a proposal (not in GOVERNOR_ABI; see ChainStandin.add_proposals)
+GOVERNOR_ABI = [
+    {"type": "function", "name": "proposals", "stateMutability": "view",
+     "inputs": [{"name": "proposalId", "type": "uint256"}],
+     "outputs": [{"name": "id", "type": "uint256"}, {"name": "votes", "type": "uint256"}]},
+    {"type": "function", "name": "proposalCount", "stateMutability": "view",
+     "inputs": [], "outputs": [{"name": "", "type": "uint256"}]},
+    {"type": "function", "name": "vote", "stateMutability": "nonpayable",
+     "inputs": [{"name": "proposalId", "type": "uint256"}, {"name": "support", "type": "string"}], "outputs": []},
+]
+
+_OPCODES = {
+    "STOP": 0x00, "ADD": 0x01, "EQ": 0x14, "SHR": 0x1c, "CALLDATALOAD": 0x35, "CODECOPY": 0x39, "MSTORE": 0x52,
+    "SLOAD": 0x54, "SSTORE": 0x55, "JUMPI": 0x57, "JUMPDEST": 0x5b, "PUSH1": 0x60, "PUSH2": 0x61, "PUSH4": 0x63,
+    "DUP1": 0x80, "SWAP1": 0x90, "RETURN": 0xf3, "REVERT": 0xfd,
+}
+
+
+def _assemble(program):
+    """
+    Assemble a list of opcodes, (PUSHn, int) pairs, ("LABEL", name) markers and ("JUMP_TO", name) references.
+    """
+    size, labels = 0, {}
+    for op in program:
+        if isinstance(op, tuple) and op[0] == "LABEL":
+            labels[op[1]] = size
+        elif isinstance(op, tuple):
+            size += 3 if op[0] == "JUMP_TO" else 1 + _OPCODES[op[0]] - 0x5f
+        else:
+            size += 1
+    code = bytearray()
+    for op in program:
+        if isinstance(op, tuple) and op[0] == "LABEL":
+            continue
+        if isinstance(op, tuple):
+            name, value = ("PUSH2", labels[op[1]]) if op[0] == "JUMP_TO" else op
+            width = _OPCODES[name] - 0x5f
+            code.append(_OPCODES[name])
+            code += value.to_bytes(width, "big")
+        else:
+            code.append(_OPCODES[op])
+    return bytes(code)
+
+
+def governor_initcode(proposal_count):
+    """
+    Deployment bytecode for the sample governor with `proposal_count` proposals.
+    """
+    from web3 import Web3
+
+    def selector(signature):
+        return int.from_bytes(Web3.keccak(text=signature)[:4], "big")
+
+    runtime = _assemble([
+        ("PUSH1", 0), "CALLDATALOAD", ("PUSH1", 0xe0), "SHR",
+        "DUP1", ("PUSH4", selector("proposalCount()")), "EQ", ("JUMP_TO", "count"), "JUMPI",
+        "DUP1", ("PUSH4", selector("proposals(uint256)")), "EQ", ("JUMP_TO", "proposal"), "JUMPI",
+        "DUP1", ("PUSH4", selector("vote(uint256,string)")), "EQ", ("JUMP_TO", "vote"), "JUMPI",
+        "DUP1", ("PUSH4", selector("propose()")), "EQ", ("JUMP_TO", "propose"), "JUMPI",
+        ("PUSH1", 0), "DUP1", "REVERT",
+        # proposalCount(): return slot 0
+        ("LABEL", "count"), "JUMPDEST", ("PUSH1", 0), "SLOAD", ("PUSH1", 0), "MSTORE",
+        ("PUSH1", 0x20), ("PUSH1", 0), "RETURN",
+        # proposals(id): return (id, votes stored in slot id + 1)
+        ("LABEL", "proposal"), "JUMPDEST", ("PUSH1", 4), "CALLDATALOAD", "DUP1", ("PUSH1", 0), "MSTORE",
+        ("PUSH1", 1), "ADD", "SLOAD", ("PUSH1", 0x20), "MSTORE", ("PUSH1", 0x40), ("PUSH1", 0), "RETURN",
+        # vote(id, support): increment slot id + 1
+        ("LABEL", "vote"), "JUMPDEST", ("PUSH1", 4), "CALLDATALOAD", ("PUSH1", 1), "ADD", "DUP1", "SLOAD",
+        ("PUSH1", 1), "ADD", "SWAP1", "SSTORE", "STOP",
+        # propose(): increment the proposal count in slot 0
+        ("LABEL", "propose"), "JUMPDEST", ("PUSH1", 0), "SLOAD", ("PUSH1", 1), "ADD", ("PUSH1", 0), "SSTORE", "STOP",
+    ])
+    constructor = [
+        ("PUSH2", proposal_count), ("PUSH1", 0), "SSTORE",
+        ("PUSH2", len(runtime)), "DUP1", ("JUMP_TO", "runtime"), ("PUSH1", 0), "CODECOPY",
+        ("PUSH1", 0), "RETURN",
+        ("LABEL", "runtime"),
+    ]
+    return _assemble(constructor) + runtime
+
+
+class ChainStandin(Standin):
+    """
+    In-process EVM (eth-tester) served over JSON-RPC, with the sample governor deployed.
+
+    Only the JSON-RPC methods used by the agent (and the proposal watcher's block and log filters) are bridged.
+    Transactions from the node's unlocked accounts are accepted through eth_sendTransaction, and every transaction
+    is mined immediately.
+    """
+    name = "chain"
+
+    def __init__(self, latency=0.0, proposal_count=5):
+        super().__init__(latency)
+        from eth_tester import EthereumTester
+
+        self.tester = EthereumTester()
+        self._tester_lock = threading.Lock()
+        self.accounts = self.tester.get_accounts()
+        # eth-tester's default accounts use the private keys 1, 2, 3, ... (for signing Snapshot votes)
+        self.account_keys = ["0x" + (i + 1).to_bytes(32, "big").hex() for i in range(len(self.accounts))]
+        tx_hash = self.tester.send_transaction({"from": self.accounts[0], "gas": 500000,
+                                                "data": "0x" + governor_initcode(proposal_count).hex()})
+        self.governor_address = self.tester.get_transaction_receipt(tx_hash)["contract_address"]
+        self.governor_abi = GOVERNOR_ABI
+
+    def _transaction(self, params):
+        fields = {"from": "from", "to": "to", "data": "data", "input": "data", "gas": "gas", "value": "value",
+                  "gasPrice": "gas_price", "nonce": "nonce", "maxFeePerGas": "max_fee_per_gas",
+                  "maxPriorityFeePerGas": "max_priority_fee_per_gas"}
+        transaction = {}
+        for key, value in params.items():
+            if key in fields:
+                name = fields[key]
+                transaction[name] = value if name in ("from", "to", "data") else int(value, 16)
+        # eth-tester requires a sender even for eth_call
+        transaction.setdefault("from", self.accounts[0])
+        return transaction
+
+    @staticmethod
+    def _rpc_format(value):
+        """
+        Convert an eth-tester result (snake_case keys, int quantities) to JSON-RPC format.
+        """
+        if isinstance(value, dict):
+            formatted = {}
+            for key, item in value.items():
+                head, *rest = ("miner" if key == "coinbase" else key).split("_")
+                formatted[head + "".join(part.title() for part in rest)] = ChainStandin._rpc_format(item)
+            return formatted
+        if isinstance(value, (list, tuple)):
+            return [ChainStandin._rpc_format(item) for item in value]
+        if isinstance(value, int) and not isinstance(value, bool):
+            return hex(value)
+        return value
+
+    def _dispatch(self, method, params):
+        tester = self.tester
+        block = params[1] if len(params) > 1 else "latest"
+        if method == "web3_clientVersion":
+            return "EthereumTester/standin"
+        if method in ("eth_chainId", "net_version"):
+            chain_id = tester.backend.chain.chain_id
+            return hex(chain_id) if method == "eth_chainId" else str(chain_id)
+        if method == "eth_blockNumber":
+            return hex(tester.get_block_by_number("latest")["number"])
+        if method == "eth_getBlockByNumber":
+            return self._rpc_format(tester.get_block_by_number(params[0], full_transactions=params[1]))
+        if method == "eth_accounts":
+            return list(self.accounts)
+        if method == "eth_gasPrice":
+            return hex(10 ** 9)
+        if method == "eth_getBalance":
+            return hex(tester.get_balance(params[0], block))
+        if method == "eth_getTransactionCount":
+            return hex(tester.get_nonce(params[0], block))
+        if method == "eth_getCode":
+            return tester.get_code(params[0], block)
+        if method == "eth_call":
+            return tester.call(self._transaction(params[0]), block)
+        if method == "eth_estimateGas":
+            return hex(tester.estimate_gas(self._transaction(params[0])))
+        if method == "eth_sendTransaction":
+            return tester.send_transaction(self._transaction(params[0]))
+        if method == "eth_sendRawTransaction":
+            return tester.send_raw_transaction(params[0])
+        if method == "eth_newBlockFilter":
+            return hex(tester.create_block_filter())
+        if method == "eth_newFilter":
+            criteria = params[0]
+            return hex(tester.create_log_filter(from_block=criteria.get("fromBlock"), to_block=criteria.get("toBlock"),
+                                                address=criteria.get("address"), topics=criteria.get("topics")))
+        if method == "eth_getFilterChanges":
+            return self._rpc_format(list(tester.get_only_filter_changes(int(params[0], 16))))
+        if method == "eth_uninstallFilter":
+            tester.delete_filter(int(params[0], 16))
+            return True
+        raise NotImplementedError(method)
+
+    def add_proposals(self, count=1):
+        """
+        Add proposals to the governor (through propose(), which is not in GOVERNOR_ABI), one transaction each.
+        """
+        from web3 import Web3
+
+        data = Web3.keccak(text="propose()")[:4].hex()
+        with self._tester_lock:
+            for _ in range(count):
+                self.tester.send_transaction({"from": self.accounts[0], "to": self.governor_address, "gas": 100000,
+                                              "data": "0x" + data.removeprefix("0x")})
+
+    def mine_blocks(self, count=1):
+        """
+        Mine empty blocks, e.g. to drive block filters and subscriptions.
+        """
+        with self._tester_lock:
+            self.tester.mine_blocks(count)
+
+    def respond(self, path, payload):
+        method = payload.get("method")
+        self.count(method)
+        try:
+            with self._tester_lock:
+                result = self._dispatch(method, payload.get("params") or [])
+        except NotImplementedError:
+            return 200, {"jsonrpc": "2.0", "id": payload.get("id"),
+                         "error": {"code": -32601, "message": f"Method {method} not supported by stand-in"}}
+        except Exception as e:
+            return 200, {"jsonrpc": "2.0", "id": payload.get("id"), "error": {"code": -32000, "message": str(e)}}
+        return 200, {"jsonrpc": "2.0", "id": payload.get("id"), "result": result}
+
+
+class FakeSnapshot(Standin):
+    """
+    Snapshot GraphQL hub that answers proposal queries with generated active proposals.
+    """
+    name = "snapshot"
+
+    def __init__(self, latency=0.0, proposal_count=5, body_chars=2000):
+        super().__init__(latency)
+        self.proposals = [
+            {"id": f"0x{i:064x}", "title": f"Standin proposal {i}",
+             "body": f"Proposal {i} asks the DAO to fund work item {i}. " + "Details. " * (body_chars // 9),
+             "choices": ["For", "Against", "Abstain"], "start": 1700000000 + i, "end": 1700600000 + i,
+             "state": "active", "author": f"0x{i:040x}", "space": {"id": "standin.eth"}}
+            for i in range(proposal_count)
+        ]
+
+    def respond(self, path, payload):
+        self.count("graphql")
+        fields = ("id", "title", "body", "choices", "start", "end", "state", "author", "space")
+        return 200, {"data": {"proposals": [{key: p[key] for key in fields} for p in self.proposals]}}
+
+
+class FakeLLM(Standin):
+    """
+    OpenAI-compatible chat/completions server with configurable latency and a requests-per-second rate limit.
+
+    Requests above the rate limit get an HTTP 429 response like the real API. Without a fixed `reply`, it answers
+    with a "Proposal <n>: Approve - ..." line for each proposal numbered in the prompt, as analyze_project_status asks.
+    """
+    name = "llm"
+
+    def __init__(self, latency=0.0, rate_limit=None, reply=None):
+        super().__init__(latency)
+        self.rate_limit = rate_limit
+        self.reply = reply
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    def _allow(self):
+        if not self.rate_limit:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start, self._window_count = now, 0
+            self._window_count += 1
+            return self._window_count <= self.rate_limit
+
+    def respond(self, path, payload):
+        operation = "chat_completion" if path.endswith("/chat/completions") else "completion"
+        if not self._allow():
+            self.count("rate_limited")
+            return 429, {"error": {"message": "Rate limit reached (stand-in).", "type": "requests",
+                                   "code": "rate_limit_exceeded"}}
+        self.count(operation)
+        usage = {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120}
+        reply = self.reply
+        if reply is None:
+            prompt = payload["messages"][-1]["content"] if payload.get("messages") else payload.get("prompt", "")
+            numbers = dict.fromkeys(re.findall(r"^\s*Proposal (\d+):", prompt, re.MULTILINE))
+            reply = "".join(f"Proposal {number}: Approve - The proposal looks reasonable.\n" for number in numbers)
+            reply += "Project feedback: The project looks reasonable."
+        if operation == "chat_completion":
+            choice = {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": reply}}
+            return 200, {"id": "chatcmpl-standin", "object": "chat.completion", "created": int(time.time()),
+                         "model": payload.get("model"), "choices": [choice], "usage": usage}
+        choice = {"index": 0, "finish_reason": "stop", "text": reply}
+        return 200, {"id": "cmpl-standin", "object": "text_completion", "created": int(time.time()),
+                     "model": payload.get("model"), "choices": [choice], "usage": usage}
+
+
+class FakeSequencer(Standin):
+    """
+    Snapshot sequencer that accepts signed votes (EIP-712), recovers their signer and keeps the latest vote of each
+    wallet per proposal.
+
+    Votes whose signature does not match their address get an HTTP 400 response like the real sequencer. Pass
+    verify=False to skip the (pure-Python, slow) signature recovery under heavy load.
+    """
+    name = "sequencer"
+
+    def __init__(self, latency=0.0, verify=True):
+        super().__init__(latency)
+        self.verify = verify
+        self.votes = {}
+        self.accepted = 0
+
+    @staticmethod
+    def _rejected(description):
+        return 400, {"error": "client_error", "error_description": description}
+
+    def respond(self, path, payload):
+        from eth_account import Account
+        from eth_account.messages import encode_typed_data
+
+        self.count("vote")
+        try:
+            address, sig, data = payload["address"], payload["sig"], payload["data"]
+            message = data["message"]
+            if self.verify:
+                domain_type = [{"name": "name", "type": "string"}, {"name": "version", "type": "string"}]
+                signable = encode_typed_data(full_message={
+                    "types": dict(data["types"], EIP712Domain=domain_type), "primaryType": "Vote",
+                    "domain": data["domain"], "message": message})
+                if Account.recover_message(signable, signature=sig).lower() != address.lower():
+                    return self._rejected("signature validation failed")
+        except (KeyError, TypeError, ValueError) as e:
+            return self._rejected(f"wrong envelope format: {e}")
+        with self._lock:
+            self.votes[(address.lower(), message["space"], message["proposal"])] = message["choice"]
+            self.accepted += 1
+            number = self.accepted
+        receipt = f"0x{number:064x}"
+        return 200, {"id": receipt, "ipfs": f"bafkreistandin{number}",
+                     "relayer": {"address": "0x" + "00" * 20, "receipt": receipt}}
+
@@ -0,0 +1,46 @@
+"""
+Centralized configuration for the DAO Voting Agent.
+
+The .env file is loaded once, the first time any setting is read, instead of at import time in every module.
+Clients that are expensive to import or set up (such as OpenAI) are configured here on first use.
+"""
+import os
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def load_environment():
+    """
+    Load environment variables from the .env file into os.environ (only once per process).
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return os.environ
+
+
+def get_setting(name, default=None):
+    """
+    Return a configuration value from the environment (or the .env file).
+    """
+    load_environment()
+    return os.environ.get(name, default)
+
+
+@lru_cache(maxsize=None)
+def get_openai():
+    """
+    Import and configure the OpenAI client on first use.
+    """
+    api_key = get_setting("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OpenAI API key is missing.")
+
+    import openai
+
+    openai.api_key = api_key
+    # Optional OpenAI-compatible endpoint (e.g. a proxy or a local stand-in)
+    api_base = get_setting("OPENAI_API_BASE")
+    if api_base:
+        openai.api_base = api_base
+    return openai
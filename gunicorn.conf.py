@@ -0,0 +1,51 @@
+"""
+Gunicorn settings, read automatically when gunicorn is started from the repository root (e.g. `gunicorn src.app:app`).
+Command-line flags such as --workers, --threads or --bind take precedence.
+
+With PRELOAD_CACHES=true (the default only when TENANTS_FILE is set), the app is loaded once in the master, which
+then warms the caches (see src/shared_cache.py) before it forks the workers, so new and restarted workers start warm.
+This makes the master call the upstreams before any worker serves, so it is off otherwise.
+
+The workers record their Prometheus metrics into PROMETHEUS_MULTIPROC_DIR (a new temporary directory unless it is
+set), so /metrics on any worker reports all of them (see src/metrics.py). The directory's metric files are removed
+when gunicorn starts, and those of each exited worker are marked dead.
+"""
+import glob
+import os
+import tempfile
+
+from config.settings import get_setting
+
+# Set before the app (and prometheus_client) is imported, in the master or in the workers
+if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="dao-agent-metrics-")
+
+# Imported here rather than in child_exit, which gunicorn may call from a signal handler
+from prometheus_client import multiprocess  # noqa: E402
+
+
+def _preload_caches():
+    default = "true" if get_setting("TENANTS_FILE", "") else "false"
+    return get_setting("PRELOAD_CACHES", default).lower() in ("1", "true", "yes")
+
+
+preload_app = _preload_caches()
+
+
+def when_ready(server):
+    from src.shared_cache import preload
+
+    if preload_app:
+        preload()
+
+
+def on_starting(server):
+    # Values left by a previous run would be added to this one's
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,181 @@
+"""
+Content-hashed ABI registry and contract-object cache.
+
+Each distinct ABI is parsed and indexed once. The index records the ABI's governance capabilities (proposal
+getters, vote functions with their signatures and proposal events with their topics), so request paths look them up
+instead of rescanning the ABI. ABIs are identified by the SHA-256 of their canonical JSON; ABI strings received
+again (e.g. the same form field on every /analyze_proposal request) are matched by their text without parsing.
+
+Contract objects are cached per (RPC endpoint, contract address, ABI hash), so steady-state requests skip ABI
+parsing, checksumming and contract construction entirely. Both caches are LRU-bounded by ABI_CACHE_SIZE and
+CONTRACT_CACHE_SIZE.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from config.settings import get_setting
+from src.logging_config import setup_logger
+from src.metrics import record_cache
+
+# Set up logging
+logger = setup_logger()
+
+
+class LruCache:
+    """
+    Small thread-safe LRU mapping.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """
+        Store `value` unless another thread stored one first; return the stored value.
+        """
+        with self._lock:
+            existing = self._data.get(key)
+            if existing is not None:
+                return existing
+            self._data[key] = value
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return value
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _canonical_type(param):
+    """
+    Canonical Solidity type of an ABI parameter, with tuple components expanded.
+    """
+    abi_type = param['type']
+    if abi_type.startswith('tuple'):
+        return f"({','.join(_canonical_type(component) for component in param['components'])}){abi_type[5:]}"
+    return abi_type
+
+
+def _signature(item):
+    return f"{item['name']}({','.join(_canonical_type(param) for param in item.get('inputs', []))})"
+
+
+class AbiIndex:
+    """
+    A parsed ABI and the governance capabilities found in it.
+
+    - proposal_functions: functions whose name mentions "proposal" or "vote", in ABI order.
+    - proposal_getters: read-only proposal functions, mapped to their signatures.
+    - getter_outputs: output names of each proposal getter (used to normalize on-chain proposals).
+    - vote_functions: state-changing vote functions, mapped to their signatures.
+    - proposal_events: proposal and vote events, mapped to their topic (keccak of the signature).
+    """
+    __slots__ = ("abi_hash", "abi", "function_names", "proposal_functions", "proposal_getters", "getter_outputs",
+                 "vote_functions", "proposal_events")
+
+    def __init__(self, abi, abi_hash):
+        self.abi_hash = abi_hash
+        self.abi = abi
+        self.function_names = frozenset(item['name'] for item in abi if item.get('type') == 'function')
+        self.proposal_functions = []
+        self.proposal_getters = {}
+        self.getter_outputs = {}
+        self.vote_functions = {}
+        self.proposal_events = {}
+
+        for item in abi:
+            name = item.get('name', '')
+            lowered = name.lower()
+            if 'proposal' not in lowered and 'vote' not in lowered:
+                continue
+            if item.get('type') == 'function':
+                if name not in self.proposal_functions:
+                    self.proposal_functions.append(name)
+                read_only = item.get('stateMutability') in ('view', 'pure') or item.get('constant', False)
+                if read_only and 'proposal' in lowered:
+                    self.proposal_getters[name] = _signature(item)
+                    self.getter_outputs[name] = tuple(output.get('name', '') for output in item.get('outputs', []))
+                elif not read_only and 'vote' in lowered:
+                    self.vote_functions[name] = _signature(item)
+            elif item.get('type') == 'event':
+                from eth_utils import keccak
+
+                self.proposal_events[name] = "0x" + keccak(text=_signature(item)).hex()
+
+    @property
+    def has_events(self):
+        return bool(self.proposal_events)
+
+
+_abi_by_hash = LruCache(int(get_setting("ABI_CACHE_SIZE", 256)))
+# Fast paths that skip hashing: ABI strings by their text, and parsed ABIs by object identity (the cache keeps the
+# object alive, so its id cannot be reused while the entry exists)
+_abi_by_text = LruCache(int(get_setting("ABI_CACHE_SIZE", 256)))
+_abi_by_identity = LruCache(int(get_setting("ABI_CACHE_SIZE", 256)))
+_contracts = LruCache(int(get_setting("CONTRACT_CACHE_SIZE", 1024)))
+
+
+def abi_hash(abi):
+    """
+    SHA-256 of the ABI's canonical JSON (sorted keys, no whitespace).
+    """
+    return hashlib.sha256(json.dumps(abi, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def get_abi(abi):
+    """
+    Return the AbiIndex for an ABI given as a JSON string or as a parsed list (parsed and indexed only once).
+    """
+    if isinstance(abi, AbiIndex):
+        return abi
+    if isinstance(abi, str):
+        index = _abi_by_text.get(abi)
+        if index is not None:
+            record_cache("abi", True)
+            return index
+        return _abi_by_text.put(abi, _index_for(json.loads(abi)))
+
+    entry = _abi_by_identity.get(id(abi))
+    if entry is not None and entry[0] is abi:
+        record_cache("abi", True)
+        return entry[1]
+    index = _index_for(abi)
+    _abi_by_identity.put(id(abi), (abi, index))
+    return index
+
+
+def _index_for(abi):
+    digest = abi_hash(abi)
+    index = _abi_by_hash.get(digest)
+    record_cache("abi", index is not None)
+    if index is None:
+        index = _abi_by_hash.put(digest, AbiIndex(abi, digest))
+        logger.info("Indexed ABI %s: proposal functions %s, vote functions %s, events %s", digest[:12],
+                    index.proposal_functions, index.vote_functions, list(index.proposal_events))
+    return index
+
+
+def get_contract(web3, contract_address, abi):
+    """
+    Return a cached contract object for the address and ABI on web3's endpoint.
+    """
+    index = get_abi(abi)
+    endpoint = getattr(web3.provider, 'endpoint_uri', None) or id(web3)
+    key = (str(endpoint), contract_address, index.abi_hash)
+    contract = _contracts.get(key)
+    record_cache("contract", contract is not None)
+    if contract is None:
+        contract = _contracts.put(key, web3.eth.contract(address=web3.to_checksum_address(contract_address),
+                                                         abi=index.abi))
+    return contract
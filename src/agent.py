@@ -1,44 +1,58 @@
 # import logging
-from theoriq import Agent, AgentConfig
+from src.proposal_model import as_proposal
 from src.proposals import fetch_active_proposals
-from src.analyze import analyze_proposals, chat_with_openai_conversational
+from src.archive import my_proposals_summary, record_verdict
+from src.analyze import VERDICT_VOTES, analyze_new_proposal, analyze_proposals, chat_with_openai_conversational
+from src.snapshot_voting import is_snapshot_proposal_id, snapshot_auto_vote
 from src.web3_integration import connect_to_web3, get_wallet_balance, cast_vote, get_user_inputs
+from src.deadline import DeadlineExceeded, check
 from src.logging_config import setup_logger
+from src.tenants import is_interactive
+from src.tracing import traced
 
 # Set up logging
 logger = setup_logger()
 
-agent = Agent(AgentConfig.from_env())
-
 
+@traced()
 def handle_new_proposal(proposal, web3, user_wallet_address, contract_address, abi):
     """
     Handles new proposals, fetches wallet balance, analyzes proposals, and casts votes.
     """
-    logger.info(f"Handling new proposal: {proposal['title']}")
+    # Accept Snapshot dicts, JSON strings (from the API) and on-chain tuples alike
+    proposal = as_proposal(proposal)
+    logger.info("Handling new proposal: %s", proposal['title'])
 
     try:
         # Fetch wallet balance
         balance = get_wallet_balance(web3, user_wallet_address)
-        logger.info(f"Wallet Balance for {user_wallet_address}: {balance} ETH")
+        logger.info("Wallet Balance for %s: %s ETH", user_wallet_address, balance)
 
         # Analyze the proposal
-        recommendation = analyze_proposals()
-        logger.info(f"Recommendation for proposal '{proposal['title']}': {recommendation}")
-
-        # Optionally cast a vote on a proposal if conditions are met
-        if recommendation == 'Approve':
-            logger.info(f"Casting 'yes' vote for proposal ID: {proposal['id']}")
-            cast_vote(web3, user_wallet_address, contract_address, abi, proposal['id'], 'yes')
+        recommendation, verdict = analyze_new_proposal(proposal, web3, user_wallet_address, contract_address, abi,
+                                                       balance)
+        logger.info("Recommendation for proposal '%s': %s", proposal['title'], recommendation)
+        record_verdict(proposal, verdict, recommendation)
+
+        # Optionally cast a vote on a proposal if conditions are met; automatic Snapshot votes are opt-in
+        vote_choice = VERDICT_VOTES.get(verdict)
+        if vote_choice is None:
+            logger.info("No verdict on proposal ID %s, not voting on it.", proposal['id'])
+        elif is_snapshot_proposal_id(proposal['id']) and not snapshot_auto_vote():
+            logger.info("Not voting on Snapshot proposal ID %s: SNAPSHOT_AUTO_VOTE is off.", proposal['id'])
         else:
-            logger.info(f"Casting 'no' vote for proposal ID: {proposal['id']}")
-            cast_vote(web3, user_wallet_address, contract_address, abi, proposal['id'], 'no')
+            logger.info("Casting '%s' vote for proposal ID: %s", vote_choice, proposal['id'])
+            cast_vote(web3, user_wallet_address, contract_address, abi, proposal['id'], vote_choice,
+                      space=proposal.space, choices=proposal.choices)
 
         return (f"**Proposal:** {proposal['title']}\n**Wallet Balance:** {balance} ETH"
                 f"\n**Recommendation:** {recommendation}")
 
+    except DeadlineExceeded:
+        # Let the caller stop handling the remaining proposals
+        raise
     except Exception as e:
-        logger.error(f"Error handling proposal '{proposal['title']}': {e}")
+        logger.error("Error handling proposal '%s': %s", proposal['title'], e)
         return f"An error occurred while handling the proposal: {proposal['title']}"
 
 
@@ -49,19 +63,22 @@ def handle_openai_queries(user_input, web3, user_wallet_address):
     try:
         if "wallet balance" in user_input.lower():
             balance = get_wallet_balance(web3, user_wallet_address)
-            logger.info(f"Responded to wallet balance query. Balance: {balance} ETH")
+            logger.info("Responded to wallet balance query. Balance: %s ETH", balance)
             return f"Your wallet balance is: {balance} ETH"
+        elif "show my proposals" in user_input.lower():
+            return my_proposals_summary(user_wallet_address) or "You have no submitted proposals at the moment."
         else:
             # For other OpenAI conversational queries
             response = chat_with_openai_conversational(user_input)
-            logger.info(f"Responded to OpenAI conversational query: {user_input}")
+            logger.info("Responded to OpenAI conversational query: %s", user_input)
             return response
 
     except Exception as e:
-        logger.error(f"Error handling OpenAI query '{user_input}': {e}")
+        logger.error("Error handling OpenAI query '%s': %s", user_input, e)
         return "An error occurred while processing your request."
 
 
+@traced()
 def run_agent():
     """
     Main function to run the agent, connect to Web3, fetch proposals, and handle them.
@@ -78,19 +95,22 @@ def run_agent():
 
         # Establish Web3 connection
         web3 = connect_to_web3(infura_url)
-        logger.info(f"Connected to Web3 via Infura URL: {infura_url}")
+        logger.info("Connected to Web3 via Infura URL: %s", infura_url)
 
         # Fetch active proposals
         proposals = fetch_active_proposals()
-        logger.info(f"Fetched {len(proposals)} active proposals.")
+        logger.info("Fetched %s active proposals.", len(proposals))
 
         # Handle each proposal
         for proposal in proposals:
+            check("handling the next proposal")
             response = handle_new_proposal(proposal, web3, wallet_address, contract_address, abi)
-            logger.info(f"Handled proposal: {response}")
+            logger.info("Handled proposal: %s", response)
 
         # Start interactive session for OpenAI
         analyze_proposals()
+        if not is_interactive():
+            return
         logger.info("Interactive OpenAI session started.")
         print("Start interacting with your DAO Voting Agent. Type 'exit' to stop.")
         while True:
@@ -103,7 +123,7 @@ def run_agent():
             print(f"DAO Agent: {openai_response}")
 
     except Exception as e:
-        logger.error(f"Error during agent execution: {e}")
+        logger.error("Error during agent execution: %s", e)
         print("An error occurred while running the agent.")
 
 
@@ -1,29 +1,42 @@
 # import logging
-import os
-
-import openai
-from dotenv import load_dotenv
-from web3 import Web3
+import re
+import threading
 
+from config.settings import get_openai, get_setting
+from src.proposal_model import as_proposal
 from src.proposals import fetch_active_proposals
-from src.web3_integration import get_user_inputs, get_wallet_balance
+from src.web3_integration import get_user_inputs, get_wallet_balance, get_web3
+from src.deadline import DeadlineExceeded, upstream_timeout
 from src.logging_config import setup_logger
+from src.metrics import record_cache
+from src.resilience import UpstreamUnavailable, available, call
+from src.shared_cache import get_cache
+from src.tenants import current_tenant, is_interactive
+from src.tracing import traced
 
 # Set up logging
 logger = setup_logger()
 
-# Load environment variables
-load_dotenv()
+# Initialize conversation history with a system prompt
+conversation_history = [{"role": "system", "content": "You are an assistant helping with DAO voting."}]
 
+# Separate conversation histories per tenant, so one DAO's conversation never reaches another's prompts
+tenant_conversation_histories = {}
+# Requests share these histories across threads; a prompt and its reply are added together once the reply arrives
+_history_lock = threading.Lock()
 
-# Ensure OpenAI API key is available
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OpenAI API key is missing.")
-openai.api_key = OPENAI_API_KEY
 
-# Initialize conversation history with a system prompt
-conversation_history = [{"role": "system", "content": "You are an assistant helping with DAO voting."}]
+class LLMCallFailed(RuntimeError):
+    """
+    The LLM call itself failed, other than by an outage (e.g. a bad request or an authentication error).
+    """
+
+
+def _conversation_history():
+    tenant = current_tenant()
+    if tenant is None:
+        return conversation_history
+    return tenant_conversation_histories.setdefault(tenant.tenant_id, [dict(conversation_history[0])])
 
 
 # Function to handle conversation
@@ -31,39 +44,125 @@ def chat_with_openai_conversational(prompt):
     """
     Sends the user's prompt to OpenAI and maintains conversation history.
     """
-    logger.info(f"Received user prompt: {prompt}")
+    logger.info("Received user prompt: %s", prompt)
 
-    # Add user's input to conversation history
-    conversation_history.append({"role": "user", "content": prompt})
+    # The prompt is sent with the history so far, and only added to it with the reply
+    history = _conversation_history()
+    user_message = {"role": "user", "content": prompt}
+    with _history_lock:
+        messages = history + [user_message]
 
-    # Get the response from OpenAI's chat completion
-    response = openai.ChatCompletion.create(
-        model="gpt-4o-mini",  # Specifically for GPT-4o mini
-        messages=conversation_history,
-        max_tokens=300,
-        temperature=0.7
-    )
+    # Get the response from OpenAI's chat completion (the client is configured on first use)
+    try:
+        openai = get_openai()
+        response = call("llm", "chat_completion", lambda: openai.ChatCompletion.create(
+            model="gpt-4o-mini",  # Specifically for GPT-4o mini
+            messages=messages,
+            max_tokens=300,
+            temperature=0.7,
+            request_timeout=upstream_timeout()
+        ))
+    except (DeadlineExceeded, UpstreamUnavailable):
+        raise
+    except Exception as e:
+        raise LLMCallFailed(f"The LLM call failed: {e}") from e
 
     # Extract and log the response from OpenAI
     message = response['choices'][0]['message']['content'].strip()
-    logger.info(f"Received response from OpenAI: {message}")
+    logger.info("Received response from OpenAI: %s", message)
 
-    # Add OpenAI's response to conversation history
-    conversation_history.append({"role": "assistant", "content": message})
+    # Add the prompt and OpenAI's response to conversation history
+    with _history_lock:
+        history.extend([user_message, {"role": "assistant", "content": message}])
     return message
 
 
-# Function to analyze project status
-def analyze_project_status(proposals, project_data, wallet_balance):
+def degraded_status(proposals, reused_analyses=None, similar_analyses=None):
     """
-    Generate a detailed response to the user based on the project status, proposals, and OpenAI integration.
+    Project status without an LLM analysis, for when the LLM is unavailable.
     """
+    if not proposals:
+        return "It seems like there are currently no active proposals for your DAO voting project."
+    lines = ["The analysis service is unavailable right now, so these proposals were not analyzed:"]
+    lines += [f"- {proposal.title}" for proposal in proposals]
+    if reused_analyses:
+        lines += ["", "These proposals match proposals analyzed before:", reused_analyses]
+    if similar_analyses:
+        lines += ["", "Earlier analyses of similar proposals:", similar_analyses]
+    return "\n".join(lines)
+
+
+# "Proposal <n>:" at the start of a line opens the analysis of the n-th proposal listed in the prompt
+_PROPOSAL_SECTION = re.compile(r"^\W*Proposal\s+(\d+)\s*[:.)-]", re.MULTILINE | re.IGNORECASE)
+_FEEDBACK_SECTION = re.compile(r"^\W*Project feedback\b", re.MULTILINE | re.IGNORECASE)
+
+
+def split_proposal_analyses(response, proposals):
+    """
+    Split an LLM response into the analyses of the proposals listed in the prompt, keyed by proposal id.
+
+    Proposals without a section of their own in the response are left out.
+    """
+    feedback = _FEEDBACK_SECTION.search(response)
+    text = response[:feedback.start()] if feedback else response
+    headers = list(_PROPOSAL_SECTION.finditer(text))
+    analyses = {}
+    for header, following in zip(headers, headers[1:] + [None]):
+        number = int(header.group(1))
+        section = text[header.end():following.start() if following else len(text)].strip()
+        if 1 <= number <= len(proposals) and section:
+            analyses.setdefault(proposals[number - 1].id, section)
+    return analyses
+
+
+# Verdicts an analysis can start with, and the vote each one casts
+VERDICT_VOTES = {"Approve": "yes", "Reject": "no", "Abstain": "abstain"}
+_VERDICT = re.compile(r"\W*(approve|reject|abstain)\b", re.IGNORECASE)
+
+
+def parse_verdict(analysis):
+    """
+    The verdict a proposal's analysis starts with ("Approve", "Reject" or "Abstain"), or None if it has none.
+    """
+    match = _VERDICT.match(analysis or "")
+    return match.group(1).capitalize() if match else None
+
+
+@traced()
+def analyze_project_proposals(proposals, project_data, wallet_balance):
+    """
+    Like analyze_project_status, but returns (response, analyses): analyses maps proposal ids to the analysis of
+    each proposal on its own (reused, or its section of the response), for the proposals that have one.
+    """
+    # NumPy (for the similarity index) is only imported once proposals are analyzed
+    from src.similarity import plan_analysis, remember_analysis
+
+    proposals = [as_proposal(proposal) for proposal in proposals or []]
+    reused, fresh, similar_analyses = plan_analysis(proposals)
+    analyses = {proposal.id: match['analysis'] for proposal, match in reused}
+    reused_analyses = None
+    if reused:
+        logger.info("Reusing earlier analyses for %s of %s proposals", len(reused), len(proposals))
+        reused_analyses = "\n".join(dict.fromkeys(
+            f"- {proposal.title}: {match['analysis']}" for proposal, match in reused))
+        if not fresh:
+            return f"These proposals match proposals analyzed before:\n{reused_analyses}", analyses
+
     if not proposals:
         base_response = "It seems like there are currently no active proposals for your DAO voting project."
+        instructions = ""
     else:
-        base_response = f"There are {len(proposals)} active proposals available. Let's go over them: {proposals}"
+        base_response = f"There are {len(fresh)} active proposals available. Let's go over them:\n" + "\n".join(
+            f"Proposal {number}: {proposal}" for number, proposal in enumerate(fresh, 1))
+        if reused:
+            base_response += f"\n\nThese proposals were analyzed before (do not analyze them again):\n{reused_analyses}"
+        if similar_analyses:
+            base_response += f"\n\nEarlier analyses of similar proposals, for context:\n{similar_analyses}"
+        instructions = """Start with one line per numbered proposal, in the form
+    "Proposal <number>: <Approve, Reject or Abstain> - <short reason>", then write "Project feedback:" and continue.
+    """
 
-    logger.info(f"Base response prepared: {base_response}")
+    logger.info("Base response prepared: %s", base_response)
 
     prompt = f"""
     You are an AI assistant helping with a DAO voting project. 
@@ -79,14 +178,72 @@ def analyze_project_status(proposals, project_data, wallet_balance):
     - Wallet Address: {project_data['wallet_address']}
     - Wallet Balance: {wallet_balance} ETH
 
-    Can you give feedback on the project (not more than 2048 array of response) and let me know if anything is missing or incorrect?
+    {instructions}Can you give feedback on the project (not more than 2048 array of response) and let me know if anything is missing or incorrect?
     (Remember NOT to use bold format for your response, 
     and do well to respond to users politely and don't address them as the project owner but strictly as users,
     and ensure NOT to mention that You're trained by OpenAI, just be a polite Assistant.)
     """
 
-    openai_response = chat_with_openai_conversational(prompt)
-    return openai_response
+    # Identical requests (e.g. the same DAO handled by several workers) share one analysis
+    tenant = current_tenant()
+    cache_key = f"analysis:{tenant.tenant_id if tenant is not None else ''}:{prompt}"
+    cached = get_cache().get(cache_key)
+    record_cache("llm_analysis", cached is not None)
+    if cached is not None:
+        logger.info("Reusing the analysis of an identical request from the shared cache.")
+        openai_response, fresh_analyses = cached
+        return openai_response, {**analyses, **fresh_analyses}
+
+    if not available("llm"):
+        logger.warning("LLM unavailable, returning the project status without an analysis.")
+        return degraded_status(fresh, reused_analyses, similar_analyses), analyses
+    try:
+        openai_response = chat_with_openai_conversational(prompt)
+    except UpstreamUnavailable as e:
+        logger.warning("LLM unavailable, returning the project status without an analysis: %s", e)
+        return degraded_status(fresh, reused_analyses, similar_analyses), analyses
+    fresh_analyses = split_proposal_analyses(openai_response, fresh)
+    if len(fresh_analyses) < len(fresh):
+        logger.warning("The analysis has no section for %s of %s proposals; they are not remembered.",
+                       len(fresh) - len(fresh_analyses), len(fresh))
+    get_cache().set(cache_key, (openai_response, fresh_analyses), float(get_setting("ANALYSIS_CACHE_TTL", 600)))
+    for proposal in fresh:
+        if proposal.id in fresh_analyses:
+            remember_analysis(proposal, fresh_analyses[proposal.id])
+    return openai_response, {**analyses, **fresh_analyses}
+
+
+# Function to analyze project status
+@traced()
+def analyze_project_status(proposals, project_data, wallet_balance):
+    """
+    Generate a detailed response to the user based on the project status, proposals, and OpenAI integration.
+
+    Proposals nearly identical to earlier analyzed ones reuse that analysis instead of being sent to the LLM again
+    (see src/similarity.py); when all of them can be reused, no LLM call is made. The LLM answers with a section per
+    proposal, which is what is remembered for each of them. Analyses of identical requests are shared by all workers
+    for ANALYSIS_CACHE_TTL seconds (see src/shared_cache.py). While the LLM is unavailable (see src/resilience.py),
+    the proposals are listed with any earlier analyses instead.
+    """
+    return analyze_project_proposals(proposals, project_data, wallet_balance)[0]
+
+
+@traced()
+def analyze_new_proposal(proposal, web3, wallet_address, contract_address, abi, wallet_balance):
+    """
+    Analyze a single proposal (e.g. one the watcher found new or changed), without fetching the other proposals.
+
+    Returns (recommendation, verdict): the analysis, and "Approve", "Reject" or "Abstain" (None if it has none).
+    """
+    proposal = as_proposal(proposal)
+    project_data = {
+        'infura_url': getattr(web3.provider, 'endpoint_uri', None),
+        'contract_address': contract_address,
+        'abi': abi,
+        'wallet_address': wallet_address
+    }
+    recommendation, analyses = analyze_project_proposals([proposal], project_data, wallet_balance)
+    return recommendation, parse_verdict(analyses.get(proposal.id))
 
 
 # Function for interactive conversation loop
@@ -102,7 +259,7 @@ def interactive_conversation():
         user_input = input("You: ")
         user_inputs = get_user_inputs()
         infura_url = user_inputs['infura_url']
-        web3 = Web3(Web3.HTTPProvider(infura_url))
+        web3 = get_web3(infura_url)
 
         if not web3.is_connected():
             logger.error("Unable to connect to Infura.")
@@ -128,14 +285,15 @@ def check_wallet_balance(web3, wallet_address):
     """
     Check and return the wallet balance in ETH.
     """
-    logger.info(f"Checking wallet balance for address: {wallet_address}")
+    logger.info("Checking wallet balance for address: %s", wallet_address)
     balance_wei = web3.eth.get_balance(wallet_address)
     balance_eth = web3.from_wei(balance_wei, 'ether')
-    logger.info(f"Wallet balance: {balance_eth} ETH")
+    logger.info("Wallet balance: %s ETH", balance_eth)
     return balance_eth
 
 
 # Main proposal analysis function
+@traced()
 def analyze_proposals():
     """
     Analyze proposals and generate a chat-like response using OpenAI.
@@ -150,14 +308,19 @@ def analyze_proposals():
         infura_url = user_inputs['infura_url']
         wallet_address = user_inputs['wallet_address']
 
-        # Initialize Web3 with Infura URL
-        web3 = Web3(Web3.HTTPProvider(infura_url))
-        if not web3.is_connected():
-            logger.error("Unable to connect to Infura.")
-            raise Exception("Unable to connect to Infura.")
+        if available("rpc"):
+            # Initialize Web3 with Infura URL
+            web3 = get_web3(infura_url)
+            if not web3.is_connected():
+                logger.error("Unable to connect to Infura.")
+                raise Exception("Unable to connect to Infura.")
 
-        # Fetch wallet balance
-        wallet_balance = check_wallet_balance(web3, wallet_address)
+            # Fetch wallet balance
+            wallet_balance = check_wallet_balance(web3, wallet_address)
+        else:
+            # Analyze without the balance rather than fail while the RPC endpoint is down
+            logger.warning("RPC endpoint unavailable, analyzing proposals without the wallet balance.")
+            wallet_balance = None
 
         # Fetch active proposals using the new function from proposals.py
         proposals = fetch_active_proposals()
@@ -172,21 +335,34 @@ def analyze_proposals():
 
         # Use OpenAI to analyze and provide interactive feedback
         response = analyze_project_status(proposals, project_data, wallet_balance)
-        logger.info(f"DAO Agent: {response}")
+        logger.info("DAO Agent: %s", response)
         print(f"DAO Agent: {response}")
 
-        # Start an interactive conversation loop
-        interactive_conversation()
+        # Start an interactive conversation loop (not while serving a request)
+        if is_interactive():
+            interactive_conversation()
+        return response
+
+    except DeadlineExceeded as e:
+        # No time left to ask the LLM to explain the error
+        logger.warning("Proposal analysis cancelled: %s", e)
+        return "The proposal analysis did not finish before the request deadline. Please try again."
+
+    except UpstreamUnavailable as e:
+        # Asking the LLM to explain an outage only adds load to the upstreams
+        logger.warning("Proposal analysis unavailable: %s", e)
+        return (f"The proposal analysis is unavailable right now ({e.upstream} is not responding). "
+                f"Please try again later.")
 
     except Exception as e:
-        logger.error(f"Error during proposal analysis: {str(e)}")
+        logger.error("Error during proposal analysis: %s", e)
         user_inputs = get_user_inputs()
 
         infura_url = user_inputs['infura_url']
         wallet_address = user_inputs['wallet_address']
 
         # Initialize Web3 with Infura URL
-        web3 = Web3(Web3.HTTPProvider(infura_url))
+        web3 = get_web3(infura_url)
         if not web3.is_connected():
             logger.error("Unable to connect to Infura.")
             raise Exception("Unable to connect to Infura.")
@@ -208,9 +384,14 @@ def analyze_proposals():
             response = f"Your wallet balance is {balance} ETH."
             return response  # Directly return balance without calling OpenAI
 
+        if isinstance(e, LLMCallFailed) or not available("llm"):
+            # The LLM call itself failed (or the LLM is down), so asking it again would only fail again
+            logger.warning("Not asking the LLM to explain an error of the LLM call.")
+            return error_message
+
         # Send error response via OpenAI
         error_response = chat_with_openai_conversational(prompt)
-        logger.error(f"Error response from OpenAI: {error_response}")
+        logger.error("Error response from OpenAI: %s", error_response)
         print(error_response)
 
 
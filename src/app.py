@@ -1,33 +1,63 @@
 import os
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from theoriq import AgentConfig
 from theoriq.extra.flask import theoriq_blueprint
+from config.settings import load_environment
 from src.main import handle_new_proposal, handle_openai_queries, run_agent_theoriq
 from src.web3_integration import connect_to_web3
 from src.logging_config import setup_logger
+from src.metrics import CONTENT_TYPE_LATEST, instrument_flask, render_latest
+from src.tenants import current_tenant, register_flask
+from src import deadline
+from src import resilience
+from src import tracing
 from src.interaction import on_user_query
 
 # Set up logging
 logger = setup_logger()
 
-logger.debug(f"Environment Variables: {os.environ}")
-logger.debug(f"Current Directory Structure: {os.listdir(os.path.dirname(__file__))}")
-
 # Initialize Flask app
 app = Flask(__name__)
 
-# Load Theoriq Agent Configuration from environment
+# Record per-route latency histograms and in-flight requests, and open a trace span per request
+instrument_flask(app)
+tracing.instrument_flask(app)
+
+# Resolve the DAO configuration (tenant) of each request from its X-API-Key header; requests never prompt on stdin
+register_flask(app)
+
+# Bound each request by a deadline that every RPC, Snapshot and LLM call inherits; late requests get a 504
+deadline.register_flask(app)
+
+# Requests that fail on an upstream whose circuit breaker is open get a 503 with Retry-After
+resilience.register_flask(app)
+
+# Load Theoriq Agent Configuration from environment (including the .env file)
+load_environment()
 agent_config = AgentConfig.from_env()
 
 # Register Theoriq Blueprint with the Flask app
 app.register_blueprint(theoriq_blueprint(agent_config, run_agent_theoriq))
 
 
+def _tenant_inputs():
+    tenant = current_tenant()
+    return tenant.user_inputs if tenant is not None else {}
+
+
 @app.route("/")
 def home():
     return jsonify({"message": "Welcome to the DAO Voting Agent API"})
 
 
+@app.route("/metrics")
+def metrics():
+    """
+    Prometheus scrape endpoint.
+    """
+    return Response(render_latest(), content_type=CONTENT_TYPE_LATEST)
+
+
 @app.route("/analyze_proposal", methods=['GET', 'POST'])
 def analyze_proposal():
     """
@@ -35,14 +65,15 @@ def analyze_proposal():
     Accepts form data containing proposal info and user details.
     """
     data = request.form
-    logger.info(f"Received analyze_proposal request: {data}")
+    logger.info("Received analyze_proposal request: %s", data)
 
-    # Extracting necessary information
+    # Extracting necessary information (missing fields default to the tenant's configuration)
+    tenant_inputs = _tenant_inputs()
     proposal = request.form.get("proposal")
-    user_wallet_address = request.form.get("wallet_address")
-    contract_address = request.form.get("contract_address")
-    abi = request.form.get("abi")
-    infura_url = request.form.get("infura_url")
+    user_wallet_address = request.form.get("wallet_address") or tenant_inputs.get("wallet_address")
+    contract_address = request.form.get("contract_address") or tenant_inputs.get("contract_address")
+    abi = request.form.get("abi") or tenant_inputs.get("abi")
+    infura_url = request.form.get("infura_url") or tenant_inputs.get("infura_url")
 
     # Ensure the Ethereum Network provider URL is provided
     if not infura_url:
@@ -53,7 +84,7 @@ def analyze_proposal():
 
     # Handle the proposal
     response = handle_new_proposal(proposal, web3, user_wallet_address, contract_address, abi)
-    logger.info(f"analyze_proposal response: {response}")
+    logger.info("analyze_proposal response: %s", response)
 
     return jsonify({"response": response})
 
@@ -64,17 +95,18 @@ def openai_query():
     Endpoint for handling OpenAI conversational queries.
     """
     data = request.form
-    logger.info(f"Received openai_query request: {data}")
+    logger.info("Received openai_query request: %s", data)
 
+    tenant_inputs = _tenant_inputs()
     user_input = request.form.get("query")
-    infura_url = request.form.get("infura_url")
+    infura_url = request.form.get("infura_url") or tenant_inputs.get("infura_url")
     web3 = connect_to_web3(infura_url)
-    wallet_address = request.form.get("wallet_address")
+    wallet_address = request.form.get("wallet_address") or tenant_inputs.get("wallet_address")
     submitted_proposals = request.form.get("submitted_proposals", [])
 
     # Handle the OpenAI query
     response = handle_openai_queries(user_input, web3, wallet_address, submitted_proposals)
-    logger.info(f"openai_query response: {response}")
+    logger.info("openai_query response: %s", response)
 
     return jsonify({"response": response})
 
@@ -89,13 +121,13 @@ def process_user_query():
 # Centralized error handling
 @app.errorhandler(500)
 def handle_internal_server_error(error):
-    app.logger.error(f"Internal Server Error: {str(error)}")
+    app.logger.error("Internal Server Error: %s", error)
     return jsonify({"error": "Internal Server Error"}), 500
 
 
 @app.errorhandler(404)
 def handle_not_found(error):
-    app.logger.warning(f"404 error occurred: {error}")
+    app.logger.warning("404 error occurred: %s", error)
     return jsonify({"error": "Resource Not Found"}), 404
 
 
@@ -0,0 +1,387 @@
+"""
+Local archive of proposals, our verdicts on them and the votes we cast.
+
+handle_new_proposal records each proposal it analyzes together with the recommendation, and cast_vote records every
+vote it broadcasts, so "show my proposals" is answered from server-side history instead of a list sent by the
+client. The archive is an SQLite database at ARCHIVE_DB; archiving is off while ARCHIVE_DB is not set:
+
+- proposals: one row per (tenant, source, proposal id), updated in place when the proposal changes. Indexed by space,
+  proposer and state (each ordered by end time) and by end time alone.
+- verdicts and votes: append-only, indexed by proposal, and votes also by voter.
+- proposals_fts: an FTS5 index over titles and bodies, kept in sync by triggers.
+- analyses: LLM analyses with the MinHash signature of the analyzed proposal (see src/similarity.py).
+
+Listings are paginated with keyset cursors (the position of the last row returned), so a page deep into the history
+costs the same as the first one. Every row is scoped to the current tenant (src/tenants.py). Measure query latency
+with:
+  python -m benchmarks.archive_queries --proposals 300000
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+from config.settings import get_setting
+from src.logging_config import setup_logger
+from src.metrics import track_upstream
+from src.tenants import current_tenant
+
+# Set up logging
+logger = setup_logger()
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS proposals (
+    pk INTEGER PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    source TEXT NOT NULL,
+    proposal_id TEXT NOT NULL,
+    space TEXT,
+    proposer TEXT,
+    state TEXT,
+    title TEXT,
+    body TEXT,
+    choices TEXT,
+    start_time INTEGER,
+    end_time INTEGER NOT NULL DEFAULT 0,
+    fingerprint TEXT,
+    updated_at INTEGER NOT NULL,
+    UNIQUE (tenant, source, proposal_id)
+);
+CREATE INDEX IF NOT EXISTS proposals_by_space ON proposals (tenant, space, end_time, pk);
+CREATE INDEX IF NOT EXISTS proposals_by_proposer ON proposals (tenant, proposer, end_time, pk);
+CREATE INDEX IF NOT EXISTS proposals_by_state ON proposals (tenant, state, end_time, pk);
+CREATE INDEX IF NOT EXISTS proposals_by_end ON proposals (tenant, end_time, pk);
+
+CREATE TABLE IF NOT EXISTS verdicts (
+    pk INTEGER PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    source TEXT NOT NULL,
+    proposal_id TEXT NOT NULL,
+    recommendation TEXT,
+    analysis TEXT,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS verdicts_by_proposal ON verdicts (tenant, source, proposal_id, pk);
+
+CREATE TABLE IF NOT EXISTS votes (
+    pk INTEGER PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    source TEXT NOT NULL,
+    proposal_id TEXT NOT NULL,
+    voter TEXT NOT NULL,
+    choice TEXT,
+    tx_hash TEXT,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS votes_by_voter ON votes (tenant, voter, pk);
+CREATE INDEX IF NOT EXISTS votes_by_proposal ON votes (tenant, source, proposal_id, pk);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    pk INTEGER PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    source TEXT,
+    proposal_id TEXT,
+    title TEXT,
+    analysis TEXT,
+    signature BLOB NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_by_tenant ON analyses (tenant, pk);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS proposals_fts USING fts5(title, body, content='proposals', content_rowid='pk');
+CREATE TRIGGER IF NOT EXISTS proposals_fts_insert AFTER INSERT ON proposals BEGIN
+    INSERT INTO proposals_fts (rowid, title, body) VALUES (new.pk, new.title, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS proposals_fts_delete AFTER DELETE ON proposals BEGIN
+    INSERT INTO proposals_fts (proposals_fts, rowid, title, body) VALUES ('delete', old.pk, old.title, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS proposals_fts_update AFTER UPDATE OF title, body ON proposals
+WHEN old.title IS NOT new.title OR old.body IS NOT new.body BEGIN
+    INSERT INTO proposals_fts (proposals_fts, rowid, title, body) VALUES ('delete', old.pk, old.title, old.body);
+    INSERT INTO proposals_fts (rowid, title, body) VALUES (new.pk, new.title, new.body);
+END;
+"""
+
+# Unchanged proposals (same fingerprint and state) are left alone, so re-recording them does not touch the FTS index
+UPSERT_PROPOSAL = """
+INSERT INTO proposals (tenant, source, proposal_id, space, proposer, state, title, body, choices, start_time,
+                       end_time, fingerprint, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (tenant, source, proposal_id) DO UPDATE SET
+    space = coalesce(excluded.space, space), proposer = coalesce(excluded.proposer, proposer),
+    state = coalesce(excluded.state, state), title = excluded.title, body = excluded.body, choices = excluded.choices,
+    start_time = excluded.start_time, end_time = excluded.end_time, fingerprint = excluded.fingerprint,
+    updated_at = excluded.updated_at
+WHERE fingerprint IS NOT excluded.fingerprint OR (excluded.state IS NOT NULL AND state IS NOT excluded.state)
+"""
+
+# Columns of proposal listings (bodies are left out) with the latest verdict on each proposal
+PROPOSAL_COLUMNS = """
+p.pk, p.source, p.proposal_id AS id, p.space, p.proposer, p.state, p.title, p.start_time, p.end_time,
+(SELECT v.recommendation FROM verdicts v WHERE v.tenant = p.tenant AND v.source = p.source
+ AND v.proposal_id = p.proposal_id ORDER BY v.pk DESC LIMIT 1) AS recommendation
+"""
+
+
+def _address(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+def _page_size(limit):
+    return max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+
+
+def _match_expression(text):
+    """
+    FTS5 query matching all words of free text (each word quoted, so user input cannot break the query syntax).
+    """
+    return " ".join('"{}"'.format(word.replace('"', '""')) for word in text.split())
+
+
+class Archive:
+    """
+    SQLite-backed archive with one connection per thread (and per process, so it is safe to use after a fork).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.executescript(SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.row_factory = sqlite3.Row
+            # WAL lets readers in other workers proceed while a vote or verdict is written
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _query(self, operation, sql, params):
+        with track_upstream("archive", operation):
+            return [dict(row) for row in self._connection().execute(sql, params)]
+
+    # Writes
+
+    def record_proposals(self, proposals, tenant_id="", space=None):
+        """
+        Insert or update Proposal objects in one transaction.
+        """
+        now = int(time.time())
+        rows = [
+            (tenant_id, proposal.source, str(proposal.id), proposal.space or space, _address(proposal.author),
+             proposal.state, proposal.title, proposal.body, json.dumps(list(proposal.choices)), proposal.start,
+             proposal.end or 0, proposal.fingerprint(), now)
+            for proposal in proposals
+        ]
+        with track_upstream("archive", "record_proposals"):
+            with self._connection() as connection:
+                connection.executemany(UPSERT_PROPOSAL, rows)
+        return len(rows)
+
+    def record_verdict(self, proposal, recommendation, analysis=None, tenant_id="", space=None):
+        """
+        Record a proposal and our recommendation on it.
+        """
+        with track_upstream("archive", "record_verdict"):
+            with self._connection() as connection:
+                connection.execute(UPSERT_PROPOSAL, (
+                    tenant_id, proposal.source, str(proposal.id), proposal.space or space, _address(proposal.author),
+                    proposal.state, proposal.title, proposal.body, json.dumps(list(proposal.choices)), proposal.start,
+                    proposal.end or 0, proposal.fingerprint(), int(time.time())))
+                connection.execute(
+                    "INSERT INTO verdicts (tenant, source, proposal_id, recommendation, analysis, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (tenant_id, proposal.source, str(proposal.id), recommendation, analysis, int(time.time())))
+
+    def record_vote(self, proposal_id, voter, choice, tx_hash=None, source="onchain", tenant_id=""):
+        with track_upstream("archive", "record_vote"):
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT INTO votes (tenant, source, proposal_id, voter, choice, tx_hash, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (tenant_id, source, str(proposal_id), _address(voter), choice, tx_hash, int(time.time())))
+
+    def record_analysis(self, proposal, analysis, signature, tenant_id=""):
+        """
+        Store an analysis with the signature of the proposal it covers; returns its pk.
+        """
+        with track_upstream("archive", "record_analysis"):
+            with self._connection() as connection:
+                return connection.execute(
+                    "INSERT INTO analyses (tenant, source, proposal_id, title, analysis, signature, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (tenant_id, proposal.source, str(proposal.id), proposal.title, analysis, signature,
+                     int(time.time()))).lastrowid
+
+    # Queries
+
+    def analysis_signatures(self, tenant_id=""):
+        """
+        (pk, signature) of every stored analysis of a tenant, oldest first.
+        """
+        with track_upstream("archive", "analysis_signatures"):
+            return self._connection().execute("SELECT pk, signature FROM analyses WHERE tenant = ? ORDER BY pk",
+                                              (tenant_id,)).fetchall()
+
+    def get_analyses(self, pks):
+        """
+        Stored analyses by pk: {pk: {"title": ..., "analysis": ...}}.
+        """
+        if not pks:
+            return {}
+        rows = self._query("get_analyses", f"SELECT pk, title, analysis FROM analyses "
+                                           f"WHERE pk IN ({', '.join('?' * len(pks))})", list(pks))
+        return {row['pk']: row for row in rows}
+
+    def list_proposals(self, tenant_id="", space=None, proposer=None, state=None, ends_after=None, ends_before=None,
+                       limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        Proposals matching the filters, latest end time first. Returns (rows, cursor of the next page or None).
+        """
+        limit = _page_size(limit)
+        conditions = ["p.tenant = ?"]
+        params = [tenant_id]
+        for column, value in (("space", space), ("proposer", _address(proposer)), ("state", state)):
+            if value is not None:
+                conditions.append(f"p.{column} = ?")
+                params.append(value)
+        if ends_after is not None:
+            conditions.append("p.end_time >= ?")
+            params.append(ends_after)
+        if ends_before is not None:
+            conditions.append("p.end_time < ?")
+            params.append(ends_before)
+        if cursor:
+            end_time, pk = (int(part) for part in cursor.split(":"))
+            conditions.append("(p.end_time, p.pk) < (?, ?)")
+            params.extend((end_time, pk))
+
+        rows = self._query("list_proposals", f"SELECT {PROPOSAL_COLUMNS} FROM proposals p "
+                                             f"WHERE {' AND '.join(conditions)} "
+                                             f"ORDER BY p.end_time DESC, p.pk DESC LIMIT ?", params + [limit])
+        next_cursor = f"{rows[-1]['end_time']}:{rows[-1]['pk']}" if len(rows) == limit else None
+        return rows, next_cursor
+
+    def list_votes(self, voter, tenant_id="", limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        Votes cast by `voter` with the proposal titles, latest first. Returns (rows, next cursor or None).
+        """
+        limit = _page_size(limit)
+        conditions = "v.tenant = ? AND v.voter = ?" + (" AND v.pk < ?" if cursor else "")
+        params = [tenant_id, _address(voter)] + ([int(cursor)] if cursor else [])
+        rows = self._query("list_votes",
+                           "SELECT v.pk, v.source, v.proposal_id AS id, v.choice, v.tx_hash, v.created_at, p.title "
+                           "FROM votes v LEFT JOIN proposals p ON p.tenant = v.tenant AND p.source = v.source "
+                           f"AND p.proposal_id = v.proposal_id WHERE {conditions} ORDER BY v.pk DESC LIMIT ?",
+                           params + [limit])
+        return rows, (str(rows[-1]['pk']) if len(rows) == limit else None)
+
+    def search(self, text, tenant_id="", limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        Full-text search over titles and bodies, most recently archived first. Returns (rows, next cursor or None).
+        """
+        expression = _match_expression(text)
+        if not expression:
+            return [], None
+        limit = _page_size(limit)
+        conditions = "proposals_fts MATCH ? AND p.tenant = ?" + (" AND f.rowid < ?" if cursor else "")
+        params = [expression, tenant_id] + ([int(cursor)] if cursor else [])
+        rows = self._query("search",
+                           f"SELECT {PROPOSAL_COLUMNS}, snippet(proposals_fts, 1, '[', ']', '...', 12) AS snippet "
+                           f"FROM proposals_fts f JOIN proposals p ON p.pk = f.rowid WHERE {conditions} "
+                           f"ORDER BY f.rowid DESC LIMIT ?", params + [limit])
+        return rows, (str(rows[-1]['pk']) if len(rows) == limit else None)
+
+
+@lru_cache(maxsize=None)
+def get_archive():
+    """
+    Return the process-wide archive (opened on first use), or None if ARCHIVE_DB is not set.
+    """
+    path = get_setting("ARCHIVE_DB")
+    if not path:
+        logger.info("ARCHIVE_DB is not set; proposals, verdicts and votes are not archived")
+        return None
+    logger.info("Opening proposal archive %s", path)
+    return Archive(path)
+
+
+def _scope():
+    """
+    (tenant id, DAO space) of the current request, read without prompting for inputs.
+    """
+    tenant = current_tenant()
+    if tenant is not None:
+        return tenant.tenant_id, tenant.space
+
+    from src import web3_integration
+
+    return "", (web3_integration.user_inputs_cache or {}).get("space")
+
+
+def record_verdict(proposal, recommendation, analysis=None):
+    """
+    Archive a handled proposal and our recommendation. Archive errors are logged and never fail the caller.
+    """
+    archive = get_archive()
+    if archive is None:
+        return
+    tenant_id, space = _scope()
+    try:
+        archive.record_verdict(proposal, recommendation, analysis, tenant_id=tenant_id, space=space)
+    except sqlite3.Error as e:
+        logger.warning("Could not archive the verdict on proposal %s: %s", proposal.id, e)
+
+
+def record_vote(proposal_id, voter, choice, tx_hash=None, source="onchain"):
+    """
+    Archive a cast vote. Archive errors are logged and never fail the caller.
+    """
+    archive = get_archive()
+    if archive is None:
+        return
+    try:
+        archive.record_vote(proposal_id, voter, choice, tx_hash, source=source, tenant_id=_scope()[0])
+    except sqlite3.Error as e:
+        logger.warning("Could not archive the vote on proposal %s: %s", proposal_id, e)
+
+
+def my_proposals_summary(wallet_address, limit=10):
+    """
+    Text listing of the proposals submitted by a wallet and the votes it cast, or None if the archive has neither (or
+    cannot be read, e.g. while it is locked). Callers then fall back to the list sent by the client.
+    """
+    archive = get_archive()
+    if archive is None or not wallet_address:
+        return None
+    tenant_id = _scope()[0]
+    voter = getattr(wallet_address, 'address', wallet_address)
+    try:
+        proposals, _ = archive.list_proposals(tenant_id, proposer=voter, limit=limit)
+        votes, _ = archive.list_votes(voter, tenant_id, limit=limit)
+    except sqlite3.Error as e:
+        logger.warning("Could not read the proposals of %s from the archive: %s", voter, e)
+        return None
+    if not proposals and not votes:
+        return None
+
+    lines = []
+    if proposals:
+        lines.append("Here are your submitted proposals:")
+        lines.extend(f"- {row['title']} ({row['state'] or 'unknown state'}"
+                     f"{', recommendation: ' + row['recommendation'] if row['recommendation'] else ''})"
+                     for row in proposals)
+    if votes:
+        lines.append("Your recent votes:")
+        lines.extend(f"- {row['title'] or 'Proposal ' + row['id']}: {row['choice']}" for row in votes)
+    return "\n".join(lines)
@@ -0,0 +1,36 @@
+"""
+ASGI entry point for the DAO Voting Agent API.
+
+Serves exactly the same routes as the Flask app in src/app.py (including the Theoriq execute route), but on an
+async server so that one process can keep many requests in flight while they wait on Infura, Snapshot and OpenAI.
+
+No route handler is async: a2wsgi runs the synchronous Flask handlers on a pool of ASGI_THREADS threads, so requests
+in flight are bounded by that pool, as they are for gunicorn's gthread workers with the same --threads. What the
+async server adds is cheap handling of idle and slow client connections on the event loop.
+
+Run it with:
+  uvicorn src.asgi:app --host 0.0.0.0 --port 8000
+or, under gunicorn's process manager:
+  gunicorn -k uvicorn.workers.UvicornWorker src.asgi:app
+"""
+from a2wsgi import WSGIMiddleware
+
+from config.settings import get_setting
+from src.app import app as flask_app
+
+# Number of request handler threads per process. The route handlers spend nearly all of their time blocked on
+# network I/O (which releases the GIL), so this is effectively the number of in-flight requests per process.
+ASGI_THREADS = int(get_setting("ASGI_THREADS", 100))
+
+# Number of response chunks buffered per request before the handler thread waits for the event loop
+ASGI_SEND_QUEUE_SIZE = int(get_setting("ASGI_SEND_QUEUE_SIZE", 10))
+
+# ASGI application wrapping the Flask app
+app = WSGIMiddleware(flask_app, workers=ASGI_THREADS, send_queue_size=ASGI_SEND_QUEUE_SIZE)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    port = int(get_setting("PORT", 8000))
+    uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,241 @@
+"""
+Headless batch runner for fleets of DAOs.
+
+Runs fetch -> analyze -> (optionally) vote for every DAO and wallet in a manifest, without prompting on stdin:
+  python -m src.batch manifest.yaml --workers 8 --vote --output report.json
+
+The manifest uses the TENANTS_FILE format (JSON, YAML or SQLite, see src/tenants.py), one entry per DAO. An entry
+can list several wallets in `wallet_addresses`, and each (DAO, wallet) pair becomes one job.
+
+- Jobs run in a process pool (--workers, default: one per CPU). The jobs mostly wait on RPC and LLM calls, so more
+  workers than CPUs is fine for large sweeps.
+- Each finished job is appended to a JSONL checkpoint (--checkpoint). Running the same command again skips the jobs
+  that already succeeded and retries the failed ones; --restart starts over.
+- Votes are only cast with --vote, following the verdict of each proposal's analysis (Approve: yes, Reject: no,
+  Abstain: abstain); proposals without a verdict are not voted on. On-chain proposals are voted on by transaction,
+  Snapshot proposals by signed message (see src/snapshot_voting.py) when the wallet's key is in SNAPSHOT_SIGNER_KEYS.
+  Votes that fail are listed in the job's vote_errors and do not fail the job, so a resumed run does not vote twice.
+- --job-timeout bounds each job like a request deadline (src/deadline.py), so a hung upstream cannot stall a worker.
+- The summary report (stdout and --output) counts jobs, proposals and votes and lists the failures.
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.logging_config import setup_logger
+from src.tenants import load_entries
+
+# Set up logging
+logger = setup_logger()
+
+
+def build_jobs(entries):
+    """
+    One job per (DAO, wallet): {"job_id", "entry"} where entry is a tenant entry with a single wallet_address.
+    """
+    jobs = []
+    for entry in entries:
+        wallets = entry.get("wallet_addresses") or [entry.get("wallet_address")]
+        if isinstance(wallets, str):
+            wallets = [wallets]
+        for wallet in wallets:
+            job_entry = {key: value for key, value in entry.items() if key != "wallet_addresses"}
+            job_entry["wallet_address"] = wallet
+            jobs.append({"job_id": f"{entry['id']}:{wallet or '-'}", "entry": job_entry})
+    return jobs
+
+
+def read_checkpoint(path):
+    """
+    Latest result of each job recorded in a checkpoint file ({job_id: result}).
+    """
+    results = {}
+    if not path or not os.path.exists(path):
+        return results
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                result = json.loads(line)
+            except ValueError:
+                # A line cut short by an interrupted run
+                logger.warning("Skipping an unreadable checkpoint line in %s", path)
+                continue
+            results[result["job_id"]] = result
+    return results
+
+
+def _init_worker():
+    # fetch_active_proposals and friends print progress for interactive use
+    sys.stdout = open(os.devnull, "w")
+
+
+def run_job(job, vote=False, job_timeout=None):
+    """
+    Fetch, analyze and optionally vote for one DAO and wallet. Runs in a worker process; returns a result dict.
+    """
+    from src.analyze import VERDICT_VOTES, analyze_project_proposals, parse_verdict
+    from src.archive import record_verdict
+    from src.deadline import deadline
+    from src.proposal_model import as_proposal
+    from src.proposals import fetch_active_proposals
+    from src.tenants import Tenant, use_tenant
+    from src.snapshot_voting import SnapshotVote, can_sign_snapshot_votes, cast_snapshot_votes, choice_number
+    from src.web3_integration import cast_vote, get_wallet_balance
+
+    started = time.perf_counter()
+    result = {"job_id": job["job_id"], "status": "ok", "proposals": 0, "votes": [], "analysis": None}
+    try:
+        tenant = Tenant.from_dict(job["entry"])
+        with use_tenant(tenant), (deadline(job_timeout) if job_timeout else contextlib.nullcontext()):
+            fetched = fetch_active_proposals()
+            if not isinstance(fetched, (list, tuple)):
+                # e.g. the count from proposalCount, when it comes before proposals/getProposal in the ABI
+                raise ValueError(f"Expected a list of proposals, got {type(fetched).__name__} {fetched!r}: list "
+                                 f"proposals or getProposal first among the ABI's proposal functions.")
+            proposals = [as_proposal(proposal) for proposal in fetched]
+            result["proposals"] = len(proposals)
+
+            balance = None
+            if tenant.infura_url and tenant.wallet_address:
+                balance = get_wallet_balance(tenant.web3, tenant.wallet_address)
+            project_data = {
+                'infura_url': tenant.infura_url,
+                'contract_address': tenant.contract_address,
+                'abi': tenant.abi,
+                'wallet_address': tenant.wallet_address
+            }
+            recommendation, analyses = analyze_project_proposals(proposals, project_data, balance)
+            result["analysis"] = recommendation
+            verdicts = {}
+            for proposal in proposals:
+                analysis = analyses.get(proposal.id)
+                verdicts[proposal.id] = parse_verdict(analysis)
+                record_verdict(proposal, verdicts[proposal.id], analysis)
+            result["verdicts"] = {str(proposal_id): verdict for proposal_id, verdict in verdicts.items()}
+
+            if vote and tenant.wallet_address:
+                # A failed vote is recorded rather than failing the job, so a resumed run does not vote again
+                result["vote_errors"] = []
+                snapshot_votes = []
+                can_sign = can_sign_snapshot_votes(tenant.wallet_address)
+                for proposal in proposals:
+                    vote_choice = VERDICT_VOTES.get(verdicts[proposal.id])
+                    if vote_choice is None:
+                        logger.info("No verdict on proposal %s, not voting on it.", proposal.id)
+                        continue
+                    try:
+                        if proposal.source == "snapshot":
+                            if can_sign:
+                                snapshot_votes.append(SnapshotVote(
+                                    tenant.wallet_address, proposal.space or tenant.space, proposal.id,
+                                    choice_number(vote_choice, proposal.choices)))
+                        elif tenant.contract_address:
+                            tx_hash = cast_vote(tenant.web3, tenant.wallet_address, tenant.contract_address,
+                                                tenant.abi, proposal.id, vote_choice)
+                            result["votes"].append({"proposal_id": str(proposal.id), "choice": vote_choice,
+                                                    "tx_hash": tx_hash})
+                    except Exception as e:
+                        result["vote_errors"].append({"proposal_id": str(proposal.id), "error": str(e)})
+                # Snapshot votes are signed together and submitted concurrently, without gas
+                for vote_result in cast_snapshot_votes(snapshot_votes):
+                    if "error" in vote_result:
+                        result["vote_errors"].append({"proposal_id": vote_result["proposal_id"],
+                                                      "error": str(vote_result["error"])})
+                        continue
+                    result["votes"].append({"proposal_id": vote_result["proposal_id"], "choice": vote_result["choice"],
+                                            "receipt": vote_result["receipt"]})
+    except Exception as e:
+        logger.error("Batch job %s failed: %s", job["job_id"], e)
+        result.update(status="error", error=str(e))
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def summarize(results, skipped, wall_seconds):
+    durations = [result["seconds"] for result in results]
+    failures = [{"job_id": result["job_id"], "error": result.get("error")}
+                for result in results if result["status"] != "ok"]
+    return {
+        "jobs": len(results) + skipped,
+        "ran": len(results),
+        "succeeded": len(results) - len(failures),
+        "failed": len(failures),
+        "skipped_from_checkpoint": skipped,
+        "proposals": sum(result["proposals"] for result in results),
+        "votes_cast": sum(len(result["votes"]) for result in results),
+        "vote_errors": sum(len(result.get("vote_errors", [])) for result in results),
+        "wall_seconds": round(wall_seconds, 2),
+        "jobs_per_minute": round(len(results) / wall_seconds * 60, 1) if wall_seconds else None,
+        "job_seconds_p50": round(statistics.median(durations), 3) if durations else None,
+        "job_seconds_max": round(max(durations), 3) if durations else None,
+        "failures": failures,
+    }
+
+
+def run_batch(jobs, workers=None, checkpoint=None, vote=False, restart=False, job_timeout=None):
+    """
+    Run jobs in a process pool, appending each result to the checkpoint. Returns the summary report.
+    """
+    if restart and checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    done = read_checkpoint(checkpoint)
+    pending = [job for job in jobs if done.get(job["job_id"], {}).get("status") != "ok"]
+    skipped = len(jobs) - len(pending)
+    logger.info("Batch run: %s jobs, %s already done, %s workers", len(jobs), skipped, workers or os.cpu_count())
+
+    started = time.perf_counter()
+    results = []
+    with contextlib.ExitStack() as stack:
+        log = stack.enter_context(open(checkpoint, "a")) if checkpoint else None
+        pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers, initializer=_init_worker))
+        futures = {pool.submit(run_job, job, vote, job_timeout): job for job in pending}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process died (e.g. killed for memory); record the job as failed
+                result = {"job_id": futures[future]["job_id"], "status": "error", "error": str(e), "proposals": 0,
+                          "votes": [], "seconds": 0.0}
+            results.append(result)
+            if log is not None:
+                log.write(json.dumps(result, default=str) + "\n")
+                log.flush()
+                os.fsync(log.fileno())
+            logger.info("Batch job %s: %s (%s/%s)", result["job_id"], result["status"], len(results), len(pending))
+    return summarize(results, skipped, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("manifest", help="DAOs and wallets to process (JSON, YAML or SQLite, TENANTS_FILE format)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: CPUs)")
+    parser.add_argument("--checkpoint", default="batch_checkpoint.jsonl", help="JSONL file of finished jobs")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and run every job")
+    parser.add_argument("--vote", action="store_true", help="Vote on the proposals as analyzed")
+    parser.add_argument("--job-timeout", type=float, help="Seconds each DAO and wallet job may take")
+    parser.add_argument("--output", help="Write the summary report to this file")
+    args = parser.parse_args()
+
+    jobs = build_jobs(load_entries(args.manifest))
+    report = run_batch(jobs, args.workers, args.checkpoint, vote=args.vote, restart=args.restart,
+                       job_timeout=args.job_timeout)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+    if report["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
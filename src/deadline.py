@@ -0,0 +1,118 @@
+"""
+Per-request deadlines, propagated to every upstream call.
+
+A deadline is set where a request enters the agent (each Flask request, each Theoriq execution, each batch job) and
+kept in a context variable. Every JSON-RPC, Snapshot GraphQL and LLM call takes its timeout from upstream_timeout():
+the time left until the deadline, capped at UPSTREAM_TIMEOUT (default 30 s), so no call can hang indefinitely even
+outside a request. Once the deadline has passed, upstream_timeout() and check() raise DeadlineExceeded, which
+cancels the remaining work; loops over proposals stop there and return the results gathered so far.
+
+- REQUEST_DEADLINE: Seconds a Flask or Theoriq request may take (default 60). Keep it below the gunicorn timeout,
+  so a hung upstream releases the worker instead of getting it killed.
+- Clients can ask for a shorter deadline with the X-Request-Timeout header (seconds).
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from config.settings import get_setting
+from src.logging_config import setup_logger
+
+# Set up logging
+logger = setup_logger()
+
+DEADLINE_HEADER = "X-Request-Timeout"
+
+# Absolute time.monotonic() deadline of the current request, or None
+_deadline = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    The current request ran out of time.
+    """
+
+
+def remaining():
+    """
+    Seconds left until the current deadline (negative once it has passed), or None without a deadline.
+    """
+    current = _deadline.get()
+    return None if current is None else current - time.monotonic()
+
+
+def expired():
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check(operation=None):
+    """
+    Raise DeadlineExceeded if the current deadline has passed.
+    """
+    if expired():
+        raise DeadlineExceeded(f"Request deadline exceeded{' before ' + operation if operation else ''}.")
+
+
+def upstream_timeout(default=None):
+    """
+    Timeout (seconds) for one upstream call: the time left until the deadline, capped at UPSTREAM_TIMEOUT.
+    """
+    timeout = float(default or get_setting("UPSTREAM_TIMEOUT", 30))
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded before an upstream call.")
+    return min(timeout, left)
+
+
+def request_deadline():
+    return float(get_setting("REQUEST_DEADLINE", 60))
+
+
+@contextmanager
+def deadline(seconds):
+    """
+    Run a block with a deadline `seconds` from now (a nested deadline never extends an outer one).
+    """
+    current = _deadline.get()
+    new_deadline = time.monotonic() + seconds
+    token = _deadline.set(new_deadline if current is None else min(current, new_deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def register_flask(app):
+    """
+    Give each Flask request a deadline of REQUEST_DEADLINE seconds (or less, from the X-Request-Timeout header).
+
+    Requests that run out of time get a 504 response.
+    """
+    from flask import g, jsonify, request
+
+    @app.before_request
+    def _set_deadline():
+        seconds = request_deadline()
+        requested = request.headers.get(DEADLINE_HEADER)
+        if requested:
+            try:
+                seconds = min(seconds, max(0.0, float(requested)))
+            except ValueError:
+                logger.warning("Ignoring invalid %s header: %s", DEADLINE_HEADER, requested)
+        g.deadline_token = _deadline.set(time.monotonic() + seconds)
+
+    @app.teardown_request
+    def _clear_deadline(error=None):
+        token = g.pop("deadline_token", None)
+        if token is not None:
+            _deadline.reset(token)
+
+    @app.errorhandler(DeadlineExceeded)
+    def _deadline_exceeded(error):
+        logger.warning("Request %s exceeded its deadline: %s", request.path, error)
+        return jsonify({"error": "Request deadline exceeded"}), 504
+
+    return app
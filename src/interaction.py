@@ -2,7 +2,10 @@ from src.web3_integration import get_wallet_balance, cast_vote, connect_to_web3,
 from src.proposals import fetch_active_proposals
 from src.agent import handle_new_proposal
 from src.analyze import analyze_proposals
+from src.deadline import DeadlineExceeded, expired
 from src.logging_config import setup_logger
+from src.snapshot_voting import is_snapshot_proposal_id
+from src.tracing import traced
 
 # Set up logging
 logger = setup_logger()
@@ -16,7 +19,7 @@ def extract_proposal_id(user_query):
     for i, word in enumerate(words):
         if word.lower() == "proposal" and i + 1 < len(words):
             proposal_id = words[i + 1]
-            logger.info(f"Extracted proposal ID: {proposal_id}")
+            logger.info("Extracted proposal ID: %s", proposal_id)
             return proposal_id
     logger.warning("No proposal ID found in the query.")
     return None
@@ -35,18 +38,23 @@ def extract_vote_choice(user_query):
     query_lower = user_query.lower()
     for keyword, vote in vote_keywords.items():
         if keyword in query_lower:
-            logger.info(f"Vote choice extracted: {vote} (based on keyword '{keyword}')")
+            logger.info("Vote choice extracted: %s (based on keyword '%s')", vote, keyword)
             return vote
 
     logger.error("Invalid vote choice. Please specify 'for', 'against', or 'abstain'.")
     raise ValueError("Invalid vote choice. Please specify 'for', 'against', or 'abstain'.")
 
 
+@traced()
 def on_user_query(user_query):
     """
     Responds to user queries about proposals, balance, and casting votes.
+
+    Returns the responses gathered; if the request deadline passes while proposals are being handled, the remaining
+    proposals are skipped and the responses so far are returned.
     """
-    logger.info(f"User query received: {user_query}")
+    logger.info("User query received: %s", user_query)
+    responses = []
 
     # Getting the necessary user inputs from web3_integration
     user_inputs = get_user_inputs()
@@ -58,32 +66,45 @@ def on_user_query(user_query):
     # Establishing Web3 connection
     try:
         web3 = connect_to_web3(infura_url)
-        logger.info(f"Connected to Web3 with Infura URL: {infura_url}")
+        logger.info("Connected to Web3 with Infura URL: %s", infura_url)
     except Exception as e:
-        logger.error(f"Error connecting to Web3: {e}")
-        return
+        logger.error("Error connecting to Web3: %s", e)
+        return "Could not connect to the Ethereum network."
 
     if "proposal" in user_query.lower():
         try:
             logger.info("Fetching active proposals...")
             proposals = fetch_active_proposals()
             if proposals:
-                logger.info(f"{len(proposals)} proposals fetched successfully.")
-                for proposal in proposals:
+                logger.info("%s proposals fetched successfully.", len(proposals))
+                for handled, proposal in enumerate(proposals):
+                    if expired():
+                        logger.warning("Deadline passed after %s of %s proposals.", handled, len(proposals))
+                        responses.append(f"Stopped after {handled} of {len(proposals)} proposals: "
+                                         f"the request deadline passed.")
+                        break
                     response = handle_new_proposal(proposal, web3, wallet_address, contract_address, abi)
-                    logger.info(f"Response: {response}")
+                    logger.info("Response: %s", response)
+                    responses.append(response)
             else:
                 logger.warning("No active proposals found.")
+                responses.append("No active proposals found.")
+        except DeadlineExceeded as e:
+            logger.warning("Proposal handling cancelled: %s", e)
+            responses.append("The request deadline passed before all proposals were handled.")
         except Exception as e:
-            logger.error(f"Error fetching proposals: {e}")
+            logger.error("Error fetching proposals: %s", e)
+            responses.append("An error occurred while fetching proposals.")
 
     elif "balance" in user_query.lower():
         try:
-            logger.info(f"Fetching balance for wallet: {wallet_address}")
+            logger.info("Fetching balance for wallet: %s", wallet_address)
             balance = get_wallet_balance(web3, wallet_address)
-            logger.info(f"Wallet balance: {balance} ETH")
+            logger.info("Wallet balance: %s ETH", balance)
+            responses.append(f"Your wallet balance is: {balance} ETH")
         except Exception as e:
-            logger.error(f"Error fetching wallet balance: {e}")
+            logger.error("Error fetching wallet balance: %s", e)
+            responses.append("An error occurred while fetching your wallet balance.")
 
     elif "vote" in user_query.lower():
         try:
@@ -92,19 +113,30 @@ def on_user_query(user_query):
             vote_choice = extract_vote_choice(user_query)
 
             if proposal_id and vote_choice:
-                logger.info(f"Casting vote for proposal ID {proposal_id} with choice {vote_choice}")
-                cast_vote(web3, wallet_address, contract_address, abi, proposal_id, vote_choice)
-                logger.info(f"Vote successfully cast for proposal {proposal_id}.")
+                logger.info("Casting vote for proposal ID %s with choice %s", proposal_id, vote_choice)
+                tx_hash = cast_vote(web3, wallet_address, contract_address, abi, proposal_id, vote_choice)
+                logger.info("Vote successfully cast for proposal %s.", proposal_id)
+                receipt = "Snapshot receipt" if is_snapshot_proposal_id(proposal_id) else "Transaction hash"
+                responses.append(f"Vote '{vote_choice}' cast for proposal {proposal_id}. {receipt}: {tx_hash}")
             else:
                 logger.warning("Could not determine proposal ID or vote choice from query.")
+                responses.append("Please name the proposal to vote on, e.g. 'vote for proposal 3'.")
         except ValueError as ve:
-            logger.error(f"ValueError: {ve}")
+            logger.error("ValueError: %s", ve)
+            responses.append(str(ve))
         except Exception as e:
-            logger.error(f"Unexpected error casting vote: {e}")
+            logger.error("Unexpected error casting vote: %s", e)
+            responses.append("An error occurred while casting your vote.")
     else:
         logger.warning("Unrecognized query. I can help you with DAO voting strategies. "
                        "Ask me about active proposals or your wallet balance!")
-    analyze_proposals()
+        responses.append("I can help you with DAO voting strategies. "
+                         "Ask me about active proposals or your wallet balance!")
+
+    # The overall analysis is skipped once the deadline has passed
+    if not expired():
+        analyze_proposals()
+    return "\n\n".join(str(response) for response in responses)
 
 
 # Test the on_user_query function
@@ -1,6 +1,138 @@
 # logging_config.py
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import numbers
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from config.settings import get_setting
+
+# Background listener that writes queued records to the log file (one per process)
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats each record as one JSON object per line.
+
+    The `event` field holds the un-interpolated message template, so log lines can be grouped by message type.
+    Every interpolated argument except numbers is capped at `max_field_chars` so proposal lists, ABIs and OpenAI
+    responses can't bloat the log file.
+    """
+
+    def __init__(self, max_field_chars=2000):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+
+    def cap(self, value):
+        text = value if isinstance(value, str) else str(value)
+        if len(text) > self.max_field_chars:
+            return f"{text[:self.max_field_chars]}...(+{len(text) - self.max_field_chars} chars)"
+        return text
+
+    def cap_arg(self, value):
+        # Numbers keep their type for %d and %.2f placeholders (and are short anyway)
+        return value if isinstance(value, numbers.Number) else self.cap(value)
+
+    def format(self, record):
+        template = str(record.msg)
+        args = record.args
+        try:
+            if isinstance(args, tuple) and args:
+                message = template % tuple(self.cap_arg(arg) for arg in args)
+            elif args:
+                message = template % args
+            else:
+                message = self.cap(template)
+        except (TypeError, ValueError):
+            # Never lose a record to a placeholder that does not fit its (capped) argument
+            try:
+                message = self.cap(record.getMessage())
+            except (TypeError, ValueError):
+                message = self.cap(f"{template} {args!r}")
+
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": template,
+            "message": message,
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of records per message type (keyed by the message template).
+
+    Warnings and errors are never sampled out.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        rate = self.rates.get(record.msg)
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        return random.random() < rate
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Queue handler that hands the record to the background listener untouched.
+
+    The standard QueueHandler formats the message in the calling thread before enqueueing it; here all
+    formatting happens in the listener thread. Records are dropped (and counted) instead of blocking the
+    request thread when the queue is full.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _start_listener(queue_handler, file_handler):
+    global _listener
+    _listener = QueueListener(queue_handler.queue, file_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def queue_depth():
+    """
+    Number of log records waiting to be written by the background listener.
+    """
+    return _listener.queue.qsize() if _listener is not None else 0
+
+
+def dropped_records():
+    """
+    Number of log records dropped because the log queue was full.
+    """
+    handler = next((h for h in logging.getLogger("dao_voting_agent").handlers if isinstance(h, LazyQueueHandler)),
+                   None)
+    return handler.dropped if handler is not None else 0
 
 
 # Centralized logger setup
@@ -11,15 +143,33 @@ def setup_logger():
     # This is in order to avoid adding duplicate handlers if setup_logger is called multiple times
     if not logger.handlers:
         # Rotating file handler (10MB file, 7 backups): Every 7th log-file will auto delete once there's a new one)
-        log_file = "dao_voting_agent.log"
+        log_file = get_setting("LOG_FILE", "dao_voting_agent.log")
         file_handler = RotatingFileHandler(log_file, maxBytes=10 * 1024 * 1024, backupCount=7)
         file_handler.setLevel(logging.INFO)
 
-        # Format for the file handler
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
+        # JSON format for the file handler, with every interpolated field capped in size
+        file_handler.setFormatter(JsonFormatter(max_field_chars=int(get_setting("LOG_MAX_FIELD_CHARS", 2000))))
+
+        # Request threads only enqueue records; a background listener formats them and writes them to the file
+        queue_handler = LazyQueueHandler(queue.Queue(maxsize=int(get_setting("LOG_QUEUE_SIZE", 10000))))
 
-        # Add only the file handler to the logger (The system will only write to log the file, no printing into console)
-        logger.addHandler(file_handler)
+        # Per-message-type sampling, e.g. LOG_SAMPLE_RATES='{"Received user prompt: %s": 0.1}'
+        sample_rates = json.loads(get_setting("LOG_SAMPLE_RATES", "{}"))
+        if sample_rates:
+            queue_handler.addFilter(SamplingFilter(sample_rates))
+
+        # Add only the queue handler to the logger (The system will only write to the log file, no console output)
+        logger.addHandler(queue_handler)
+        _start_listener(queue_handler, file_handler)
+
+        # Flush queued records on exit, and restart the listener thread in forked workers (e.g. gunicorn --preload)
+        atexit.register(_stop_listener)
+        os.register_at_fork(after_in_child=lambda: _restart_in_child(queue_handler, file_handler))
 
     return logger
+
+
+def _restart_in_child(queue_handler, file_handler):
+    # The parent's listener thread does not exist in the child, and the queue's locks may have been copied mid-use
+    queue_handler.queue = queue.Queue(maxsize=queue_handler.queue.maxsize)
+    _start_listener(queue_handler, file_handler)
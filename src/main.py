@@ -1,76 +1,90 @@
-import os
-import openai
-from theoriq import Agent, AgentConfig
-from theoriq.biscuit import TheoriqCost
-from theoriq.execute import ExecuteContext, ExecuteRequestBody, ExecuteResponse
-from theoriq.schemas import DialogItem, TextItemBlock
-from theoriq.types import Currency
-from src.web3_integration import user_inputs_cache
+from typing import TYPE_CHECKING
+
+from src import web3_integration
 
 # from src.app import app
 
-from src.analyze import (analyze_proposals, analyze_project_status, chat_with_openai_conversational,
-                         interactive_conversation)
+from config.settings import get_openai
+from src.archive import my_proposals_summary, record_verdict
+from src.analyze import (VERDICT_VOTES, LLMCallFailed, analyze_new_proposal, analyze_project_status,
+                         chat_with_openai_conversational, interactive_conversation)
+from src.proposal_model import as_proposal
 from src.proposals import fetch_active_proposals
+from src.snapshot_voting import is_snapshot_proposal_id, snapshot_auto_vote
 from src.web3_integration import connect_to_web3, get_wallet_balance, cast_vote, get_user_inputs
+from src.deadline import DeadlineExceeded, deadline, request_deadline, upstream_timeout
 from src.logging_config import setup_logger
+from src.resilience import UpstreamUnavailable, available, call
+from src.tenants import get_registry, is_interactive, theoriq_sender, use_tenant
+from src.tracing import traced
+
+if TYPE_CHECKING:
+    # The theoriq SDK is only needed to serve Theoriq requests, so the watcher, batch jobs and benchmarks can import
+    # this module without it
+    from theoriq.execute import ExecuteContext, ExecuteRequestBody, ExecuteResponse
 
 # Set up logging (using the centralized logger from logging_config)
 logger = setup_logger()
 
-# Initialize OpenAI API
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    logger.error("OpenAI API key is missing.")
-    raise ValueError("OpenAI API key is missing.")
-openai.api_key = OPENAI_API_KEY
-
-# Initialize Theoriq agent configuration from environment
-agent = Agent(AgentConfig.from_env())
-
 
 def get_openai_response(prompt):
     """Generate OpenAI response based on the input prompt."""
     try:
-        response = openai.Completion.create(
+        openai = get_openai()
+        response = call("llm", "completion", lambda: openai.Completion.create(
             engine="text-davinci-003",
             prompt=prompt,
-            max_tokens=150
-        )
+            max_tokens=150,
+            request_timeout=upstream_timeout()
+        ))
         return response.choices[0].text.strip()
     except Exception as e:
-        logger.error(f"Error generating OpenAI response: {str(e)}")
+        logger.error("Error generating OpenAI response: %s", e)
         return f"Error generating OpenAI response: {str(e)}"
 
 
+@traced()
 def handle_new_proposal(proposal, web3, user_wallet_address, contract_address, abi):
     """Process and analyze a new proposal, including casting a vote if applicable."""
-    logger.info(f"Handling new proposal: {proposal['title']}")
+    # Accept Snapshot dicts, JSON strings (from the API) and on-chain tuples alike
+    proposal = as_proposal(proposal)
+    logger.info("Handling new proposal: %s", proposal['title'])
 
     # Fetch wallet balance
     balance = get_wallet_balance(web3, user_wallet_address)
-    logger.info(f"Wallet Balance for {user_wallet_address}: {balance} ETH")
+    logger.info("Wallet Balance for %s: %s ETH", user_wallet_address, balance)
 
     # Analyze proposal and determine voting recommendation
-    recommendation = analyze_proposals()
-    logger.info(f"Recommendation for proposal '{proposal['title']}': {recommendation}")
-
-    # Cast vote based on recommendation
-    vote_choice = 'yes' if recommendation == 'Approve' else 'no'
-    logger.info(f"Casting '{vote_choice}' vote for proposal ID: {proposal['id']}")
-    cast_vote(web3, user_wallet_address, contract_address, abi, proposal['id'], vote_choice)
+    recommendation, verdict = analyze_new_proposal(proposal, web3, user_wallet_address, contract_address, abi, balance)
+    logger.info("Recommendation for proposal '%s': %s", proposal['title'], recommendation)
+    record_verdict(proposal, verdict, recommendation)
+
+    # Cast vote based on the verdict; automatic Snapshot votes are opt-in (SNAPSHOT_AUTO_VOTE)
+    vote_choice = VERDICT_VOTES.get(verdict)
+    if vote_choice is None:
+        logger.info("No verdict on proposal ID %s, not voting on it.", proposal['id'])
+    elif is_snapshot_proposal_id(proposal['id']) and not snapshot_auto_vote():
+        logger.info("Not voting on Snapshot proposal ID %s: SNAPSHOT_AUTO_VOTE is off.", proposal['id'])
+    else:
+        logger.info("Casting '%s' vote for proposal ID: %s", vote_choice, proposal['id'])
+        cast_vote(web3, user_wallet_address, contract_address, abi, proposal['id'], vote_choice,
+                  space=proposal.space, choices=proposal.choices)
 
     return f"**Proposal:** {proposal['title']}\n**Wallet Balance:** {balance} ETH\n**Recommendation:** {recommendation}"
 
 
 def handle_openai_queries(user_input, web3, user_wallet_address, submitted_proposals):
     """Manage OpenAI conversational responses related to wallet balance and proposals."""
-    logger.info(f"Received OpenAI query: {user_input}")
+    logger.info("Received OpenAI query: %s", user_input)
 
     if "wallet balance" in user_input.lower():
         balance = get_wallet_balance(web3, user_wallet_address)
         return f"Your wallet balance is: {balance} ETH"
     elif "show my proposals" in user_input.lower():
+        # Answer from the archive; fall back to the list sent by the client
+        summary = my_proposals_summary(user_wallet_address)
+        if summary:
+            return summary
         return f"Here are your submitted proposals: {submitted_proposals}" \
             if submitted_proposals else "You have no submitted proposals at the moment."
 
@@ -80,7 +94,12 @@ def handle_openai_queries(user_input, web3, user_wallet_address, submitted_propo
 
 def execute_dao_voting_assistant(user_input):
     """Process DAO voting input through OpenAI and return response."""
-    logger.info(f"Executing DAO Voting Assistant with user input: {user_input}")
+    from theoriq.biscuit import TheoriqCost
+    from theoriq.execute import ExecuteResponse
+    from theoriq.schemas import DialogItem
+    from theoriq.types import Currency
+
+    logger.info("Executing DAO Voting Assistant with user input: %s", user_input)
     prompt = f"Analyze the following user input for DAO voting: {user_input}"
     openai_response = get_openai_response(prompt)
 
@@ -95,6 +114,7 @@ def execute_dao_voting_assistant(user_input):
     )
 
 
+@traced()
 def run_agent():
     """Main agent function to initialize, fetch proposals, analyze status, and interact with the user."""
     try:
@@ -125,19 +145,35 @@ def run_agent():
             'wallet_address': wallet_address
         }
         response = analyze_project_status(proposals, project_data, wallet_balance)
-        logger.info(f"DAO Agent: {response}")
+        logger.info("DAO Agent: %s", response)
         print(f"DAO Agent: {response}")
 
-        # Start interactive conversation
-        interactive_conversation()
+        # Start interactive conversation (not while serving a request)
+        if is_interactive():
+            interactive_conversation()
 
     except Exception as e:
-        logger.error(f"Error in running the agent: {str(e)}")
+        logger.error("Error in running the agent: %s", e)
         handle_agent_error(e)
 
 
 def handle_agent_error(error):
     """Generate an OpenAI response for an error encountered during the agent's execution."""
+    if isinstance(error, DeadlineExceeded):
+        # No time left for another LLM call
+        logger.warning("Agent run cancelled: %s", error)
+        print("The agent did not finish before the request deadline.")
+        return
+    if isinstance(error, UpstreamUnavailable) or not available("llm"):
+        # Asking the LLM to explain an outage only adds load to the upstreams
+        logger.warning("Not asking the LLM to explain the error while an upstream is unavailable: %s", error)
+        print(f"The agent could not finish because an upstream service is unavailable: {error}")
+        return
+    if isinstance(error, LLMCallFailed):
+        # Asking the LLM to explain its own failure would fail the same way
+        logger.warning("Not asking the LLM to explain an error of the LLM call: %s", error)
+        print(f"The agent could not finish: {error}")
+        return
     error_message = f"An error occurred while running the agent: {str(error)}"
     prompt = f"""
     (Remember NOT TO use bold text format for your response)
@@ -150,24 +186,40 @@ def handle_agent_error(error):
     and ensure NOT to mention that You're trained by OpenAI, just be a polite Assistant.)
     """
     error_response = chat_with_openai_conversational(prompt)
-    logger.error(f"Error response from OpenAI: {error_response}")
+    logger.error("Error response from OpenAI: %s", error_response)
     print(error_response)
 
 
-def run_agent_theoriq(context: ExecuteContext, request_body: ExecuteRequestBody) -> ExecuteResponse:
+@traced()
+def run_agent_theoriq(context: "ExecuteContext", request_body: "ExecuteRequestBody") -> "ExecuteResponse":
     """Theoriq-compliant agent execution function that checks for necessary inputs and runs the DAO Voting Agent."""
+    from theoriq.biscuit import TheoriqCost
+    from theoriq.schemas import TextItemBlock
+    from theoriq.types import Currency
 
     try:
-        logger.info(f"Received request: {context.request_id}")
+        logger.info("Received request: %s", context.request_id)
 
         # Retrieve the last `TextItemBlock` from the request body for user input
         last_block = request_body.last_item.blocks[0]
         user_input = last_block.data.text[:2000]  # Truncate to avoid overflow issues
 
-        logger.info(f"User input received: {user_input}")
+        logger.info("User input received: %s", user_input)
+
+        # Look up the DAO configuration registered for the calling agent. Without registered tenants, the
+        # process-wide inputs are used; with them, unknown agents are rejected
+        registry = get_registry()
+        sender = theoriq_sender(context)
+        tenant = registry.by_agent_id(sender)
+        if tenant is None and len(registry):
+            logger.warning("Rejected request %s from unknown agent %s", context.request_id, sender)
+            return context.new_response(
+                blocks=[TextItemBlock(text=f"Agent {sender} is not registered with this DAO Voting Agent.")],
+                cost=TheoriqCost.zero(Currency.USDC)
+            )
 
-        # Check if inputs are cached; if not, notify the user to submit inputs
-        if user_inputs_cache is None:
+        # Check if inputs are available; if not, notify the user to submit inputs
+        if tenant is None and web3_integration.user_inputs_cache is None:
             guidance_message = (
                 "You haven't provided the necessary inputs for DAO analysis. "
                 "Please submit the following details first:\n"
@@ -181,8 +233,10 @@ def run_agent_theoriq(context: ExecuteContext, request_body: ExecuteRequestBody)
                 cost=TheoriqCost(amount=1, currency=Currency.USDC)
             )
 
-        # If inputs are available, proceed to run the main agent function
-        run_agent()  # Runs the main agent tasks, including displaying the welcome message and input collection
+        # If inputs are available, proceed to run the main agent function (without prompting on stdin), bounded by
+        # the request deadline
+        with use_tenant(tenant), deadline(request_deadline()):
+            run_agent()
         response_text = "DAO Voting Agent is now processing your request based on the provided inputs."
 
         # Return formatted response for Theoriq interface
@@ -193,7 +247,7 @@ def run_agent_theoriq(context: ExecuteContext, request_body: ExecuteRequestBody)
 
     except Exception as e:
         # Handle unexpected outer errors
-        logger.error(f"Unexpected error in run_agent_theoriq: {str(e)}")
+        logger.error("Unexpected error in run_agent_theoriq: %s", e)
         return context.new_response(
             blocks=[TextItemBlock(text=f"An unexpected error occurred: {str(e)}")],
             cost=TheoriqCost.zero(Currency.USDC)
@@ -0,0 +1,137 @@
+"""
+Prometheus metrics for the DAO Voting Agent, recorded with prometheus_client and rendered by the /metrics route in
+src/app.py.
+
+Under gunicorn, every worker process records into PROMETHEUS_MULTIPROC_DIR (set up by gunicorn.conf.py) and a scrape
+of any worker reports the values of all of them: counters and histograms are summed, in-flight gauges are summed over
+live workers and circuit states report the worst state of any live worker. Without PROMETHEUS_MULTIPROC_DIR (e.g. a
+single uvicorn or Flask development process), the metrics are those of the current process.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest)
+
+from src.tracing import span
+
+# Default latency buckets in seconds, covering fast cache hits up to slow LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def render_latest():
+    """
+    Render the metrics of every worker (or of this process) in the Prometheus text exposition format.
+    """
+    for gauge, callback in _SAMPLED_GAUGES:
+        gauge.set(callback())
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return generate_latest(REGISTRY)
+    from prometheus_client import multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+# Upstream calls: RPC reads, Snapshot GraphQL, chat completions and vote broadcasts
+UPSTREAM_LATENCY = Histogram("dao_agent_upstream_request_seconds",
+                             "Latency of calls to upstream services.", ["upstream", "operation"],
+                             buckets=DEFAULT_BUCKETS)
+UPSTREAM_ERRORS = Counter("dao_agent_upstream_errors_total",
+                          "Failed calls to upstream services.", ["upstream", "operation"])
+UPSTREAM_IN_FLIGHT = Gauge("dao_agent_upstream_in_flight",
+                           "Upstream calls currently in progress.", ["upstream"], multiprocess_mode="livesum")
+
+# Circuit breakers and retries (src/resilience.py)
+CIRCUIT_STATE = Gauge("dao_agent_circuit_state",
+                      "Circuit breaker state per upstream (0 closed, 1 half-open, 2 open).", ["upstream"],
+                      multiprocess_mode="livemax")
+UPSTREAM_RETRIES = Counter("dao_agent_upstream_retries_total", "Retried upstream calls.", ["upstream"])
+UPSTREAM_REJECTED = Counter("dao_agent_upstream_rejected_total",
+                            "Upstream calls failed fast by an open circuit breaker or a spent retry budget.",
+                            ["upstream", "reason"])
+
+# HTTP routes
+REQUEST_LATENCY = Histogram("dao_agent_http_request_seconds",
+                            "Latency of HTTP requests per route.", ["route", "method", "status"],
+                            buckets=DEFAULT_BUCKETS)
+REQUESTS_IN_FLIGHT = Gauge("dao_agent_http_requests_in_flight", "HTTP requests currently being handled.",
+                           multiprocess_mode="livesum")
+
+# Caches (hit rate = hit / (hit + miss))
+CACHE_REQUESTS = Counter("dao_agent_cache_requests_total", "Cache lookups by result.", ["cache", "result"])
+
+
+def _log_queue_depth():
+    from src.logging_config import queue_depth
+
+    return queue_depth()
+
+
+def _log_records_dropped():
+    from src.logging_config import dropped_records
+
+    return dropped_records()
+
+
+# Queues, sampled by the worker that serves a scrape; each live worker keeps its last sample (pid label)
+LOG_QUEUE_DEPTH = Gauge("dao_agent_log_queue_depth", "Log records waiting for the background writer.",
+                        multiprocess_mode="liveall")
+LOG_RECORDS_DROPPED = Gauge("dao_agent_log_records_dropped", "Log records dropped because the queue was full.",
+                            multiprocess_mode="liveall")
+_SAMPLED_GAUGES = ((LOG_QUEUE_DEPTH, _log_queue_depth), (LOG_RECORDS_DROPPED, _log_records_dropped))
+
+
+@contextmanager
+def track_upstream(upstream, operation):
+    """
+    Record latency, errors and in-flight count for one upstream call, and trace it as a span.
+    """
+    in_flight = UPSTREAM_IN_FLIGHT.labels(upstream)
+    in_flight.inc()
+    started = time.perf_counter()
+    try:
+        with span(f"{upstream} {operation}", upstream=upstream, operation=operation):
+            yield
+    except Exception:
+        UPSTREAM_ERRORS.labels(upstream, operation).inc()
+        raise
+    finally:
+        UPSTREAM_LATENCY.labels(upstream, operation).observe(time.perf_counter() - started)
+        in_flight.dec()
+
+
+def record_cache(cache, hit):
+    """
+    Count a cache lookup as a hit or a miss.
+    """
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def instrument_flask(app):
+    """
+    Record per-route latency histograms and the in-flight gauge for a Flask app.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            REQUEST_LATENCY.labels(route, request.method, str(response.status_code)).observe(
+                time.perf_counter() - started)
+        return response
+
+    @app.teardown_request
+    def _finish_request(error=None):
+        REQUESTS_IN_FLIGHT.dec()
+
+    return app
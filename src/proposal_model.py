@@ -0,0 +1,194 @@
+"""
+Compact proposal model shared by the on-chain and Snapshot sources.
+
+Snapshot returns proposals as dicts of strings, while governor contracts return raw ABI tuples. Both are normalized
+into Proposal objects:
+
+- Fixed attributes in __slots__ instead of a per-proposal dict.
+- The body (usually the largest field by far) is stored zlib-compressed and only decoded when it is read.
+- Choice lists are shared tuples of interned strings, since most proposals use the same few option sets.
+
+Proposal supports read access like the dicts it replaces (proposal['title'], proposal.get('body')), so existing
+code keeps working. Measure the footprint with:
+  python -m benchmarks.proposal_memory --count 100000
+"""
+import hashlib
+import json
+import sys
+import zlib
+
+# Bodies shorter than this are kept as plain strings; compressing them saves too little
+COMPRESS_MIN_CHARS = 256
+
+# Shared choice tuples, e.g. ("For", "Against", "Abstain")
+_choice_sets = {}
+
+# Names of on-chain getter outputs that carry the normalized fields
+_ONCHAIN_FIELDS = {
+    "id": ("id", "proposalId"),
+    "title": ("title", "name"),
+    "body": ("description", "body", "details"),
+    "start": ("start", "startBlock", "voteStart", "startTime"),
+    "end": ("end", "endBlock", "voteEnd", "endTime", "deadline"),
+    "author": ("proposer", "author", "creator"),
+}
+
+
+def _shared_choices(choices):
+    if not choices:
+        return ()
+    key = tuple(choices)
+    shared = _choice_sets.get(key)
+    if shared is None:
+        shared = _choice_sets.setdefault(key, tuple(sys.intern(str(choice)) for choice in key))
+    return shared
+
+
+class Proposal:
+    """
+    One proposal from Snapshot ("snapshot") or a governor contract ("onchain").
+
+    `data` holds the raw ABI tuple of on-chain proposals.
+    """
+    __slots__ = ("id", "choices", "start", "end", "source", "space", "author", "state", "data", "_title", "_body")
+
+    fields = ("id", "title", "body", "choices", "start", "end", "space", "author", "state")
+
+    def __init__(self, id, title, body=None, choices=(), start=None, end=None, source="snapshot", space=None,
+                 author=None, state=None, data=None):
+        self.id = id
+        self._title = title
+        self.choices = _shared_choices(choices)
+        self.start = start
+        self.end = end
+        self.source = sys.intern(source)
+        # Few distinct spaces and states, many proposals
+        self.space = sys.intern(space) if isinstance(space, str) else space
+        self.author = author
+        self.state = sys.intern(state) if isinstance(state, str) else state
+        self.data = data
+        self.body = body
+
+    @property
+    def title(self):
+        """
+        The proposal title (on-chain proposals without one are named after their id when read).
+        """
+        if self._title is None and self.source == "onchain":
+            return f"On-chain proposal {self.id}"
+        return self._title
+
+    @property
+    def body(self):
+        """
+        The proposal body, decompressed on access.
+        """
+        if isinstance(self._body, bytes):
+            return zlib.decompress(self._body).decode("utf-8")
+        return self._body
+
+    @body.setter
+    def body(self, value):
+        if value is not None and len(value) >= COMPRESS_MIN_CHARS:
+            self._body = zlib.compress(value.encode("utf-8"))
+        else:
+            self._body = value
+
+    @classmethod
+    def from_snapshot(cls, entry):
+        """
+        Build a proposal from a Snapshot GraphQL result.
+        """
+        space = entry.get("space")
+        if isinstance(space, dict):
+            space = space.get("id")
+        return cls(entry.get("id"), entry.get("title"), body=entry.get("body"), choices=entry.get("choices"),
+                   start=entry.get("start"), end=entry.get("end"), source="snapshot", space=space,
+                   author=entry.get("author"), state=entry.get("state"))
+
+    @classmethod
+    def from_onchain(cls, values, index=None, field_names=()):
+        """
+        Build a proposal from the ABI tuple returned by a governor getter such as proposals(i).
+
+        `field_names` are the getter's output names; known names (id, description, startBlock, ...) fill the
+        normalized fields, and the proposal index stands in for a missing id.
+        """
+        values = tuple(values) if isinstance(values, (list, tuple)) else (values,)
+        named = dict(zip(field_names, values)) if field_names else {}
+
+        def pick(field, default=None):
+            for name in _ONCHAIN_FIELDS[field]:
+                if named.get(name) not in (None, ""):
+                    return named[name]
+            return default
+
+        if named:
+            proposal_id = pick("id", index if index is not None else values[0])
+        else:
+            proposal_id = values[0] if values else index
+        return cls(proposal_id, pick("title"), body=pick("body"),
+                   start=pick("start"), end=pick("end"), source="onchain", author=pick("author"), data=values)
+
+    # Read access like the original dicts
+
+    def __getitem__(self, key):
+        if key not in self.fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in self.fields:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def keys(self):
+        return self.fields
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "body": self.body,
+            "choices": list(self.choices),
+            "start": self.start,
+            "end": self.end,
+            "space": self.space,
+            "author": self.author,
+            "state": self.state,
+        }
+
+    def fingerprint(self):
+        """
+        Hash of the content fields, computed without decompressing the body.
+
+        The state is left out, so a proposal moving from active to closed is not reported as changed.
+        """
+        body = self._body if isinstance(self._body, bytes) else (self._body or "").encode("utf-8")
+        header = json.dumps([self.title, self.choices, self.start, self.end], default=str).encode("utf-8")
+        return hashlib.sha256(header + b"\0" + body).hexdigest()
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def __eq__(self, other):
+        if not isinstance(other, Proposal):
+            return NotImplemented
+        return (self.source, self.id, self._title, self._body, self.choices, self.start, self.end) == \
+            (other.source, other.id, other._title, other._body, other.choices, other.start, other.end)
+
+    __hash__ = None
+
+
+def as_proposal(value, field_names=()):
+    """
+    Normalize a Proposal, Snapshot dict, JSON string or on-chain ABI tuple to a Proposal.
+    """
+    if isinstance(value, Proposal):
+        return value
+    if isinstance(value, str):
+        value = json.loads(value)
+    if isinstance(value, dict):
+        return Proposal.from_snapshot(value)
+    return Proposal.from_onchain(value, field_names=field_names)
@@ -1,30 +1,58 @@
-import requests
-from web3 import Web3
-from src.web3_integration import get_user_inputs
+import time
+
+from config.settings import get_setting
+from src.abi_registry import get_abi, get_contract
+from src.deadline import upstream_timeout
+from src.proposal_model import Proposal
+from src.web3_integration import get_user_inputs, get_web3
 from src.logging_config import setup_logger
+from src.metrics import UPSTREAM_ERRORS, record_cache
+from src.resilience import TRANSIENT_STATUSES, UpstreamUnavailable, call
+from src.shared_cache import get_cache
+from src.tracing import traced
 
 # Set up logging
 logger = setup_logger()
 
+# Getters that return one proposal by id, for ids 0 to proposalCount - 1
+INDEXED_GETTERS = ('proposals', 'getProposal')
+
 
 def find_proposal_function(abi):
     """
-    Tries to find the appropriate function in the ABI to fetch proposals.
+    Tries to find the appropriate function in the ABI to fetch proposals (from the ABI's precomputed index).
     """
-    logger.info("Attempting to find proposal-related functions in ABI.")
-    proposal_functions = []
-    for item in abi:
-        if item['type'] == 'function':
-            if 'proposal' in item['name'].lower() or 'vote' in item['name'].lower():
-                proposal_functions.append(item['name'])
+    proposal_functions = get_abi(abi).proposal_functions
 
     if proposal_functions:
-        logger.info(f"Proposal-related functions found: {proposal_functions}")
+        logger.info("Proposal-related functions found: %s", proposal_functions)
         return proposal_functions
     logger.warning("No proposal-related functions found in the ABI.")
     return None
 
 
+def indexed_getter(abi):
+    """
+    Name of the getter that reads proposals by id up to proposalCount (the first of INDEXED_GETTERS among the ABI's
+    proposal functions), or None if the ABI has no such getter or no proposalCount.
+    """
+    parsed = get_abi(abi)
+    if 'proposalCount' not in parsed.function_names:
+        return None
+    return next((name for name in parsed.proposal_functions if name in INDEXED_GETTERS), None)
+
+
+def fetch_proposal_range(contract, abi, start, stop, function_name=None):
+    """
+    Read the proposals with ids `start` to `stop - 1` through an indexed getter (default: indexed_getter(abi)).
+    """
+    function_name = function_name or indexed_getter(abi)
+    field_names = get_abi(abi).getter_outputs.get(function_name, ())
+    getter = contract.functions[function_name]
+    return [Proposal.from_onchain(getter(i).call(), index=i, field_names=field_names) for i in range(start, stop)]
+
+
+@traced()
 def fetch_proposals_dynamically(contract, abi):
     """
     Fetches proposals using any available proposal-related function dynamically.
@@ -34,50 +62,38 @@ def fetch_proposals_dynamically(contract, abi):
     if not proposal_functions:
         raise ValueError("No proposal-related function found in the ABI.")
 
-    logger.info(f"Found proposal-related functions: {proposal_functions}")
+    logger.info("Found proposal-related functions: %s", proposal_functions)
     print(f"Found proposal-related functions: {proposal_functions}")
 
     for function_name in proposal_functions:
         try:
             if function_name == 'proposalCount':
                 proposal_count = contract.functions.proposalCount().call()
-                logger.info(f"Proposal count fetched: {proposal_count}")
+                logger.info("Proposal count fetched: %s", proposal_count)
                 print(f"Proposal count: {proposal_count}")
                 return proposal_count
 
-            elif function_name == 'proposals':
-                proposal_count = contract.functions.proposalCount().call()
-                proposals = []
-                for i in range(proposal_count):
-                    proposal = contract.functions.proposals(i).call()
-                    proposals.append(proposal)
-                logger.info(f"Proposals fetched using 'proposals' function: {proposals}")
-                print(f"Proposals fetched using 'proposals' function: {proposals}")
-                return proposals
-
-            elif function_name == 'getProposal':
+            elif function_name in INDEXED_GETTERS:
                 proposal_count = contract.functions.proposalCount().call()
-                proposals = []
-                for i in range(proposal_count):
-                    proposal = contract.functions.getProposal(i).call()
-                    proposals.append(proposal)
-                logger.info(f"Proposals fetched using 'getProposal' function: {proposals}")
-                print(f"Proposals fetched using 'getProposal' function: {proposals}")
+                proposals = fetch_proposal_range(contract, abi, 0, proposal_count, function_name)
+                logger.info("Proposals fetched using '%s' function: %s", function_name, proposals)
+                print(f"Proposals fetched using '{function_name}' function: {proposals}")
                 return proposals
 
             else:
                 # In case there's a function in the ABI that does not require parameters
                 result = contract.functions[function_name]().call()
-                logger.info(f"Proposals fetched using {function_name} function: {result}")
+                logger.info("Proposals fetched using %s function: %s", function_name, result)
                 return result
 
         except Exception as error:
-            logger.error(f"Error calling function '{function_name}': {str(error)}")
+            logger.error("Error calling function '%s': %s", function_name, error)
             raise error
 
     raise ValueError("No valid proposal function could be executed.")
 
 
+@traced()
 def fetch_active_proposals():
     """
     Fetches active proposals either from Web3 (on-chain) or via the Snapshot API (off-chain).
@@ -90,8 +106,8 @@ def fetch_active_proposals():
     infura_url = user_inputs['infura_url']
 
     # Log user inputs
-    logger.info(f"Fetching active proposals for "
-                f"space: {space}, contract: {contract_address}, Infura URL: {infura_url}")
+    logger.info("Fetching active proposals for space: %s, contract: %s, Infura URL: %s",
+                space, contract_address, infura_url)
 
     # Printing user inputs for clarity
     print("\n--- Fetching Active Proposals ---")
@@ -116,28 +132,61 @@ def fetch_active_proposals():
         logger.info("Attempting to fetch on-chain proposals...")
         print("\nAttempting to fetch on-chain proposals...")
         try:
-            web3 = Web3(Web3.HTTPProvider(infura_url))
+            web3 = get_web3(infura_url)
             if not web3.is_connected():
                 raise Exception("Unable to connect to Infura.")
 
-            contract = web3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=abi)
+            # Cached per (endpoint, address, ABI): no ABI parsing or contract construction after the first request
+            contract = get_contract(web3, contract_address, abi)
             onchain_proposals = fetch_proposals_dynamically(contract, abi)
 
             if onchain_proposals:
-                logger.info(f"On-chain proposals fetched successfully: {onchain_proposals}")
+                logger.info("On-chain proposals fetched successfully: %s", onchain_proposals)
                 print("\nOn-chain proposals fetched successfully.")
                 return onchain_proposals
             else:
                 logger.warning("No on-chain proposals found or an error occurred.")
                 print("\nNo on-chain proposals found or an error occurred.")
         except Exception as error:
-            logger.error(f"Error while fetching on-chain proposals: {str(error)}")
+            logger.error("Error while fetching on-chain proposals: %s", error)
             print(f"Error while fetching on-chain proposals: {str(error)}")
 
     # Fallback to fetching off-chain proposals via Snapshot API
     logger.info("Fetching off-chain proposals via Snapshot API...")
     print("\nFetching off-chain proposals via Snapshot API...")
-    url = "https://hub.snapshot.org/graphql"
+    offchain_proposals = fetch_snapshot_proposals(space)
+
+    if offchain_proposals is None:
+        print("\nError fetching proposals from Snapshot API.")
+        return []
+    if offchain_proposals:
+        print(f"\n{len(offchain_proposals)} off-chain proposals found.")
+    else:
+        print("\nNo active off-chain proposals found.")
+    return offchain_proposals
+
+
+def fetch_snapshot_proposals(space, use_cache=True):
+    """
+    Fetches active proposals for a space from the Snapshot GraphQL API (returns None if the request failed).
+
+    Results are kept in the shared cache (see src/shared_cache.py) for SNAPSHOT_CACHE_TTL seconds, and served for up to
+    SNAPSHOT_STALE_TTL seconds while Snapshot is unavailable (see src/resilience.py). With use_cache=False (e.g. the
+    watcher's polls), Snapshot is always asked; the result still refreshes the cache.
+    """
+    import requests
+
+    url = get_setting("SNAPSHOT_GRAPHQL_URL", "https://hub.snapshot.org/graphql")
+    cache = get_cache()
+    cache_key = f"snapshot_proposals:{url}:{space}"
+    # (fetched at, proposals)
+    cached = cache.get(cache_key)
+    fresh = use_cache and cached is not None and time.time() - cached[0] < float(get_setting("SNAPSHOT_CACHE_TTL", 30))
+    if use_cache:
+        record_cache("proposals", fresh)
+    if fresh:
+        return cached[1]
+
     query = f"""
     {{
       proposals(first: 5, where: {{ space_in: ["{space}"], state: "active" }}) {{
@@ -147,36 +196,53 @@ def fetch_active_proposals():
         choices
         start
         end
+        state
+        author
+        space {{ id }}
       }}
     }}
     """
-    response = requests.post(url, json={'query': query})
+
+    def post():
+        response = requests.post(url, json={'query': query}, timeout=upstream_timeout())
+        if response.status_code in TRANSIENT_STATUSES:
+            # Retried, and counted against the circuit breaker
+            response.raise_for_status()
+        return response
+
+    try:
+        response = call("snapshot", "proposals", post)
+    except UpstreamUnavailable as e:
+        if cached is not None:
+            logger.warning("Snapshot is unavailable, serving the %s proposals fetched for %s %.0fs ago: %s",
+                           len(cached[1]), space, time.time() - cached[0], e)
+            return cached[1]
+        logger.error("Error fetching proposals from Snapshot API: %s", e)
+        return None
 
     if response.status_code == 200:
         data = response.json()
-        offchain_proposals = data['data']['proposals']
+        offchain_proposals = [Proposal.from_snapshot(entry) for entry in data['data']['proposals']]
+        cache.set(cache_key, (time.time(), offchain_proposals), float(get_setting("SNAPSHOT_STALE_TTL", 3600)))
         if offchain_proposals:
-            logger.info(f"Off-chain proposals fetched successfully: {offchain_proposals}")
-            print(f"\n{len(offchain_proposals)} off-chain proposals found.")
-            return offchain_proposals
+            logger.info("Off-chain proposals fetched successfully: %s", offchain_proposals)
         else:
             logger.warning("No active off-chain proposals found.")
-            print("\nNo active off-chain proposals found.")
-            return []
+        return offchain_proposals
     else:
-        logger.error(f"Error fetching proposals from Snapshot API: {response.status_code}")
-        print(f"\nError fetching proposals from Snapshot API: {response.status_code}")
-        return []
+        UPSTREAM_ERRORS.labels("snapshot", "proposals").inc()
+        logger.error("Error fetching proposals from Snapshot API: %s", response.status_code)
+        return None
 
 
 # A short example function call to test the implementation
 if __name__ == "__main__":
     try:
         proposals_data = fetch_active_proposals()
-        logger.info(f"Proposals fetched: {proposals_data}")
+        logger.info("Proposals fetched: %s", proposals_data)
         print("\nProposals Fetched:")
         print(proposals_data)
     except Exception as e:
-        logger.error(f"Error in fetching proposals: {str(e)}")
+        logger.error("Error in fetching proposals: %s", e)
         print(f"Error in fetching proposals: {str(e)}")
         print(f"Error: {str(e)}")
@@ -0,0 +1,312 @@
+"""
+Circuit breakers and retry budgets for the upstreams (JSON-RPC, Snapshot and the LLM).
+
+Every upstream call goes through call(upstream, operation, function):
+
+- Transient failures (connection errors, timeouts, HTTP 408/429/5xx) are retried up to UPSTREAM_MAX_RETRIES times
+  (default 2) with full-jitter exponential backoff (RETRY_BACKOFF_BASE, default 0.1 s, capped at RETRY_BACKOFF_MAX,
+  default 2 s), never past the request deadline (src/deadline.py). Vote broadcasts are never retried.
+- Retries are limited by a budget per upstream: each call adds RETRY_BUDGET_RATIO (default 0.2) tokens, up to
+  RETRY_BUDGET_RESERVE (default 10), and each retry spends one. When an upstream fails for every request, retries add
+  at most 20% to its load instead of multiplying it.
+- After CIRCUIT_FAILURE_THRESHOLD (default 5, 0 disables the breakers) consecutive transient failures, the upstream's
+  breaker opens and calls fail fast with CircuitOpen, without touching the network. After CIRCUIT_RESET_TIMEOUT
+  seconds (default 30), up to CIRCUIT_HALF_OPEN_PROBES calls (default 1) are let through as probes: a success closes
+  the breaker, a failure opens it again.
+
+Both CircuitOpen and exhausted retries raise UpstreamUnavailable, on which callers serve cached or degraded answers
+(the last Snapshot proposals of a space, analyses without the LLM) instead of asking the LLM to explain the error.
+Breakers and budgets are kept per process. Measure the behaviour during an outage with:
+  python -m benchmarks.fault_injection --upstream llm
+"""
+import random
+import threading
+import time
+
+from config.settings import get_setting
+from src.deadline import DeadlineExceeded, expired, remaining
+from src.logging_config import setup_logger
+from src.metrics import CIRCUIT_STATE, UPSTREAM_REJECTED, UPSTREAM_RETRIES, track_upstream
+
+# Set up logging
+logger = setup_logger()
+
+# HTTP statuses worth retrying: timeouts, rate limits and server errors
+TRANSIENT_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class UpstreamUnavailable(ConnectionError):
+    """
+    An upstream could not be reached: its circuit breaker is open, or a transient failure persisted after retries.
+    """
+
+    def __init__(self, upstream, message, retry_after=None):
+        super().__init__(message)
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CircuitOpen(UpstreamUnavailable):
+    """
+    The upstream's circuit breaker is open; the call was not made.
+    """
+
+
+def _setting(name, default):
+    return float(get_setting(name, default))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one upstream (closed -> open after consecutive failures -> half-open probes -> closed).
+    """
+
+    def __init__(self, upstream, failure_threshold=5, reset_timeout=30.0, half_open_probes=1):
+        self.upstream = upstream
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.labels(upstream).set(_STATE_VALUES[CLOSED])
+
+    def _set_state(self, state):
+        if state != self.state:
+            logger.warning("Circuit breaker for %s: %s -> %s", self.upstream, self.state, state)
+            self.state = state
+            CIRCUIT_STATE.labels(self.upstream).set(_STATE_VALUES[state])
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        self._failures = self._probes = 0
+
+    def retry_after(self):
+        """
+        Seconds until the open breaker lets a probe through (0 if it is not open).
+        """
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def available(self):
+        """
+        Whether a call would be let through right now (without reserving a probe).
+        """
+        with self._lock:
+            if self.state == OPEN:
+                return self.retry_after() == 0
+            return self.state == CLOSED or self._probes < self.half_open_probes
+
+    def acquire(self):
+        """
+        Let one call through or raise CircuitOpen. Returns True if the call is a half-open probe.
+        """
+        with self._lock:
+            if self.state == OPEN and self.retry_after() == 0:
+                self._set_state(HALF_OPEN)
+            if self.state == CLOSED:
+                return False
+            if self.state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            retry_after = self.retry_after()
+        UPSTREAM_REJECTED.labels(self.upstream, "circuit_open").inc()
+        raise CircuitOpen(self.upstream, f"{self.upstream} is unavailable (circuit breaker open).",
+                          retry_after=retry_after or self.reset_timeout)
+
+    def record_success(self, probe=False):
+        with self._lock:
+            if self.state == HALF_OPEN and probe:
+                self._set_state(CLOSED)
+            elif self.state == CLOSED:
+                self._failures = 0
+
+    def record_failure(self, probe=False):
+        with self._lock:
+            if self.state == HALF_OPEN and probe:
+                self._set_state(OPEN)
+            elif self.state == CLOSED:
+                self._failures += 1
+                if self.failure_threshold and self._failures >= self.failure_threshold:
+                    self._set_state(OPEN)
+
+    def release(self, probe=False):
+        """
+        Give back a probe whose call ended without telling anything about the upstream (e.g. it was cancelled).
+        """
+        with self._lock:
+            if self.state == HALF_OPEN and probe:
+                self._probes = max(0, self._probes - 1)
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a share of the calls to one upstream.
+    """
+
+    def __init__(self, ratio=0.2, reserve=10.0):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.balance = reserve
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.balance = min(self.reserve, self.balance + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+
+_breakers = {}
+_budgets = {}
+_lock = threading.Lock()
+
+
+def get_breaker(upstream):
+    breaker = _breakers.get(upstream)
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.get(upstream)
+            if breaker is None:
+                breaker = _breakers[upstream] = CircuitBreaker(
+                    upstream, failure_threshold=int(_setting("CIRCUIT_FAILURE_THRESHOLD", 5)),
+                    reset_timeout=_setting("CIRCUIT_RESET_TIMEOUT", 30),
+                    half_open_probes=int(_setting("CIRCUIT_HALF_OPEN_PROBES", 1)))
+    return breaker
+
+
+def get_retry_budget(upstream):
+    budget = _budgets.get(upstream)
+    if budget is None:
+        with _lock:
+            budget = _budgets.get(upstream)
+            if budget is None:
+                budget = _budgets[upstream] = RetryBudget(_setting("RETRY_BUDGET_RATIO", 0.2),
+                                                          _setting("RETRY_BUDGET_RESERVE", 10))
+    return budget
+
+
+def available(upstream):
+    """
+    Whether calls to `upstream` are currently let through by its circuit breaker.
+    """
+    return get_breaker(upstream).available()
+
+
+def breaker_states():
+    return {upstream: breaker.state for upstream, breaker in list(_breakers.items())}
+
+
+def reset():
+    """
+    Forget all breakers and budgets (they are created again, with the current settings, on the next call).
+    """
+    with _lock:
+        _breakers.clear()
+        _budgets.clear()
+
+
+def backoff(attempt):
+    """
+    Full-jitter exponential backoff (seconds) before retry number `attempt` (1-based).
+    """
+    ceiling = min(_setting("RETRY_BACKOFF_MAX", 2.0), _setting("RETRY_BACKOFF_BASE", 0.1) * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+
+def is_transient(error):
+    """
+    Whether an upstream error is worth retrying (and counts against the upstream's circuit breaker).
+    """
+    if isinstance(error, (DeadlineExceeded, UpstreamUnavailable)):
+        return False
+    # OpenAI errors carry http_status; requests' HTTPError carries the response
+    status = getattr(error, 'http_status', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status is not None:
+        return status in TRANSIENT_STATUSES
+
+    import requests
+    from openai import error as openai_error
+
+    return isinstance(error, (ConnectionError, TimeoutError, requests.ConnectionError, requests.Timeout,
+                              openai_error.APIConnectionError, openai_error.Timeout, openai_error.TryAgain,
+                              openai_error.ServiceUnavailableError))
+
+
+def call(upstream, operation, function, idempotent=True):
+    """
+    Make one upstream call (`function()`) through the upstream's circuit breaker, retrying transient failures.
+
+    Raises CircuitOpen without calling the upstream while its breaker is open, and UpstreamUnavailable (chaining the
+    last error) when a transient failure is not retried away. Other errors (e.g. a reverted contract call or an HTTP
+    400) are raised unchanged and do not count against the breaker.
+    """
+    breaker = get_breaker(upstream)
+    budget = get_retry_budget(upstream)
+    budget.deposit()
+    max_retries = int(_setting("UPSTREAM_MAX_RETRIES", 2)) if idempotent else 0
+    attempt = 0
+    while True:
+        probe = breaker.acquire()
+        try:
+            with track_upstream(upstream, operation):
+                result = function()
+        except DeadlineExceeded:
+            breaker.release(probe)
+            raise
+        except Exception as e:
+            if not is_transient(e):
+                # The upstream answered, so it is up
+                breaker.record_success(probe)
+                raise
+            if expired():
+                # Timed out because the request ran out of time, not because the upstream is down
+                breaker.release(probe)
+                raise DeadlineExceeded(f"Request deadline exceeded during {upstream} {operation}.") from e
+            breaker.record_failure(probe)
+            attempt += 1
+            if attempt > max_retries:
+                raise UpstreamUnavailable(upstream, f"{upstream} {operation} failed: {e}") from e
+            delay = backoff(attempt)
+            left = remaining()
+            if left is not None and delay >= left:
+                raise UpstreamUnavailable(upstream, f"{upstream} {operation} failed: {e}") from e
+            if not budget.withdraw():
+                UPSTREAM_REJECTED.labels(upstream, "retry_budget").inc()
+                raise UpstreamUnavailable(upstream, f"{upstream} {operation} failed (retry budget spent): {e}") from e
+            UPSTREAM_RETRIES.labels(upstream).inc()
+            logger.warning("Retrying %s %s in %.2fs (attempt %s): %s", upstream, operation, delay, attempt + 1, e)
+            time.sleep(delay)
+            continue
+        breaker.record_success(probe)
+        return result
+
+
+def register_flask(app):
+    """
+    Answer requests that failed on an unavailable upstream with a 503 (and Retry-After while a breaker is open).
+    """
+    from flask import jsonify
+
+    @app.errorhandler(UpstreamUnavailable)
+    def _upstream_unavailable(error):
+        logger.warning("Request failed on an unavailable upstream: %s", error)
+        response = jsonify({"error": f"{error.upstream} is temporarily unavailable"})
+        response.status_code = 503
+        if error.retry_after:
+            response.headers["Retry-After"] = str(int(error.retry_after + 0.999))
+        return response
+
+    return app
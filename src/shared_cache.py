@@ -0,0 +1,311 @@
+"""
+Cache shared by all worker processes on a host, in a memory-mapped file.
+
+Gunicorn workers are separate processes, so in-process caches are duplicated in every worker and start cold after
+every restart. This cache lives in one memory-mapped file (under /dev/shm by default, so it stays in memory) that
+every worker maps. It holds:
+
+- Snapshot proposals per space: fresh for SNAPSHOT_CACHE_TTL seconds (default 30), and kept for SNAPSHOT_STALE_TTL
+  (default 3600) as the fallback while Snapshot is unavailable (see src/resilience.py).
+- Wallet balances per RPC endpoint for BALANCE_CACHE_TTL seconds (default 10); a wallet's entry is dropped when it
+  votes.
+- LLM analyses of identical requests (same tenant and prompt) for ANALYSIS_CACHE_TTL seconds (default 600).
+
+Values are pickled into a ring buffer of SHARED_CACHE_SIZE MB (default 64). When it is full, the oldest entries are
+overwritten; entries read shortly before they would be overwritten are copied to the front, so eviction is close to
+LRU. Every entry also expires after its TTL. An index of SHARED_CACHE_ENTRIES slots (default 16384, in buckets of 8)
+maps keys to entries; keys are stored as digests only. Every access holds an fcntl lock on the file, so workers never
+see each other's partial writes. Since the values are unpickled, the file is created with mode 0600 and refused if
+another user owns it or can access it.
+
+SHARED_CACHE_PATH sets the file; with an empty value (or without fcntl, e.g. on Windows) each process keeps its own
+in-memory cache instead. With gunicorn.conf.py, the master process warms the caches before it forks the workers
+(see preload()).
+"""
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from config.settings import get_setting
+from src.logging_config import setup_logger
+
+try:
+    import fcntl
+except ImportError:
+    # No shared cache on this platform, see get_cache()
+    fcntl = None
+
+# Set up logging
+logger = setup_logger()
+
+MAGIC = b"DAOCACH1"
+# magic, buckets, ways per bucket, data size, head (absolute write position in the ring)
+_HEADER = struct.Struct("<8sIIQQ")
+HEADER_SIZE = 64
+# key hash, position in the ring + 1 (0: empty slot), record length, expiry (time.time())
+_SLOT = struct.Struct("<QQId")
+WAYS = 8
+DIGEST_SIZE = 16
+
+
+def _digest(key):
+    return hashlib.blake2b(key.encode(), digest_size=DIGEST_SIZE).digest()
+
+
+class SharedCache:
+    """
+    Key-value cache with per-entry TTLs in a memory-mapped file, shared by every process that opens the same path.
+    """
+
+    def __init__(self, path, data_size=64 << 20, entries=16384):
+        self.path = path
+        self.buckets = max(1, entries // WAYS)
+        self.data_size = data_size
+        self._data_offset = HEADER_SIZE + self.buckets * WAYS * _SLOT.size
+        self._open()
+        # The lock file descriptor must not be shared with the parent (flock locks belong to the open file)
+        os.register_at_fork(after_in_child=self._reopen)
+
+    def _open(self):
+        self._lock = threading.Lock()
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+        try:
+            info = os.fstat(fd)
+            if info.st_uid != os.getuid() or info.st_mode & 0o077:
+                raise PermissionError(f"{self.path} must be owned by this user and not accessible to others")
+            size = self._data_offset + self.data_size
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if info.st_size != size:
+                    os.ftruncate(fd, size)
+                self._map = mmap.mmap(fd, size)
+                magic, buckets, ways, data_size, _ = _HEADER.unpack_from(self._map, 0)
+                if (magic, buckets, ways, data_size) != (MAGIC, self.buckets, WAYS, self.data_size):
+                    # A new file, or one created with other settings: start empty
+                    self._map[:self._data_offset] = bytes(self._data_offset)
+                    _HEADER.pack_into(self._map, 0, MAGIC, self.buckets, WAYS, self.data_size, 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        except Exception:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    def _reopen(self):
+        os.close(self._fd)
+        self._map.close()
+        self._open()
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _head(self):
+        return struct.unpack_from("<Q", self._map, 24)[0]
+
+    def _slots(self, key_hash):
+        first = HEADER_SIZE + (key_hash % self.buckets) * WAYS * _SLOT.size
+        return range(first, first + WAYS * _SLOT.size, _SLOT.size)
+
+    def _intact(self, start, head):
+        # Ring bytes at absolute position p are overwritten once the head passes p + data_size
+        return start >= head - self.data_size
+
+    def _append(self, record):
+        """
+        Write a record at the head of the ring (records never wrap around its end) and return its position.
+        """
+        head = self._head()
+        if head % self.data_size + len(record) > self.data_size:
+            head += self.data_size - head % self.data_size
+        offset = self._data_offset + head % self.data_size
+        self._map[offset:offset + len(record)] = record
+        struct.pack_into("<Q", self._map, 24, head + len(record))
+        return head
+
+    def get(self, key):
+        """
+        Return the cached value for `key`, or None if it is missing or expired.
+        """
+        digest = _digest(key)
+        key_hash = int.from_bytes(digest[:8], "little")
+        with self._locked():
+            head = self._head()
+            for slot in self._slots(key_hash):
+                slot_hash, position, length, expires = _SLOT.unpack_from(self._map, slot)
+                if slot_hash != key_hash or not position:
+                    continue
+                start = position - 1
+                if not self._intact(start, head) or expires < time.time():
+                    _SLOT.pack_into(self._map, slot, 0, 0, 0, 0.0)
+                    return None
+                offset = self._data_offset + start % self.data_size
+                record = bytes(self._map[offset:offset + length])
+                if record[:DIGEST_SIZE] != digest:
+                    continue
+                if start < head - self.data_size * 3 // 4:
+                    # Read shortly before it would be overwritten: keep it by moving it to the front
+                    _SLOT.pack_into(self._map, slot, key_hash, self._append(record) + 1, length, expires)
+                break
+            else:
+                return None
+        try:
+            return pickle.loads(record[DIGEST_SIZE:])
+        except Exception as e:
+            logger.warning("Dropping an unreadable shared cache entry: %s", e)
+            self.delete(key)
+            return None
+
+    def set(self, key, value, ttl):
+        """
+        Cache `value` under `key` for `ttl` seconds (values above an eighth of the cache size are not cached).
+        """
+        if ttl <= 0:
+            return False
+        digest = _digest(key)
+        key_hash = int.from_bytes(digest[:8], "little")
+        record = digest + pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(record) > self.data_size // 8:
+            return False
+        with self._locked():
+            head = self._head()
+            now = time.time()
+            chosen = oldest = None
+            for slot in self._slots(key_hash):
+                slot_hash, position, _, expires = _SLOT.unpack_from(self._map, slot)
+                if slot_hash == key_hash:
+                    chosen = slot
+                    break
+                if chosen is None and (not position or not self._intact(position - 1, head) or expires < now):
+                    chosen = slot
+                if oldest is None or position < oldest[1]:
+                    oldest = (slot, position)
+            slot = chosen if chosen is not None else oldest[0]
+            _SLOT.pack_into(self._map, slot, key_hash, self._append(record) + 1, len(record), now + ttl)
+        return True
+
+    def delete(self, key):
+        key_hash = int.from_bytes(_digest(key)[:8], "little")
+        with self._locked():
+            for slot in self._slots(key_hash):
+                if _SLOT.unpack_from(self._map, slot)[0] == key_hash:
+                    _SLOT.pack_into(self._map, slot, 0, 0, 0, 0.0)
+
+    def clear(self):
+        with self._locked():
+            self._map[HEADER_SIZE:self._data_offset] = bytes(self._data_offset - HEADER_SIZE)
+            struct.pack_into("<Q", self._map, 24, 0)
+
+
+class LocalCache:
+    """
+    In-process cache with the SharedCache interface, used when the shared cache is disabled or unavailable.
+
+    Unlike SharedCache, it returns the cached objects themselves rather than copies.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        if ttl <= 0:
+            return False
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def default_path():
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, f"dao_agent_cache_{os.getuid()}")
+
+
+@lru_cache(maxsize=None)
+def get_cache():
+    """
+    Return the process-wide cache: the shared cache file, or an in-process cache if it is disabled or unavailable.
+    """
+    if fcntl is None:
+        return LocalCache()
+    path = get_setting("SHARED_CACHE_PATH", default_path())
+    if not path:
+        return LocalCache()
+    try:
+        cache = SharedCache(path, int(float(get_setting("SHARED_CACHE_SIZE", 64)) * (1 << 20)),
+                            int(get_setting("SHARED_CACHE_ENTRIES", 16384)))
+    except OSError as e:
+        logger.warning("Shared cache %s unavailable, caching per process: %s", path, e)
+        return LocalCache()
+    logger.info("Opened shared cache %s", path)
+    return cache
+
+
+def preload():
+    """
+    Warm the caches in the gunicorn master before the workers are forked (see gunicorn.conf.py).
+
+    Parses every tenant's ABI and loads the similarity indexes, which the workers inherit, and fetches the Snapshot
+    proposals of every tenant's space into the shared cache. Failures are logged and skipped.
+    """
+    import sqlite3
+
+    from src.abi_registry import get_abi
+    from src.deadline import deadline
+    from src.proposals import fetch_snapshot_proposals
+    from src.similarity import get_index
+    from src.tenants import get_registry
+
+    started = time.perf_counter()
+    tenants = list(get_registry().tenants.values())
+    for tenant_id in dict.fromkeys([""] + [tenant.tenant_id for tenant in tenants]):
+        try:
+            get_index(tenant_id)
+        except sqlite3.Error as e:
+            logger.warning("Could not preload the similarity index of tenant %r: %s", tenant_id, e)
+    for tenant in tenants:
+        try:
+            if tenant.abi:
+                get_abi(tenant.abi)
+            if tenant.space:
+                with deadline(float(get_setting("PRELOAD_TIMEOUT", 10))):
+                    fetch_snapshot_proposals(tenant.space)
+        except Exception as e:
+            logger.warning("Could not preload the caches of tenant %s: %s", tenant.tenant_id, e)
+    logger.info("Preloaded caches for %s tenants in %.2fs", len(tenants), time.perf_counter() - started)
@@ -0,0 +1,255 @@
+"""
+Similarity index over analyzed proposals, used to reuse earlier LLM analyses for near-duplicate proposals.
+
+DAOs often re-submit nearly identical proposals (re-votes, parameter tweaks, recurring grants). Each analyzed
+proposal is reduced to a MinHash signature of its word 3-grams (title and body), computed with NumPy. Before an
+analysis, analyze_project_status looks up the nearest earlier analyses:
+
+- similarity >= SIMILARITY_REUSE_THRESHOLD (default 0.9): the earlier analysis is reused and the proposal is not
+  sent to the LLM again.
+- similarity >= SIMILARITY_CONTEXT_THRESHOLD (default 0.5): up to SIMILARITY_MAX_CONTEXT earlier analyses (cut to
+  SIMILARITY_CONTEXT_CHARS characters) are added to the prompt as context.
+
+Lookups use locality-sensitive hashing: signatures are split into bands, and only proposals sharing a band with the
+query are compared, so lookup time stays flat as the index grows. The signatures and analyses are stored in the
+proposal archive (src/archive.py) and loaded once per tenant; without an archive the index lives in memory only.
+Measure lookup latency with:
+  python -m benchmarks.similarity_lookup --entries 100000
+"""
+import re
+import sqlite3
+import threading
+import zlib
+
+import numpy as np
+
+from config.settings import get_setting
+from src.archive import get_archive
+from src.logging_config import setup_logger
+from src.metrics import record_cache
+from src.tenants import current_tenant
+
+# Set up logging
+logger = setup_logger()
+
+PERMUTATIONS = 128
+BANDS = 32
+ROWS_PER_BAND = PERMUTATIONS // BANDS
+
+# Proposals with fewer words than this (e.g. on-chain proposals without a description) are not compared
+MIN_WORDS = 8
+
+_WORD = re.compile(r"\w+")
+
+# Random multiply-shift hash functions, fixed so signatures stay comparable across processes and restarts
+_rng = np.random.default_rng(20240917)
+_MULTIPLIERS = _rng.integers(1, 2 ** 63, size=PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _rng.integers(0, 2 ** 63, size=PERMUTATIONS, dtype=np.uint64)
+_BAND_WEIGHTS = _rng.integers(1, 2 ** 63, size=ROWS_PER_BAND, dtype=np.uint64) | np.uint64(1)
+
+
+def _setting(name, default):
+    return float(get_setting(name, default))
+
+
+def proposal_text(proposal):
+    return f"{proposal.title or ''}\n{proposal.body or ''}"
+
+
+def signature(text):
+    """
+    MinHash signature (PERMUTATIONS uint32 values) of the word 3-grams of `text`, or None for too short texts.
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+    hashes = np.fromiter((zlib.crc32(word.encode()) for word in words), dtype=np.uint64, count=len(words))
+    with np.errstate(over='ignore'):
+        shingles = np.unique(hashes[:-2] * np.uint64(0x9E3779B97F4A7C15) ^ hashes[1:-1] * np.uint64(0xC2B2AE3D27D4EB4F)
+                             ^ hashes[2:])
+        hashed = (_MULTIPLIERS[:, None] * shingles[None, :] + _OFFSETS[:, None]) >> np.uint64(32)
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+def _band_keys(signatures):
+    """
+    One 64-bit key per band for each signature (rows: signatures, columns: bands).
+    """
+    rows = signatures.reshape(len(signatures), BANDS, ROWS_PER_BAND).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        return (rows * _BAND_WEIGHTS).sum(axis=2, dtype=np.uint64).view(np.int64)
+
+
+class SimilarityIndex:
+    """
+    MinHash signatures with an LSH band index.
+
+    Band keys of the first `_sorted` signatures are kept sorted per band and searched with binary search; newer
+    signatures are scanned directly until there are enough of them to re-sort.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self._signatures = np.empty((0, PERMUTATIONS), dtype=np.uint32)
+        self._keys = np.empty((0, BANDS), dtype=np.int64)
+        self._count = 0
+        self._sorted = 0
+        self._sorted_keys = np.empty((BANDS, 0), dtype=np.int64)
+        self._order = np.empty((BANDS, 0), dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def add_many(self, signatures, entries):
+        signatures = np.asarray(signatures, dtype=np.uint32).reshape(-1, PERMUTATIONS)
+        keys = _band_keys(signatures)
+        with self._lock:
+            needed = self._count + len(signatures)
+            if needed > len(self._signatures):
+                capacity = max(needed, 2 * len(self._signatures), 1024)
+                grown_signatures = np.empty((capacity, PERMUTATIONS), dtype=np.uint32)
+                grown_signatures[:self._count] = self._signatures[:self._count]
+                grown_keys = np.empty((capacity, BANDS), dtype=np.int64)
+                grown_keys[:self._count] = self._keys[:self._count]
+                self._signatures, self._keys = grown_signatures, grown_keys
+            self._signatures[self._count:needed] = signatures
+            self._keys[self._count:needed] = keys
+            self.entries.extend(entries)
+            self._count = needed
+            if self._count - self._sorted > max(1024, self._sorted // 8):
+                self._sort()
+
+    def add(self, signature, entry):
+        self.add_many([signature], [entry])
+
+    def _sort(self):
+        keys = self._keys[:self._count].T
+        self._order = np.argsort(keys, axis=1, kind='stable')
+        self._sorted_keys = np.take_along_axis(keys, self._order, axis=1)
+        self._sorted = self._count
+
+    def query(self, signature, limit=3, min_similarity=0.0):
+        """
+        Up to `limit` (similarity, entry) pairs most similar to `signature`, best first.
+        """
+        keys = _band_keys(signature[None, :])[0]
+        with self._lock:
+            candidates = []
+            for band in range(BANDS):
+                low = np.searchsorted(self._sorted_keys[band], keys[band], side='left')
+                high = np.searchsorted(self._sorted_keys[band], keys[band], side='right')
+                if high > low:
+                    candidates.append(self._order[band, low:high])
+            if self._count > self._sorted:
+                tail = np.nonzero((self._keys[self._sorted:self._count] == keys).any(axis=1))[0]
+                candidates.append(tail + self._sorted)
+            if not candidates:
+                return []
+            rows = np.unique(np.concatenate(candidates))
+            similarities = np.count_nonzero(self._signatures[rows] == signature, axis=1) / PERMUTATIONS
+            best = np.argsort(-similarities, kind='stable')[:limit]
+            return [(float(similarities[i]), self.entries[rows[i]]) for i in best
+                    if similarities[i] >= min_similarity]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(tenant_id=""):
+    """
+    Return the similarity index of a tenant, loaded from the archive on first use.
+    """
+    index = _indexes.get(tenant_id)
+    if index is not None:
+        return index
+    with _indexes_lock:
+        index = _indexes.get(tenant_id)
+        if index is None:
+            index = SimilarityIndex()
+            archive = get_archive()
+            if archive is not None:
+                rows = archive.analysis_signatures(tenant_id)
+                if rows:
+                    index.add_many(np.frombuffer(b"".join(row['signature'] for row in rows), dtype=np.uint32),
+                                   [row['pk'] for row in rows])
+                logger.info("Loaded %s analyzed proposals into the similarity index", len(rows))
+            _indexes[tenant_id] = index
+    return index
+
+
+def _tenant_id():
+    tenant = current_tenant()
+    return tenant.tenant_id if tenant is not None else ""
+
+
+def find_similar(proposal, limit=None, min_similarity=None):
+    """
+    Earlier analyses of proposals similar to `proposal`: a list of {"similarity", "title", "analysis"}, best first.
+    """
+    proposal_signature = signature(proposal_text(proposal))
+    if proposal_signature is None:
+        return []
+    limit = int(limit or _setting("SIMILARITY_MAX_CONTEXT", 3))
+    if min_similarity is None:
+        min_similarity = _setting("SIMILARITY_CONTEXT_THRESHOLD", 0.5)
+    matches = get_index(_tenant_id()).query(proposal_signature, limit, min_similarity)
+
+    # Archive-backed entries are pks; their analyses are read from the archive on a hit
+    archive = get_archive()
+    stored = archive.get_analyses([entry for _, entry in matches if isinstance(entry, int)]) if archive else {}
+    results = []
+    for similarity, entry in matches:
+        entry = stored.get(entry) if isinstance(entry, int) else entry
+        if entry:
+            results.append({"similarity": similarity, "title": entry['title'], "analysis": entry['analysis']})
+    return results
+
+
+def remember_analysis(proposal, analysis):
+    """
+    Add an analyzed proposal to the similarity index (and the archive, if enabled).
+    """
+    proposal_signature = signature(proposal_text(proposal))
+    if proposal_signature is None or not analysis:
+        return
+    tenant_id = _tenant_id()
+    archive = get_archive()
+    entry = {"title": proposal.title, "analysis": analysis}
+    if archive is not None:
+        try:
+            entry = archive.record_analysis(proposal, analysis, proposal_signature.tobytes(), tenant_id=tenant_id)
+        except sqlite3.Error as e:
+            logger.warning("Could not store the analysis of proposal %s: %s", proposal.id, e)
+            return
+    get_index(tenant_id).add(proposal_signature, entry)
+
+
+def plan_analysis(proposals):
+    """
+    Split proposals into those with a reusable earlier analysis and those that need a new one.
+
+    Returns (reused, fresh, context): reused is a list of (proposal, match), fresh a list of proposals, and context
+    the earlier analyses of proposals similar to the fresh ones (compact text for the prompt, or "").
+    """
+    reuse_threshold = _setting("SIMILARITY_REUSE_THRESHOLD", 0.9)
+    context_chars = int(_setting("SIMILARITY_CONTEXT_CHARS", 400))
+    reused, fresh, context = [], [], []
+    for proposal in proposals:
+        try:
+            matches = find_similar(proposal)
+        except sqlite3.Error as e:
+            logger.warning("Similarity lookup failed for proposal %s: %s", proposal.id, e)
+            matches = []
+        if matches and matches[0]['similarity'] >= reuse_threshold:
+            reused.append((proposal, matches[0]))
+            record_cache("analysis", True)
+            continue
+        record_cache("analysis", False)
+        fresh.append(proposal)
+        for match in matches:
+            analysis = match['analysis'] if len(match['analysis']) <= context_chars \
+                else match['analysis'][:context_chars] + "..."
+            context.append(f"- {match['title']} (similarity {match['similarity']:.2f}): {analysis}")
+    return reused, fresh, "\n".join(dict.fromkeys(context))
@@ -0,0 +1,307 @@
+"""
+Gasless votes on Snapshot proposals, signed locally as EIP-712 messages and submitted to the Snapshot sequencer.
+
+Proposals from the Snapshot fallback of fetch_active_proposals cannot be voted on with a contract transaction. A
+Snapshot vote is a typed message (domain "snapshot", version 0.1.4) signed by the voting wallet and posted to the
+sequencer, which checks the signature and the voting power itself: no gas and no confirmation wait.
+
+- Votes are signed in bulk: the domain separator and type hashes are computed once, each wallet's key is loaded once
+  for all of its votes, and every message is hashed directly instead of going through the generic typed-data
+  encoder. eth_keys signs with coincurve when it is installed, which is much faster than its pure-Python backend.
+- Signed votes are submitted concurrently (SNAPSHOT_VOTE_CONCURRENCY, default 8) to SNAPSHOT_SEQUENCER_URL (default
+  https://seq.snapshot.org), through the "sequencer" circuit breaker (see src/resilience.py) and within the request
+  deadline (see src/deadline.py).
+- Wallets given as addresses sign with the keys in SNAPSHOT_SIGNER_KEYS (comma-separated private keys); local
+  accounts sign with their own key.
+- handle_new_proposal only votes on Snapshot proposals with SNAPSHOT_AUTO_VOTE=true, and only when the analysis has a
+  verdict on the proposal.
+
+cast_vote routes Snapshot proposal ids here. Measure signing and submission throughput against a local stand-in
+sequencer with:
+  python -m benchmarks.snapshot_voting --wallets 10 --proposals 50
+"""
+import contextvars
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from config.settings import get_setting
+from src.archive import record_vote
+from src.deadline import upstream_timeout
+from src.logging_config import setup_logger
+from src.resilience import TRANSIENT_STATUSES, call
+from src.tracing import traced
+
+# Set up logging
+logger = setup_logger()
+
+DOMAIN = {"name": "snapshot", "version": "0.1.4"}
+DEFAULT_APP = "dao-voting-agent"
+
+# Choice names that mean the same as the agent's yes/no/abstain, in the order they are looked for
+_CHOICE_NAMES = {
+    "yes": ("yes", "for", "approve", "yae"),
+    "no": ("no", "against", "reject", "nay"),
+    "abstain": ("abstain",),
+}
+# Snapshot's basic voting options are For, Against and Abstain (1-based)
+_BASIC_CHOICES = {"yes": 1, "no": 2, "abstain": 3}
+
+
+class VoteRejected(ValueError):
+    """
+    The sequencer refused a vote (e.g. no voting power, or the proposal is closed).
+    """
+
+
+def is_snapshot_proposal_id(proposal_id):
+    """
+    Snapshot proposal ids are 32-byte hex strings (older ones are IPFS hashes); on-chain ids are integers.
+    """
+    if not isinstance(proposal_id, str):
+        return False
+    if proposal_id.startswith("0x"):
+        return len(proposal_id) == 66
+    return proposal_id.startswith(("Qm", "bafy"))
+
+
+def choice_number(vote_choice, choices=()):
+    """
+    Snapshot choice number (1-based) for a vote choice: a number, one of the proposal's choices, or yes/no/abstain.
+    """
+    if isinstance(vote_choice, int) or (isinstance(vote_choice, str) and vote_choice.strip().isdigit()):
+        number = int(vote_choice)
+        if number < 1 or (choices and number > len(choices)):
+            raise ValueError(f"Choice {number} is not an option of this proposal.")
+        return number
+    wanted = str(vote_choice).strip().lower()
+    names = [choice.lower() for choice in choices]
+    if wanted in names:
+        return names.index(wanted) + 1
+    for name in _CHOICE_NAMES.get(wanted, ()):
+        if name in names:
+            return names.index(name) + 1
+    if not choices and wanted in _BASIC_CHOICES:
+        return _BASIC_CHOICES[wanted]
+    raise ValueError(f"Cannot map the vote choice '{vote_choice}' to the proposal's choices {list(choices)}.")
+
+
+def _keccak(data):
+    from eth_utils import keccak
+
+    return keccak(data)
+
+
+@lru_cache(maxsize=None)
+def _type_fields(proposal_type, choice_type):
+    return (("from", "address"), ("space", "string"), ("timestamp", "uint64"), ("proposal", proposal_type),
+            ("choice", choice_type), ("reason", "string"), ("app", "string"), ("metadata", "string"))
+
+
+@lru_cache(maxsize=None)
+def _type_hash(proposal_type, choice_type):
+    fields = ",".join(f"{kind} {name}" for name, kind in _type_fields(proposal_type, choice_type))
+    return _keccak(f"Vote({fields})".encode())
+
+
+@lru_cache(maxsize=None)
+def _domain_separator():
+    return _keccak(_keccak(b"EIP712Domain(string name,string version)") + _keccak(DOMAIN["name"].encode())
+                   + _keccak(DOMAIN["version"].encode()))
+
+
+class SnapshotVote:
+    """
+    One vote of a wallet on a Snapshot proposal. `choice` is a choice number, or a list of them for approval and
+    ranked-choice proposals.
+    """
+    __slots__ = ("voter", "space", "proposal", "choice", "reason", "app", "metadata", "timestamp")
+
+    def __init__(self, voter, space, proposal, choice, reason="", app=DEFAULT_APP, metadata="{}", timestamp=None):
+        from eth_utils import to_checksum_address
+
+        self.voter = to_checksum_address(voter)
+        self.space = space
+        self.proposal = proposal
+        self.choice = choice
+        self.reason = reason
+        self.app = app
+        self.metadata = metadata
+        self.timestamp = int(time.time()) if timestamp is None else timestamp
+
+    def _types(self):
+        proposal_type = "bytes32" if self.proposal.startswith("0x") else "string"
+        choice_type = "uint32[]" if isinstance(self.choice, (list, tuple)) else "uint32"
+        return proposal_type, choice_type
+
+    def typed_data(self):
+        """
+        The EIP-712 typed data as the sequencer expects it.
+        """
+        fields = _type_fields(*self._types())
+        message = {"from": self.voter, "space": self.space, "timestamp": self.timestamp, "proposal": self.proposal,
+                   "choice": list(self.choice) if isinstance(self.choice, (list, tuple)) else self.choice,
+                   "reason": self.reason, "app": self.app, "metadata": self.metadata}
+        return {"domain": dict(DOMAIN), "types": {"Vote": [{"name": name, "type": kind} for name, kind in fields]},
+                "message": message}
+
+    def digest(self):
+        """
+        The EIP-712 hash that is signed.
+        """
+        proposal_type, choice_type = self._types()
+        if choice_type == "uint32":
+            choice = self.choice.to_bytes(32, "big")
+        else:
+            choice = _keccak(b"".join(number.to_bytes(32, "big") for number in self.choice))
+        proposal = bytes.fromhex(self.proposal[2:]) if proposal_type == "bytes32" else _keccak(self.proposal.encode())
+        struct_hash = _keccak(
+            _type_hash(proposal_type, choice_type) + bytes.fromhex(self.voter[2:]).rjust(32, b"\0")
+            + _keccak(self.space.encode()) + self.timestamp.to_bytes(32, "big") + proposal + choice
+            + _keccak(self.reason.encode()) + _keccak(self.app.encode()) + _keccak(self.metadata.encode()))
+        return _keccak(b"\x19\x01" + _domain_separator() + struct_hash)
+
+
+@lru_cache(maxsize=None)
+def _configured_keys():
+    from eth_keys import keys
+
+    signers = {}
+    for value in get_setting("SNAPSHOT_SIGNER_KEYS", "").split(","):
+        if value.strip():
+            key = keys.PrivateKey(bytes.fromhex(value.strip().removeprefix("0x")))
+            signers[key.public_key.to_checksum_address()] = key
+    return signers
+
+
+def signing_key(account):
+    """
+    Signing key of a wallet: the key of a local account, or the configured key of an address.
+    """
+    from eth_keys import keys
+    from eth_utils import to_checksum_address
+
+    if hasattr(account, 'key'):
+        return keys.PrivateKey(bytes(account.key))
+    address = to_checksum_address(account)
+    key = _configured_keys().get(address)
+    if key is None:
+        raise ValueError(f"No signing key for {address}: add it to SNAPSHOT_SIGNER_KEYS to vote on Snapshot proposals.")
+    return key
+
+
+def snapshot_auto_vote():
+    """
+    Whether proposals handled automatically (by the watcher or the API, see handle_new_proposal) get Snapshot votes.
+    Off unless SNAPSHOT_AUTO_VOTE is true; votes asked for explicitly (cast_vote, batch runs with --vote) are cast.
+    """
+    return get_setting("SNAPSHOT_AUTO_VOTE", "false").lower() in ("1", "true", "yes")
+
+
+def can_sign_snapshot_votes(account):
+    """
+    Whether Snapshot votes of a wallet can be signed (logs why not).
+    """
+    try:
+        signing_key(account)
+    except ValueError as e:
+        logger.warning("Not voting on Snapshot proposals: %s", e)
+        return False
+    return True
+
+
+def sign_votes(votes, keys=None):
+    """
+    Sign votes in bulk; returns their 65-byte signatures as hex strings, in order.
+
+    `keys` maps voter addresses to eth_keys private keys; voters without one are looked up with signing_key().
+    """
+    keys = dict(keys or {})
+    signatures = []
+    for vote in votes:
+        key = keys.get(vote.voter)
+        if key is None:
+            key = keys[vote.voter] = signing_key(vote.voter)
+        signature = key.sign_msg_hash(vote.digest())
+        # r, s and v as 27/28, as wallets sign
+        signatures.append("0x" + (signature.r.to_bytes(32, "big") + signature.s.to_bytes(32, "big")
+                                  + bytes([signature.v + 27])).hex())
+    return signatures
+
+
+def submit_vote(vote, sig):
+    """
+    Post one signed vote to the sequencer; returns its receipt (id, ipfs and relayer).
+    """
+    import requests
+
+    url = get_setting("SNAPSHOT_SEQUENCER_URL", "https://seq.snapshot.org")
+    payload = {"address": vote.voter, "sig": sig, "data": vote.typed_data()}
+
+    def post():
+        response = requests.post(url, json=payload, timeout=upstream_timeout())
+        if response.status_code in TRANSIENT_STATUSES:
+            # Retried, and counted against the circuit breaker
+            response.raise_for_status()
+        return response
+
+    # A retry resends the same signed message, and Snapshot counts one vote per wallet and proposal
+    response = call("sequencer", "vote", post)
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    if response.status_code != 200:
+        raise VoteRejected(f"Snapshot refused the vote on {vote.proposal}: "
+                           f"{body.get('error_description') or body.get('error') or response.status_code}")
+    return body
+
+
+@traced()
+def cast_snapshot_votes(votes, keys=None, concurrency=None):
+    """
+    Sign votes in bulk and submit them to the sequencer concurrently.
+
+    Returns one result per vote, in order: {"proposal_id", "voter", "choice"} with the sequencer's "receipt" id, or
+    with the "error" that stopped it (the exception itself, so callers can tell refusals from outages).
+    """
+    votes = list(votes)
+    if not votes:
+        return []
+    signatures = sign_votes(votes, keys)
+    concurrency = min(len(votes), int(concurrency or get_setting("SNAPSHOT_VOTE_CONCURRENCY", 8)))
+
+    def submit(vote, sig):
+        result = {"proposal_id": vote.proposal, "voter": vote.voter, "choice": vote.choice}
+        try:
+            result["receipt"] = submit_vote(vote, sig).get("id")
+        except Exception as e:
+            logger.error("Snapshot vote of %s on %s failed: %s", vote.voter, vote.proposal, e)
+            result["error"] = e
+            return result
+        record_vote(vote.proposal, vote.voter, json.dumps(vote.choice), result["receipt"], source="snapshot")
+        return result
+
+    # Every submission runs in a copy of the caller's context, so it keeps the request deadline and tenant
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, submit, vote, sig)
+                   for vote, sig in zip(votes, signatures)]
+        results = [future.result() for future in futures]
+    logger.info("Submitted %s Snapshot votes (%s refused or failed).", len(results),
+                sum("error" in result for result in results))
+    return results
+
+
+def cast_snapshot_vote(account, space, proposal_id, vote_choice, choices=()):
+    """
+    Sign and submit a single vote; returns the sequencer's receipt id.
+    """
+    if not space:
+        raise ValueError("The Snapshot space is required to vote on a Snapshot proposal.")
+    key = signing_key(account)
+    vote = SnapshotVote(key.public_key.to_checksum_address(), space, proposal_id, choice_number(vote_choice, choices))
+    result = cast_snapshot_votes([vote], keys={vote.voter: key})[0]
+    if "error" in result:
+        raise result["error"]
+    return result["receipt"]
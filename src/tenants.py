@@ -0,0 +1,243 @@
+"""
+Multi-tenant DAO configuration registry.
+
+Each tenant holds one DAO configuration (space, ABI, contract address, RPC URL and wallet address) and is looked up
+by API key (the X-API-Key header on the Flask routes) or by Theoriq agent id (the sender of a Theoriq request, see
+theoriq_sender). The registry is loaded once per process from TENANTS_FILE:
+
+- JSON or YAML: a list of tenants, or {"tenants": [...]}, e.g.
+  [{"id": "uniswap", "api_key": "...", "agent_id": "0x...", "space": "uniswap", "abi": [...],
+    "contract_address": "0x...", "infura_url": "https://...", "wallet_address": "0x..."}]
+  api_key and agent_id may also be lists.
+- SQLite (.db, .sqlite, .sqlite3): a `tenants` table with the same columns (ABI stored as a JSON string).
+
+Lookups are dictionary reads. ABIs are parsed when the registry is loaded, and each tenant's Web3 instance and
+contract object (from src/abi_registry.py) are built on first use and reused for every later request.
+
+The tenant of the current request is kept in a context variable, so get_user_inputs() returns its configuration
+without touching the process-wide user_inputs_cache. Server requests are also marked non-interactive: code paths
+that would otherwise prompt on stdin raise or skip the prompt instead.
+"""
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from config.settings import get_setting
+from src.logging_config import setup_logger
+
+# Set up logging
+logger = setup_logger()
+
+API_KEY_HEADER = "X-API-Key"
+
+_current_tenant = ContextVar("current_tenant", default=None)
+_interactive = ContextVar("interactive", default=True)
+
+
+class Tenant:
+    """
+    One DAO configuration with its parsed ABI and lazily built Web3 and contract objects.
+    """
+    __slots__ = ("tenant_id", "api_keys", "agent_ids", "space", "abi", "contract_address", "infura_url",
+                 "wallet_address", "user_inputs", "_web3", "_contract")
+
+    def __init__(self, tenant_id, space=None, abi=None, contract_address=None, infura_url=None, wallet_address=None,
+                 api_keys=(), agent_ids=()):
+        self.tenant_id = tenant_id
+        self.api_keys = tuple(api_keys)
+        self.agent_ids = tuple(agent_ids)
+        self.space = space
+        self.abi = json.loads(abi) if isinstance(abi, str) and abi else (abi or None)
+        self.contract_address = contract_address or None
+        self.infura_url = infura_url or None
+        self.wallet_address = wallet_address or None
+        # Same shape as web3_integration.user_inputs_cache
+        self.user_inputs = {
+            "space": self.space,
+            "abi": self.abi,
+            "contract_address": self.contract_address,
+            "infura_url": self.infura_url,
+            "wallet_address": self.wallet_address,
+        }
+        self._web3 = None
+        self._contract = None
+
+    @classmethod
+    def from_dict(cls, entry):
+        def as_tuple(value):
+            if not value:
+                return ()
+            return tuple(value) if isinstance(value, (list, tuple)) else (value,)
+
+        return cls(entry["id"], space=entry.get("space"), abi=entry.get("abi"),
+                   contract_address=entry.get("contract_address"), infura_url=entry.get("infura_url"),
+                   wallet_address=entry.get("wallet_address"),
+                   api_keys=as_tuple(entry.get("api_keys", entry.get("api_key"))),
+                   agent_ids=as_tuple(entry.get("agent_ids", entry.get("agent_id"))))
+
+    @property
+    def web3(self):
+        """
+        Web3 instance for this tenant's RPC URL (built on first use).
+        """
+        if self._web3 is None:
+            from src.web3_integration import get_web3
+
+            self._web3 = get_web3(self.infura_url)
+        return self._web3
+
+    @property
+    def contract(self):
+        """
+        Contract object for this tenant's governor (built on first use), or None without an ABI and address.
+        """
+        if self._contract is None and self.abi and self.contract_address:
+            from src.abi_registry import get_contract
+
+            self._contract = get_contract(self.web3, self.contract_address, self.abi)
+        return self._contract
+
+
+class TenantRegistry:
+    """
+    Tenants indexed by API key and by Theoriq agent id.
+    """
+
+    def __init__(self, tenants=()):
+        self.tenants = {}
+        self._by_api_key = {}
+        self._by_agent_id = {}
+        for tenant in tenants:
+            self.add(tenant)
+
+    def __len__(self):
+        return len(self.tenants)
+
+    def add(self, tenant):
+        if tenant.tenant_id in self.tenants:
+            raise ValueError(f"Duplicate tenant id: {tenant.tenant_id}")
+        self.tenants[tenant.tenant_id] = tenant
+        for api_key in tenant.api_keys:
+            if self._by_api_key.setdefault(api_key, tenant) is not tenant:
+                raise ValueError(f"API key of tenant {tenant.tenant_id} is already assigned to another tenant.")
+        for agent_id in tenant.agent_ids:
+            if self._by_agent_id.setdefault(agent_id.lower(), tenant) is not tenant:
+                raise ValueError(f"Agent id {agent_id} of tenant {tenant.tenant_id} is already assigned.")
+
+    def by_api_key(self, api_key):
+        return self._by_api_key.get(api_key) if api_key else None
+
+    def by_agent_id(self, agent_id):
+        return self._by_agent_id.get(agent_id.lower()) if agent_id else None
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Load tenants from a JSON, YAML or SQLite file.
+        """
+        return cls(Tenant.from_dict(entry) for entry in load_entries(path))
+
+
+def load_entries(path):
+    """
+    Read tenant entries (dicts) from a JSON or YAML file, or from the `tenants` table of a SQLite database.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".db", ".sqlite", ".sqlite3"):
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            connection.row_factory = sqlite3.Row
+            return [dict(row) for row in connection.execute("SELECT * FROM tenants")]
+        finally:
+            connection.close()
+
+    with open(path) as f:
+        if extension in (".yaml", ".yml"):
+            import yaml
+
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    entries = data.get("tenants", []) if isinstance(data, dict) else data
+    return list(entries or [])
+
+
+@lru_cache(maxsize=None)
+def get_registry():
+    """
+    Return the process-wide tenant registry (loaded once from TENANTS_FILE; empty if it is not set).
+    """
+    path = get_setting("TENANTS_FILE")
+    if not path:
+        return TenantRegistry()
+    registry = TenantRegistry.from_file(path)
+    logger.info("Loaded %s tenants from %s", len(registry), path)
+    return registry
+
+
+def theoriq_sender(context):
+    """
+    Return the address of the agent that sent a Theoriq request.
+
+    The SDK's ExecuteContext has no sender property; the sender is the `from_addr` fact of the request biscuit the SDK
+    has already verified.
+    """
+    return str(context._request_biscuit.request_facts.from_addr)
+
+
+def current_tenant():
+    """
+    Return the tenant of the current request, or None.
+    """
+    return _current_tenant.get()
+
+
+def is_interactive():
+    """
+    Whether the current code path may prompt on stdin (False while serving a request).
+    """
+    return _interactive.get()
+
+
+@contextmanager
+def use_tenant(tenant, interactive=False):
+    """
+    Run a block with `tenant` as the current tenant (None for the process-wide configuration).
+    """
+    tenant_token = _current_tenant.set(tenant)
+    interactive_token = _interactive.set(interactive)
+    try:
+        yield tenant
+    finally:
+        _interactive.reset(interactive_token)
+        _current_tenant.reset(tenant_token)
+
+
+def register_flask(app):
+    """
+    Resolve the tenant of each Flask request from the X-API-Key header and mark the request non-interactive.
+
+    Requests with an unknown API key get a 401 response. Requests without one use the process-wide configuration.
+    """
+    from flask import g, jsonify, request
+
+    @app.before_request
+    def _bind_tenant():
+        api_key = request.headers.get(API_KEY_HEADER)
+        tenant = get_registry().by_api_key(api_key)
+        g.tenant_tokens = (_current_tenant.set(tenant), _interactive.set(False))
+        if api_key and tenant is None:
+            logger.warning("Rejected request with an unknown API key for %s", request.path)
+            return jsonify({"error": "Unknown API key"}), 401
+
+    @app.teardown_request
+    def _unbind_tenant(error=None):
+        tokens = g.pop("tenant_tokens", None)
+        if tokens is not None:
+            _interactive.reset(tokens[1])
+            _current_tenant.reset(tokens[0])
+
+    return app
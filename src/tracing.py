@@ -0,0 +1,416 @@
+"""
+Lightweight request tracing for the fetch -> analyze -> vote pipeline.
+
+Spans are propagated through a context variable, so nested calls (route -> on_user_query -> fetch_active_proposals
+-> RPC call) form a tree without passing anything around. A trace is sampled once at its root span; unsampled
+traces cost one random number and a few attribute lookups per span. Finished traces are handed to a background
+thread that writes them with the configured exporter:
+
+- TRACE_EXPORTER: "json" (one JSON object per trace in TRACE_FILE), "otlp" (OTLP/JSON, POSTed to
+  TRACE_OTLP_ENDPOINT such as http://collector:4318/v1/traces, or appended to TRACE_FILE) or unset to disable.
+- TRACE_SAMPLE_RATE: Fraction of root spans to record (default 0.1).
+
+Convert exported traces to folded stacks for a flame graph (flamegraph.pl, speedscope) with:
+  python -m src.tracing collapse traces.jsonl --min-ms 1000 > slow_requests.folded
+"""
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+
+from config.settings import get_setting
+
+SERVICE_NAME = "dao-voting-agent"
+
+_current_span = ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    One timed operation in a trace.
+    """
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace, parent_id, name, attributes):
+        self.trace = trace
+        self.span_id = random.getrandbits(64) or 1
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def to_dict(self):
+        return {
+            "trace_id": f"{self.trace.trace_id:032x}",
+            "span_id": f"{self.span_id:016x}",
+            "parent_id": f"{self.parent_id:016x}" if self.parent_id else None,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": {key: _attribute_value(value) for key, value in self.attributes.items()},
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """
+    Stand-in for spans of unsampled traces; every operation is a no-op.
+    """
+    __slots__ = ()
+
+    def set_attribute(self, key, value):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _Trace:
+    __slots__ = ("trace_id", "spans", "lock")
+
+    def __init__(self):
+        self.trace_id = random.getrandbits(128)
+        self.spans = []
+        self.lock = threading.Lock()
+
+
+def _attribute_value(value):
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    text = str(value)
+    return text if len(text) <= 256 else f"{text[:256]}..."
+
+
+@lru_cache(maxsize=None)
+def _sample_rate():
+    if _exporter() is None:
+        return 0.0
+    return float(get_setting("TRACE_SAMPLE_RATE", 0.1))
+
+
+def start_span(name, **attributes):
+    """
+    Start a span as a child of the current span (or as a new, possibly unsampled, root).
+
+    Returns (span, token); pass both to `end_span`. Prefer the `span` context manager.
+    """
+    parent = _current_span.get()
+    if parent is NOOP_SPAN:
+        return NOOP_SPAN, None
+    if parent is None:
+        if random.random() >= _sample_rate():
+            return NOOP_SPAN, _current_span.set(NOOP_SPAN)
+        new_span = Span(_Trace(), None, name, attributes)
+    else:
+        new_span = Span(parent.trace, parent.span_id, name, attributes)
+    return new_span, _current_span.set(new_span)
+
+
+def end_span(current, token, error=None):
+    """
+    Finish a span started with `start_span`. Finishing a root span exports the whole trace.
+    """
+    if token is not None:
+        _current_span.reset(token)
+    if current is NOOP_SPAN:
+        return
+    current.end_ns = time.time_ns()
+    if error is not None:
+        current.error = f"{type(error).__name__}: {error}"
+    trace = current.trace
+    with trace.lock:
+        trace.spans.append(current)
+    if current.parent_id is None:
+        _export_async(trace)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Trace the enclosed block as a span named `name` with the given attributes.
+    """
+    current, token = start_span(name, **attributes)
+    try:
+        yield current
+    except BaseException as error:
+        end_span(current, token, error)
+        raise
+    else:
+        end_span(current, token)
+
+
+def traced(name=None):
+    """
+    Decorator that traces every call of the function as a span (named after the function by default).
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_trace_id():
+    """
+    Hex trace ID of the current sampled trace, or None.
+    """
+    current = _current_span.get()
+    if current is None or current is NOOP_SPAN:
+        return None
+    return f"{current.trace.trace_id:032x}"
+
+
+# Exporters
+
+class JsonFileExporter:
+    """
+    Appends one JSON object per trace ({"trace_id": ..., "spans": [...]}) to a file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, traces):
+        with open(self.path, "a") as f:
+            for trace in traces:
+                spans = [s.to_dict() for s in trace.spans]
+                f.write(json.dumps({"trace_id": f"{trace.trace_id:032x}", "spans": spans}) + "\n")
+
+
+class OtlpJsonExporter:
+    """
+    Exports traces in the OTLP/JSON format, either POSTed to an OTLP/HTTP collector or appended to a file.
+    """
+
+    def __init__(self, endpoint=None, path=None):
+        self.endpoint = endpoint
+        self.path = path
+
+    @staticmethod
+    def _otlp_span(current):
+        otlp = {
+            "traceId": f"{current.trace.trace_id:032x}",
+            "spanId": f"{current.span_id:016x}",
+            "name": current.name,
+            "kind": 1,
+            "startTimeUnixNano": str(current.start_ns),
+            "endTimeUnixNano": str(current.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in current.attributes.items()],
+            "status": {"code": 2, "message": current.error} if current.error else {"code": 1},
+        }
+        if current.parent_id:
+            otlp["parentSpanId"] = f"{current.parent_id:016x}"
+        return otlp
+
+    def payload(self, traces):
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{
+                "scope": {"name": "src.tracing"},
+                "spans": [self._otlp_span(s) for trace in traces for s in trace.spans],
+            }],
+        }]}
+
+    def export(self, traces):
+        payload = self.payload(traces)
+        if self.endpoint:
+            import requests
+
+            requests.post(self.endpoint, json=payload, timeout=10)
+        else:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(payload) + "\n")
+
+
+def _otlp_attribute(key, value):
+    value = _attribute_value(value)
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": "" if value is None else value}
+    return {"key": key, "value": typed}
+
+
+@lru_cache(maxsize=None)
+def _exporter():
+    kind = (get_setting("TRACE_EXPORTER") or "").lower()
+    path = get_setting("TRACE_FILE", "traces.jsonl")
+    if kind == "json":
+        return JsonFileExporter(path)
+    if kind == "otlp":
+        return OtlpJsonExporter(endpoint=get_setting("TRACE_OTLP_ENDPOINT"), path=path)
+    return None
+
+
+# Background export, so writing traces never happens on the request path
+
+_export_queue = queue.Queue(maxsize=1000)
+_export_thread = None
+_export_lock = threading.Lock()
+
+
+def _export_async(trace):
+    global _export_thread
+    if _export_thread is None or not _export_thread.is_alive():
+        with _export_lock:
+            if _export_thread is None or not _export_thread.is_alive():
+                _export_thread = threading.Thread(target=_export_loop, name="trace-exporter", daemon=True)
+                _export_thread.start()
+                atexit.register(flush)
+    try:
+        _export_queue.put_nowait(trace)
+    except queue.Full:
+        pass
+
+
+def _reset_after_fork():
+    # The exporter thread does not survive fork, and the queue's locks may have been copied mid-use
+    global _export_queue, _export_thread
+    _export_queue = queue.Queue(maxsize=1000)
+    _export_thread = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _drain(block):
+    traces = []
+    try:
+        traces.append(_export_queue.get(block=block, timeout=1.0 if block else None))
+        while len(traces) < 100:
+            traces.append(_export_queue.get_nowait())
+    except queue.Empty:
+        pass
+    return traces
+
+
+def _export_loop():
+    from src.logging_config import setup_logger
+
+    logger = setup_logger()
+    while True:
+        traces = _drain(block=True)
+        if traces:
+            try:
+                _exporter().export(traces)
+            except Exception as e:
+                logger.error("Error exporting %s traces: %s", len(traces), e)
+
+
+def flush():
+    """
+    Export any traces still waiting in the queue (called at exit).
+    """
+    traces = _drain(block=False)
+    if traces and _exporter() is not None:
+        _exporter().export(traces)
+
+
+# Flask integration
+
+def instrument_flask(app):
+    """
+    Open a root span for every Flask request, named after the matched route.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_span():
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        g.trace_span = start_span(f"{request.method} {route}", route=route, method=request.method)
+
+    @app.teardown_request
+    def _end_request_span(error=None):
+        current = g.pop("trace_span", None)
+        if current is not None:
+            end_span(*current, error=error)
+
+    return app
+
+
+# Flame graph support
+
+def _load_spans(path):
+    """
+    Read spans from a JSON or OTLP/JSON export file, grouped by trace ID.
+    """
+    traces = {}
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if "resourceSpans" in record:
+                for resource in record["resourceSpans"]:
+                    for scope in resource["scopeSpans"]:
+                        for otlp in scope["spans"]:
+                            traces.setdefault(otlp["traceId"], []).append({
+                                "span_id": otlp["spanId"], "parent_id": otlp.get("parentSpanId"),
+                                "name": otlp["name"],
+                                "duration_ms": (int(otlp["endTimeUnixNano"]) - int(otlp["startTimeUnixNano"])) / 1e6,
+                            })
+            else:
+                traces.setdefault(record["trace_id"], []).extend(record["spans"])
+    return traces
+
+
+def collapse(traces, min_ms=0.0):
+    """
+    Fold spans into "root;child;grandchild self_time_us" lines, keeping only traces slower than `min_ms`.
+    """
+    folded = {}
+    for spans in traces.values():
+        by_id = {s["span_id"]: s for s in spans}
+        roots = [s for s in spans if not s["parent_id"] or s["parent_id"] not in by_id]
+        if not roots or max(root["duration_ms"] for root in roots) < min_ms:
+            continue
+        child_time = {}
+        for s in spans:
+            if s["parent_id"] in by_id:
+                child_time[s["parent_id"]] = child_time.get(s["parent_id"], 0.0) + s["duration_ms"]
+        for s in spans:
+            path = [s["name"]]
+            parent = by_id.get(s["parent_id"])
+            while parent is not None:
+                path.append(parent["name"])
+                parent = by_id.get(parent["parent_id"])
+            stack = ";".join(reversed(path))
+            self_us = max(0.0, s["duration_ms"] - child_time.get(s["span_id"], 0.0)) * 1000
+            folded[stack] = folded.get(stack, 0) + int(self_us)
+    return folded
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Trace export tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    collapse_parser = subparsers.add_parser("collapse", help="Convert exported traces to folded stacks.")
+    collapse_parser.add_argument("path", help="JSON or OTLP/JSON trace file")
+    collapse_parser.add_argument("--min-ms", type=float, default=0.0, help="Only include traces at least this slow")
+    args = parser.parse_args()
+
+    for stack, value in sorted(collapse(_load_spans(args.path), args.min_ms).items()):
+        print(f"{stack} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+"""
+Long-running proposal watcher.
+
+Instead of re-fetching every proposal whenever a user hits /user_query or the Theoriq endpoint, the watcher follows
+the chain and Snapshot in the background and calls handle_new_proposal only for proposals that are new or whose
+content changed since they were last handled:
+
+- Chain: a block filter (or, when the ABI declares events, a log filter on the governor address) is polled every
+  WATCHER_BLOCK_INTERVAL seconds, so an idle chain costs one eth_getFilterChanges call per poll. If WATCHER_WS_URL is
+  set, new heads (or governor logs) arrive over a websocket subscription instead. Governor logs trigger a re-read of
+  the proposals; a new block only triggers a proposalCount read, and the proposals added since the last one.
+- Snapshot: the space is polled with an adaptive interval that drops to WATCHER_SNAPSHOT_MIN_INTERVAL after a change
+  and grows by WATCHER_SNAPSHOT_BACKOFF up to WATCHER_SNAPSHOT_MAX_INTERVAL while nothing changes.
+
+Proposal fingerprints are kept in WATCHER_STATE_FILE, so a restarted watcher does not handle (and vote on) the same
+proposals again.
+
+Usage:
+  python -m src.watcher                    # the configuration entered on the command line
+  python -m src.watcher --tenant uniswap   # a tenant from TENANTS_FILE (see src/tenants.py)
+"""
+import argparse
+import hashlib
+import json
+import os
+import signal
+import threading
+import time
+
+from config.settings import get_setting
+from src.logging_config import setup_logger
+from src.proposal_model import Proposal
+from src.tenants import get_registry, use_tenant
+from src.tracing import span
+
+# Set up logging
+logger = setup_logger()
+
+# Proposal fields that identify its content; tallies and state change on every vote and are left out
+FINGERPRINT_FIELDS = ("title", "body", "choices", "start", "end")
+
+
+def proposal_key(proposal, index=None):
+    """
+    Stable identifier of a proposal (its id, or its index for proposals without one).
+    """
+    if isinstance(proposal, (dict, Proposal)):
+        return str(proposal.get('id', index))
+    if isinstance(proposal, (list, tuple)) and proposal:
+        return str(proposal[0])
+    return str(index)
+
+
+def proposal_fingerprint(proposal):
+    """
+    Hash of the proposal's content fields (Proposal and dict proposals) or of the proposal's key.
+    """
+    if isinstance(proposal, Proposal):
+        return proposal.fingerprint()
+    if isinstance(proposal, dict):
+        content = {field: proposal.get(field) for field in FINGERPRINT_FIELDS}
+    else:
+        content = proposal_key(proposal)
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ProposalState:
+    """
+    Fingerprints of the proposals that were already handled, optionally persisted to a JSON file.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.fingerprints = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.fingerprints = json.load(f)
+
+    def diff(self, source, proposals):
+        """
+        Return (key, fingerprint, proposal) for each proposal that is new or changed.
+        """
+        changed = []
+        for index, proposal in enumerate(proposals):
+            key = f"{source}:{proposal_key(proposal, index)}"
+            fingerprint = proposal_fingerprint(proposal)
+            if self.fingerprints.get(key) != fingerprint:
+                changed.append((key, fingerprint, proposal))
+        return changed
+
+    def mark(self, key, fingerprint):
+        self.fingerprints[key] = fingerprint
+        if self.path:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.fingerprints, f)
+            os.replace(tmp_path, self.path)
+
+
+class AdaptiveInterval:
+    """
+    Polling interval that resets to `minimum` after a change and backs off towards `maximum` otherwise.
+    """
+
+    def __init__(self, minimum, maximum, backoff=1.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.current = minimum
+
+    def update(self, changed):
+        self.current = self.minimum if changed else min(self.maximum, self.current * self.backoff)
+        return self.current
+
+
+class ProposalWatcher:
+    """
+    Watches the configured governor contract and Snapshot space and handles new or changed proposals.
+
+    `handler(proposal, web3, wallet_address, contract_address, abi)` defaults to main.handle_new_proposal. Handlers
+    run non-interactively, with `tenant` (if given) as the current tenant.
+    """
+
+    def __init__(self, user_inputs, handler=None, state=None, tenant=None):
+        self.user_inputs = user_inputs
+        self.handler = handler
+        self.tenant = tenant
+        self.state = state if state is not None else ProposalState(get_setting("WATCHER_STATE_FILE",
+                                                                               "watcher_state.json"))
+        self.block_interval = float(get_setting("WATCHER_BLOCK_INTERVAL", 12))
+        self.snapshot_interval = AdaptiveInterval(float(get_setting("WATCHER_SNAPSHOT_MIN_INTERVAL", 15)),
+                                                  float(get_setting("WATCHER_SNAPSHOT_MAX_INTERVAL", 300)),
+                                                  float(get_setting("WATCHER_SNAPSHOT_BACKOFF", 1.5)))
+        self.ws_url = get_setting("WATCHER_WS_URL")
+        self.max_attempts = int(get_setting("WATCHER_MAX_ATTEMPTS", 3))
+
+        self.onchain = bool(user_inputs.get('abi') and user_inputs.get('contract_address')
+                            and user_inputs.get('infura_url'))
+        self.web3 = None
+        self.contract = None
+        self._filter = None
+        self._use_filters = True
+        self._last_block = None
+        # In block mode, the id of the first proposal not handled yet (None until the first full read)
+        self._next_proposal = None
+        self._chain_changed = threading.Event()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._attempts = {}
+        self.handled = 0
+
+    # Chain
+
+    def _connect(self):
+        from src.abi_registry import get_contract
+        from src.web3_integration import get_web3
+
+        if self.tenant is not None:
+            # Reuse the tenant's pre-built Web3 instance and contract object
+            self.web3, self.contract = self.tenant.web3, self.tenant.contract
+            return
+        if self.user_inputs.get('infura_url'):
+            self.web3 = get_web3(self.user_inputs['infura_url'])
+        if self.onchain:
+            self.contract = get_contract(self.web3, self.user_inputs['contract_address'], self.user_inputs['abi'])
+
+    def _has_events(self):
+        from src.abi_registry import get_abi
+
+        return bool(self.user_inputs.get('abi')) and get_abi(self.user_inputs['abi']).has_events
+
+    def _new_filter(self):
+        if self._has_events():
+            return self.web3.eth.filter({'address': self.contract.address, 'fromBlock': 'latest'})
+        return self.web3.eth.filter('latest')
+
+    def poll_chain(self):
+        """
+        Return True if the chain reported a change since the last poll.
+
+        Uses filter polling, and falls back to comparing block numbers if the provider does not support filters.
+        """
+        changed = self._chain_changed.is_set()
+        self._chain_changed.clear()
+        if self.ws_url:
+            return changed
+        if self._use_filters:
+            try:
+                if self._filter is None:
+                    self._filter = self._new_filter()
+                    # Anything before the filter was installed was not observed
+                    return True
+                return bool(self._filter.get_new_entries()) or changed
+            except Exception as e:
+                if self._filter is None:
+                    logger.warning("Provider does not support filters, polling block numbers instead: %s", e)
+                    self._use_filters = False
+                else:
+                    # Filters expire (or get lost behind load balancers); re-install it and re-read to be safe
+                    logger.warning("Block filter was lost, re-creating it: %s", e)
+                    self._filter = None
+                    return True
+        block = self.web3.eth.block_number
+        changed = changed or (self._last_block is not None and block != self._last_block)
+        self._last_block = block
+        return changed
+
+    def scan_onchain(self):
+        """
+        Handle new or changed on-chain proposals; return True if there were any.
+
+        Governor logs trigger a full re-read. When the watcher follows blocks instead, most blocks do not touch the
+        governor: only proposalCount is read, and only the proposals added since the last scan (from the first one
+        that was not handled yet) are fetched.
+        """
+        from src.proposals import fetch_proposal_range, fetch_proposals_dynamically, indexed_getter
+
+        abi = self.user_inputs['abi']
+        getter = None if self._has_events() else indexed_getter(abi)
+        with span("watcher scan", source="onchain"):
+            if getter is not None and self._next_proposal is not None:
+                count = self.contract.functions.proposalCount().call()
+                if count == self._next_proposal:
+                    return False
+                if count > self._next_proposal:
+                    start = self._next_proposal
+                    proposals = fetch_proposal_range(self.contract, abi, start, count, getter)
+                    changed = self._handle_changes("onchain", proposals)
+                    self._next_proposal = self._first_unhandled("onchain", proposals, start, count)
+                    return changed
+                logger.warning("proposalCount went down from %s to %s; re-reading every proposal.",
+                               self._next_proposal, count)
+            proposals = fetch_proposals_dynamically(self.contract, abi)
+        if not isinstance(proposals, (list, tuple)):
+            logger.info("Governor returned no proposal list (%s); nothing to diff.", proposals)
+            return False
+        changed = self._handle_changes("onchain", proposals)
+        if getter is not None:
+            self._next_proposal = self._first_unhandled("onchain", proposals, 0, len(proposals))
+        return changed
+
+    def _first_unhandled(self, source, proposals, start, stop):
+        """
+        Id of the first proposal in `proposals` (ids `start` to `stop - 1`) whose handler failed and will be retried,
+        or `stop` if every one was handled.
+        """
+        for offset, proposal in enumerate(proposals):
+            if f"{self._source(source)}:{proposal_key(proposal, start + offset)}" in self._attempts:
+                return start + offset
+        return stop
+
+    def _subscribe(self):
+        """
+        Follow new heads (or governor logs) over a websocket and flag the main loop on every notification.
+        """
+        import asyncio
+
+        from web3 import AsyncWeb3, WebSocketProvider
+
+        async def follow():
+            async with AsyncWeb3(WebSocketProvider(self.ws_url)) as w3:
+                if self._has_events():
+                    await w3.eth.subscribe("logs", {"address": self.contract.address})
+                else:
+                    await w3.eth.subscribe("newHeads")
+                logger.info("Subscribed to chain updates at %s", self.ws_url)
+                async for _ in w3.socket.process_subscriptions():
+                    self._chain_changed.set()
+                    self._wake.set()
+                    if self._stopping.is_set():
+                        return
+
+        delay = 1.0
+        while not self._stopping.is_set():
+            try:
+                asyncio.run(follow())
+            except Exception as e:
+                logger.warning("Websocket subscription failed, reconnecting in %ss: %s", delay, e)
+                self._stopping.wait(delay)
+                delay = min(delay * 2, 60.0)
+                # Re-read proposals after reconnecting in case a notification was missed
+                self._chain_changed.set()
+
+    # Snapshot
+
+    def scan_snapshot(self):
+        from src.proposals import fetch_snapshot_proposals
+
+        with span("watcher scan", source="snapshot"):
+            # Polls can be more frequent than SNAPSHOT_CACHE_TTL, so they always ask Snapshot
+            proposals = fetch_snapshot_proposals(self.user_inputs['space'], use_cache=False)
+        if proposals is None:
+            return False
+        return self._handle_changes("snapshot", proposals)
+
+    # Diff and dispatch
+
+    def _source(self, source):
+        return f"{self.tenant.tenant_id}:{source}" if self.tenant is not None else source
+
+    def _handle_changes(self, source, proposals):
+        changed = self.state.diff(self._source(source), proposals)
+        for key, fingerprint, proposal in changed:
+            logger.info("Watcher found new or changed proposal %s", key)
+            try:
+                self.handler(proposal, self.web3, self.user_inputs['wallet_address'],
+                             self.user_inputs.get('contract_address'), self.user_inputs.get('abi'))
+            except Exception as e:
+                attempts = self._attempts.get(key, 0) + 1
+                self._attempts[key] = attempts
+                logger.error("Handling proposal %s failed (attempt %s of %s): %s", key, attempts,
+                             self.max_attempts, e)
+                if attempts < self.max_attempts:
+                    continue
+            self._attempts.pop(key, None)
+            self.state.mark(key, fingerprint)
+            self.handled += 1
+        return bool(changed)
+
+    # Main loop
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def run(self):
+        """
+        Poll until stop() is called (or the process receives SIGINT/SIGTERM).
+        """
+        with use_tenant(self.tenant):
+            self._run()
+
+    def _run(self):
+        if self.handler is None:
+            from src.main import handle_new_proposal
+
+            self.handler = handle_new_proposal
+        self._connect()
+        # Read the current proposals once at startup; afterwards only when the chain reports a change
+        self._chain_changed.set()
+        if self.ws_url and self.onchain:
+            threading.Thread(target=self._subscribe, name="watcher-ws", daemon=True).start()
+
+        logger.info("Proposal watcher started (on-chain: %s, Snapshot space: %s)", self.onchain,
+                    self.user_inputs.get('space'))
+        next_block = next_snapshot = time.monotonic()
+        while not self._stopping.is_set():
+            now = time.monotonic()
+            if self.onchain and now >= next_block:
+                next_block = now + self.block_interval
+                try:
+                    if self.poll_chain():
+                        self.scan_onchain()
+                except Exception as e:
+                    logger.error("Proposal watcher chain poll failed: %s", e)
+                    # Re-read on the next poll so the change is not lost
+                    self._chain_changed.set()
+            if self.user_inputs.get('space') and now >= next_snapshot:
+                try:
+                    changed = self.scan_snapshot()
+                except Exception as e:
+                    logger.error("Proposal watcher Snapshot poll failed: %s", e)
+                    changed = False
+                next_snapshot = now + self.snapshot_interval.update(changed)
+
+            deadlines = []
+            if self.onchain:
+                deadlines.append(next_block)
+            if self.user_inputs.get('space'):
+                deadlines.append(next_snapshot)
+            if not deadlines:
+                logger.error("Nothing to watch: configure a Snapshot space or a contract address, ABI and URL.")
+                return
+            self._wake.wait(max(0.0, min(deadlines) - time.monotonic()))
+            self._wake.clear()
+            if self.ws_url and self._chain_changed.is_set():
+                next_block = time.monotonic()
+        logger.info("Proposal watcher stopped after handling %s proposals", self.handled)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch for new or changed DAO proposals.")
+    parser.add_argument("--tenant", help="Tenant id from TENANTS_FILE (default: prompt for the inputs)")
+    args = parser.parse_args()
+
+    if args.tenant:
+        tenant = get_registry().tenants.get(args.tenant)
+        if tenant is None:
+            raise SystemExit(f"Unknown tenant: {args.tenant}")
+        user_inputs = tenant.user_inputs
+    else:
+        from src.web3_integration import get_user_inputs
+
+        tenant = None
+        user_inputs = get_user_inputs()
+        if user_inputs is None:
+            return
+    watcher = ProposalWatcher(user_inputs, tenant=tenant)
+    signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+
+
+if __name__ == "__main__":
+    main()
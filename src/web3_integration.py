@@ -1,21 +1,83 @@
-from web3 import Web3
-from dotenv import load_dotenv
 import json
+from functools import lru_cache, partial
+from config.settings import get_setting
+from src.abi_registry import get_contract
+from src.archive import record_vote
+from src.deadline import upstream_timeout
 from src.logging_config import setup_logger  # Import the centralized logger setup
+from src.metrics import UPSTREAM_ERRORS, record_cache, track_upstream
+from src.resilience import call
+from src.shared_cache import get_cache
+from src.snapshot_voting import cast_snapshot_vote, is_snapshot_proposal_id
+from src.tenants import current_tenant, is_interactive
+from src.tracing import traced
 
 # Set up logging
 logger = setup_logger()
 
-load_dotenv()
 user_inputs_cache = None
 
 
+@lru_cache(maxsize=None)
+def _instrumented_provider_class():
+    """
+    Build (once) an HTTPProvider subclass that records latency and errors for every JSON-RPC call, bounds each call
+    by the request deadline (see src/deadline.py) and sends it through the RPC circuit breaker (see
+    src/resilience.py).
+    """
+    from web3 import HTTPProvider
+
+    class InstrumentedHTTPProvider(HTTPProvider):
+        def get_request_kwargs(self):
+            kwargs = dict(super().get_request_kwargs())
+            kwargs['timeout'] = upstream_timeout(kwargs.get('timeout'))
+            return kwargs
+
+        def make_request(self, method, params):
+            # Re-sending a transaction is not safe to do blindly, so broadcasts are never retried
+            response = call("rpc", method, partial(super().make_request, method, params),
+                            idempotent=method not in ("eth_sendTransaction", "eth_sendRawTransaction"))
+            if isinstance(response, dict) and "error" in response:
+                UPSTREAM_ERRORS.labels("rpc", method).inc()
+            return response
+
+    return InstrumentedHTTPProvider
+
+
+def new_web3(infura_url):
+    """
+    Create a Web3 instance for the given provider URL with instrumented JSON-RPC calls.
+    """
+    from web3 import Web3
+
+    # Retries are left to src/resilience.py (jittered and budgeted) instead of web3's five retries per call
+    return Web3(_instrumented_provider_class()(infura_url, exception_retry_configuration=None))
+
+
+@lru_cache(maxsize=256)
+def get_web3(infura_url):
+    """
+    Return the shared Web3 instance for a provider URL (created on first use; HTTP sessions are kept per thread).
+    """
+    return new_web3(infura_url)
+
+
 def get_user_inputs():
     """
     Collect all the necessary user inputs at once and return as a dictionary.
+
+    While a tenant is active (see src/tenants.py), its configuration is returned instead.
     """
+    tenant = current_tenant()
+    if tenant is not None:
+        return tenant.user_inputs
+
     global user_inputs_cache
     if user_inputs_cache is None:
+        if not is_interactive():
+            # Never block a server request on stdin
+            logger.error("No DAO configuration available for a non-interactive request.")
+            raise ValueError("No DAO configuration available: send a registered X-API-Key or configure the inputs.")
         try:
             # Welcome message and explanation
             print("Welcome to the DAO Voting Agent!")
@@ -40,7 +102,7 @@ def get_user_inputs():
             contract_address = input("Enter the contract address: ")
             infura_url = input("Enter your Ethereum network provider URL (e.g. Infura URL): ")
             # Initialize Web3 provider
-            web3 = Web3(Web3.HTTPProvider(infura_url))
+            web3 = get_web3(infura_url)
             wallet_address = web3.to_checksum_address(input("Enter your wallet address: "))
 
             # Store the inputs in the cache
@@ -52,80 +114,120 @@ def get_user_inputs():
                 "wallet_address": wallet_address
             }
 
-            logger.info(f"User inputs collected successfully: {user_inputs_cache}")
+            logger.info("User inputs collected successfully for space: %s, contract: %s", space, contract_address)
         except Exception as e:
-            logger.error(f"Error while collecting user inputs: {e}")
+            logger.error("Error while collecting user inputs: %s", e)
             raise e
     return user_inputs_cache
 
 
+@traced()
 def connect_to_web3(infura_url):
     """
     Connect to the Ethereum network using Web3 and Infura URL.
     """
     try:
-        web3 = Web3(Web3.HTTPProvider(infura_url))
+        web3 = get_web3(infura_url)
         if not web3.is_connected():
             logger.error("Failed to connect to Ethereum network.")
             raise Exception("Failed to connect to Ethereum network")
-        logger.info(f"Connected to Ethereum network using the provided URL: {infura_url}")
+        logger.info("Connected to Ethereum network using the provided URL: %s", infura_url)
         print("Connection successful!")
         return web3
     except Exception as e:
-        logger.error(f"Error while connecting to Ethereum network: {e}")
+        logger.error("Error while connecting to Ethereum network: %s", e)
         raise e
 
 
+def _balance_cache_key(web3, wallet_address):
+    endpoint = getattr(web3.provider, 'endpoint_uri', None)
+    return f"balance:{endpoint}:{wallet_address}" if endpoint else None
+
+
+@traced()
 def get_wallet_balance(web3, wallet_address):
     """
     Fetch the wallet balance using the provided wallet address.
+
+    Balances are kept in the shared cache (see src/shared_cache.py) for BALANCE_CACHE_TTL seconds.
     """
     try:
         wallet_address = web3.to_checksum_address(wallet_address)
-        balance_wei = web3.eth.get_balance(wallet_address)
-        balance_ether = web3.from_wei(balance_wei, 'ether')
-        logger.info(f"Fetched wallet balance: {balance_ether} ETH for address {wallet_address}")
+        cache_key = _balance_cache_key(web3, wallet_address)
+        balance_ether = get_cache().get(cache_key) if cache_key else None
+        record_cache("balance", balance_ether is not None)
+        if balance_ether is None:
+            balance_wei = web3.eth.get_balance(wallet_address)
+            balance_ether = web3.from_wei(balance_wei, 'ether')
+            if cache_key:
+                get_cache().set(cache_key, balance_ether, float(get_setting("BALANCE_CACHE_TTL", 10)))
+        logger.info("Fetched wallet balance: %s ETH for address %s", balance_ether, wallet_address)
         return balance_ether
     except Exception as e:
-        logger.error(f"Error while fetching wallet balance: {e}")
+        logger.error("Error while fetching wallet balance: %s", e)
         raise e
 
 
-def cast_vote(web3, account, contract_address, abi, proposal_id, vote_choice):
+@traced()
+def cast_vote(web3, account, contract_address, abi, proposal_id, vote_choice, space=None, choices=()):
     """
     Cast a vote on a DAO proposal by interacting with the smart contract.
+
+    Snapshot proposals are voted on with a signed message instead (see src/snapshot_voting.py), in the given space
+    (default: the configured one); `choices` are the proposal's options, used to map yes/no to a choice number.
+    Returns the transaction hash, or the Snapshot receipt id.
     """
     try:
-        logger.info(f"Attempting to cast vote for proposal ID: {proposal_id} with choice: {vote_choice}")
-        contract = web3.eth.Contract(address=contract_address, abi=abi)
-        transaction = contract.functions.vote(proposal_id, vote_choice).buildTransaction({
-            'from': account.address,
-            'nonce': web3.eth.get_transaction_count(account.address),
+        logger.info("Attempting to cast vote for proposal ID: %s with choice: %s", proposal_id, vote_choice)
+        if is_snapshot_proposal_id(proposal_id):
+            space = space or (get_user_inputs() or {}).get('space')
+            receipt = cast_snapshot_vote(account, space, proposal_id, vote_choice, choices)
+            logger.info("Snapshot vote cast successfully! Receipt: %s", receipt)
+            print(f"Snapshot vote cast successfully! Receipt: {receipt}")
+            return receipt
+        contract = get_contract(web3, contract_address, abi)
+
+        # The account is either a local account (with a private key) or the address of an account managed by the node
+        sender = getattr(account, 'address', None) or web3.to_checksum_address(account)
+        transaction = contract.functions.vote(proposal_id, vote_choice).build_transaction({
+            'from': sender,
+            'nonce': web3.eth.get_transaction_count(sender),
             'gas': 2000000,
-            'gasPrice': web3.toWei('50', 'gwei'),
+            'gasPrice': web3.to_wei('50', 'gwei'),
         })
 
-        signed_txn = web3.eth.account.sign_transaction(transaction, account.key)
-        tx_hash = web3.eth.send_raw_transaction(signed_txn.rawTransaction)
-        logger.info(f"Vote cast successfully! Transaction hash: {tx_hash.hex()}")
+        if hasattr(account, 'key'):
+            signed_txn = web3.eth.account.sign_transaction(transaction, account.key)
+            with track_upstream("vote_broadcast", "send_raw_transaction"):
+                tx_hash = web3.eth.send_raw_transaction(signed_txn.raw_transaction)
+        else:
+            with track_upstream("vote_broadcast", "send_transaction"):
+                tx_hash = web3.eth.send_transaction(transaction)
+        logger.info("Vote cast successfully! Transaction hash: %s", tx_hash.hex())
+        # The vote paid gas, so the cached balance is out of date
+        cache_key = _balance_cache_key(web3, sender)
+        if cache_key:
+            get_cache().delete(cache_key)
+        record_vote(proposal_id, sender, vote_choice, tx_hash.hex())
         print(f"Vote cast successfully! Transaction hash: {tx_hash.hex()}")
         return tx_hash.hex()
     except Exception as e:
-        logger.error(f"Error while casting vote: {e}")
+        logger.error("Error while casting vote: %s", e)
         raise e
 
 
+@traced()
 def get_active_onchain_proposals(web3, contract_address, abi):
     """
     Fetch active proposals from the on-chain smart contract for a given DAO space.
     """
     try:
         # web3 = Web3(Web3.HTTPProvider())
-        contract = web3.eth.contract(address=contract_address, abi=abi)
+        contract = get_contract(web3, contract_address, abi)
         proposals = contract.functions.getActiveProposals().call()
-        logger.info(f"Active proposals fetched successfully: {proposals}")
+        logger.info("Active proposals fetched successfully: %s", proposals)
         print(f"Active proposals fetched: {proposals}")
         return proposals
     except Exception as e:
-        logger.error(f"Error while fetching active proposals: {e}")
+        logger.error("Error while fetching active proposals: %s", e)
         raise Exception(f"Error fetching active proposals: {e}")
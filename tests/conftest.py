@@ -0,0 +1,40 @@
+"""
+Keep the tests hermetic: logs go to a temporary file, and the archive and the shared cache file are disabled unless a
+test sets them up itself.
+"""
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.mkdtemp(prefix="dao-agent-tests-"), "dao_voting_agent.log"))
+os.environ.setdefault("ARCHIVE_DB", "")
+os.environ.setdefault("SHARED_CACHE_PATH", "")
+
+
+@pytest.fixture
+def fresh_state():
+    """
+    Forget the process-wide state that tests change through settings: the OpenAI client configuration, the Snapshot
+    signer keys, the tenant registry, the archive, the shared cache, the circuit breakers and the trace exporter.
+    """
+    from config.settings import get_openai
+    from src import resilience, tracing
+    from src.archive import get_archive
+    from src.shared_cache import get_cache
+    from src.snapshot_voting import _configured_keys
+    from src.tenants import get_registry
+
+    def reset():
+        get_openai.cache_clear()
+        _configured_keys.cache_clear()
+        get_registry.cache_clear()
+        get_archive.cache_clear()
+        get_cache().clear()
+        resilience.reset()
+        tracing._exporter.cache_clear()
+        tracing._sample_rate.cache_clear()
+
+    reset()
+    yield
+    reset()
@@ -0,0 +1,116 @@
+import copy
+import json
+
+import pytest
+from web3 import HTTPProvider, Web3
+
+from src import abi_registry
+from src.abi_registry import LruCache, abi_hash, get_abi, get_contract
+
+ADDRESS = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+
+
+def governor_abi(name="proposals"):
+    """
+    A governor ABI with a proposal getter called `name`, so each test can use an ABI no other test indexed.
+    """
+    return [
+        {"type": "function", "name": name, "stateMutability": "view",
+         "inputs": [{"name": "proposalId", "type": "uint256"}],
+         "outputs": [{"name": "id", "type": "uint256"}, {"name": "votes", "type": "uint256"}]},
+        {"type": "function", "name": "proposalCount", "stateMutability": "view", "inputs": [],
+         "outputs": [{"name": "", "type": "uint256"}]},
+        {"type": "function", "name": "castVote", "stateMutability": "nonpayable",
+         "inputs": [{"name": "proposalId", "type": "uint256"}, {"name": "support", "type": "uint8"}], "outputs": []},
+        {"type": "event", "name": "ProposalCreated", "anonymous": False,
+         "inputs": [{"name": "proposalId", "type": "uint256", "indexed": False}]},
+        {"type": "function", "name": "owner", "stateMutability": "view", "inputs": [],
+         "outputs": [{"name": "", "type": "address"}]},
+    ]
+
+
+@pytest.fixture
+def indexed(monkeypatch):
+    """
+    Count how often an ABI is hashed and looked up in the registry (the slow path).
+    """
+    calls = []
+    index_for = abi_registry._index_for
+
+    def counting(abi):
+        calls.append(abi)
+        return index_for(abi)
+
+    monkeypatch.setattr(abi_registry, "_index_for", counting)
+    return calls
+
+
+def test_abi_is_indexed_once():
+    index = get_abi(governor_abi("indexedProposals"))
+    assert index.proposal_functions == ["indexedProposals", "proposalCount", "castVote"]
+    assert index.getter_outputs == {"indexedProposals": ("id", "votes"), "proposalCount": ("",)}
+    assert index.vote_functions == {"castVote": "castVote(uint256,uint8)"}
+    assert index.proposal_events == {"ProposalCreated": Web3.keccak(text="ProposalCreated(uint256)").to_0x_hex()}
+    assert index.has_events
+    assert "owner" in index.function_names
+    assert get_abi(index) is index
+
+
+def test_equal_abis_share_one_index(indexed):
+    abi = governor_abi("sharedProposals")
+    index = get_abi(abi)
+    # The same list again is matched by identity, without hashing
+    assert get_abi(abi) is index
+    assert len(indexed) == 1
+    # An equal copy, or the ABI as a JSON string with other key order and spacing, is matched by its hash
+    assert get_abi(copy.deepcopy(abi)) is index
+    text = json.dumps([dict(reversed(list(item.items()))) for item in abi], indent=2)
+    assert abi_hash(json.loads(text)) == index.abi_hash
+    assert get_abi(text) is index
+    assert len(indexed) == 3
+    # The same string again is matched by its text, without parsing or hashing
+    assert get_abi(text) is index
+    assert len(indexed) == 3
+
+
+def test_changed_abis_get_their_own_index():
+    abi = governor_abi("changedProposals")
+    changed = copy.deepcopy(abi)
+    changed[2]["inputs"][1]["type"] = "bool"
+    assert get_abi(changed) is not get_abi(abi)
+    assert get_abi(changed).vote_functions == {"castVote": "castVote(uint256,bool)"}
+
+
+def test_contracts_are_cached_per_endpoint_address_and_abi(monkeypatch):
+    web3 = Web3(HTTPProvider("http://127.0.0.1:8545"))
+    abi = governor_abi("contractProposals")
+    built = []
+    contract = web3.eth.contract
+
+    def counting(**kwargs):
+        built.append(kwargs["address"])
+        return contract(**kwargs)
+
+    monkeypatch.setattr(web3.eth, "contract", counting)
+    first = get_contract(web3, ADDRESS, abi)
+    assert first.address == ADDRESS
+    assert get_contract(web3, ADDRESS, json.dumps(abi)) is first
+    assert get_contract(Web3(HTTPProvider("http://127.0.0.1:8545")), ADDRESS, abi) is first
+    assert len(built) == 1
+
+    other_endpoint = Web3(HTTPProvider("http://127.0.0.1:8546"))
+    assert get_contract(other_endpoint, ADDRESS, abi) is not first
+    assert get_contract(web3, ADDRESS, governor_abi("otherProposals")) is not first
+    assert len(built) == 2
+
+
+def test_lru_cache():
+    cache = LruCache(maxsize=2)
+    assert cache.put("a", 1) == 1
+    # A value stored first (e.g. by another thread) wins
+    assert cache.put("a", 2) == 1
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c"), len(cache)) == (1, 3, 2)
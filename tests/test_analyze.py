@@ -0,0 +1,134 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.analyze import parse_verdict, split_proposal_analyses
+from src.proposal_model import Proposal
+
+
+def snapshot_proposal(number):
+    return Proposal.from_snapshot({"id": f"0x{number:064x}", "title": f"Proposal {number}", "body": "",
+                                   "choices": ["For", "Against", "Abstain"]})
+
+
+def test_response_is_split_into_proposal_sections():
+    proposals = [snapshot_proposal(1), snapshot_proposal(2), snapshot_proposal(3)]
+    response = ("Here is my review.\n"
+                "Proposal 1: Approve - funds a needed audit.\n"
+                "- Proposal 2: Reject - the budget is not justified\n  and the timeline is unclear.\n"
+                "Proposal 7: Approve - not a listed proposal.\n"
+                "Project feedback: The contract address and ABI look fine.")
+    analyses = split_proposal_analyses(response, proposals)
+    assert analyses == {
+        proposals[0].id: "Approve - funds a needed audit.",
+        proposals[1].id: "Reject - the budget is not justified\n  and the timeline is unclear.",
+    }
+
+
+def test_response_without_sections_has_no_analyses():
+    assert split_proposal_analyses("The project looks fine.", [snapshot_proposal(1)]) == {}
+
+
+def test_numpy_is_not_imported_with_analyze():
+    code = "import sys, src.analyze; print('numpy' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout.strip() == "False"
+
+
+def test_verdict_is_read_from_the_start_of_an_analysis():
+    assert parse_verdict("Approve - funds a needed audit.") == "Approve"
+    assert parse_verdict("reject: the budget is not justified") == "Reject"
+    assert parse_verdict("Abstain.") == "Abstain"
+    assert parse_verdict("The proposal looks fine, approve it.") is None
+    assert parse_verdict(None) is None
+
+
+class FakeOpenAI:
+    """
+    Stands in for the openai module: answers a prompt with its reply in `replies` (or `default`), or raises the reply
+    if it is an error.
+    """
+
+    def __init__(self, replies, default=None):
+        self.replies = replies
+        self.default = default
+        self.sent = []
+        self.ChatCompletion = self
+
+    def create(self, messages, **kwargs):
+        self.sent.append([dict(message) for message in messages])
+        reply = self.replies.get(messages[-1]["content"], self.default)
+        if callable(reply):
+            reply = reply()
+        if isinstance(reply, Exception):
+            raise reply
+        return {"choices": [{"message": {"content": reply}}]}
+
+
+class FakeWeb3:
+    def is_connected(self):
+        return True
+
+
+@pytest.fixture
+def history(monkeypatch, fresh_state):
+    from src import analyze
+
+    monkeypatch.setattr(analyze, "conversation_history", [dict(analyze.conversation_history[0])])
+    return analyze.conversation_history
+
+
+def use_openai(monkeypatch, replies, default=None):
+    from src import analyze
+
+    fake = FakeOpenAI(replies, default)
+    monkeypatch.setattr(analyze, "get_openai", lambda: fake)
+    return fake
+
+
+def test_prompt_and_reply_are_added_together(history, monkeypatch):
+    from src.analyze import chat_with_openai_conversational
+
+    fake = use_openai(monkeypatch, {"hello": "Hi!"})
+    assert chat_with_openai_conversational("hello") == "Hi!"
+    assert fake.sent[0][-1] == {"role": "user", "content": "hello"}
+    assert history[1:] == [{"role": "user", "content": "hello"}, {"role": "assistant", "content": "Hi!"}]
+
+
+def test_failed_prompt_leaves_other_requests_history_alone(history, monkeypatch):
+    from openai import error as openai_error
+
+    from src.analyze import LLMCallFailed, chat_with_openai_conversational
+
+    def other_request_finishes_first():
+        # Another thread's request completes while this one is in flight
+        assert chat_with_openai_conversational("other") == "Other reply"
+        return openai_error.InvalidRequestError("bad request", None)
+
+    fake = use_openai(monkeypatch, {"other": "Other reply", "failing": other_request_finishes_first})
+    with pytest.raises(LLMCallFailed):
+        chat_with_openai_conversational("failing")
+    assert [message["content"] for message in history[1:]] == ["other", "Other reply"]
+    # Bad requests are not retried
+    assert len(fake.sent) == 2
+
+
+def test_llm_errors_are_not_sent_to_the_llm_again(history, monkeypatch):
+    from openai import error as openai_error
+
+    from src import analyze
+
+    fake = use_openai(monkeypatch, {}, default=openai_error.AuthenticationError("Incorrect API key provided."))
+    monkeypatch.setattr(analyze, "get_user_inputs", lambda: {
+        "contract_address": None, "abi": None, "infura_url": "http://127.0.0.1:1", "wallet_address": None})
+    monkeypatch.setattr(analyze, "available", lambda upstream: upstream != "rpc")
+    monkeypatch.setattr(analyze, "fetch_active_proposals", lambda: [])
+    monkeypatch.setattr(analyze, "get_web3", lambda url: FakeWeb3())
+    monkeypatch.setattr(analyze, "is_interactive", lambda: False)
+
+    response = analyze.analyze_proposals()
+    assert "The LLM call failed" in response
+    assert len(fake.sent) == 1
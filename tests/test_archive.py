@@ -0,0 +1,134 @@
+import sqlite3
+
+import pytest
+
+from src.archive import Archive, my_proposals_summary, record_verdict, record_vote
+from src.proposal_model import Proposal
+from src.tenants import Tenant, use_tenant
+
+WALLET = "0x00000000000000000000000000000000000000Aa"
+
+
+def proposal(number, title=None, body="", author=None, end=None, state="active"):
+    return Proposal(f"0x{number:064x}", title or f"Proposal {number}", body=body, choices=("For", "Against"),
+                    start=1000, end=end if end is not None else 2000 + number, space="standin.eth", author=author,
+                    state=state)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return Archive(str(tmp_path / "archive.db"))
+
+
+@pytest.fixture
+def archived(tmp_path, monkeypatch, fresh_state):
+    """
+    Turn archiving on for the module-level helpers.
+    """
+    monkeypatch.setenv("ARCHIVE_DB", str(tmp_path / "archive.db"))
+
+
+def test_schema(archive):
+    names = {row["name"] for row in archive._query("schema", "SELECT name FROM sqlite_master", ())}
+    assert {"proposals", "verdicts", "votes", "analyses", "proposals_fts", "proposals_by_proposer",
+            "votes_by_voter", "proposals_fts_update"} <= names
+    # Opening an existing archive keeps its rows
+    archive.record_proposals([proposal(1)])
+    assert len(Archive(archive.path).list_proposals()[0]) == 1
+
+
+def test_archiving_is_off_without_archive_db(monkeypatch, fresh_state):
+    from src.archive import get_archive
+
+    monkeypatch.setenv("ARCHIVE_DB", "")
+    assert get_archive() is None
+    record_verdict(proposal(1), "Approve")
+    assert my_proposals_summary(WALLET) is None
+
+
+def test_listings_are_paginated_by_keyset(archive):
+    # Proposals 0-9 share an end time, so the cursor has to break ties by pk
+    archive.record_proposals([proposal(number, end=5000 if number < 10 else None) for number in range(25)])
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = archive.list_proposals(limit=10, cursor=cursor)
+        seen.extend(row["id"] for row in rows)
+        pages += 1
+        if cursor is None:
+            break
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 25
+    assert seen[:10] == [f"0x{number:064x}" for number in range(9, -1, -1)]
+
+    rows, _ = archive.list_proposals(ends_before=2020, limit=200)
+    assert [row["id"] for row in rows] == [f"0x{number:064x}" for number in range(19, 9, -1)]
+
+
+def test_listings_are_filtered_and_scoped_to_the_tenant(archive):
+    archive.record_proposals([proposal(1, author=WALLET), proposal(2, state="closed")], tenant_id="dao")
+    archive.record_proposals([proposal(3, author=WALLET)], tenant_id="other")
+    assert [row["id"] for row in archive.list_proposals("dao", proposer=WALLET.upper())[0]] == [proposal(1).id]
+    assert [row["id"] for row in archive.list_proposals("dao", state="closed")[0]] == [proposal(2).id]
+    assert archive.list_proposals("", proposer=WALLET) == ([], None)
+
+
+def test_search(archive):
+    archive.record_proposals([proposal(1, title="Treasury diversification", body="Swap 10% of the treasury to USDC"),
+                              proposal(2, title="Grant for auditors", body="Fund a security audit")])
+    rows, cursor = archive.search("treasury usdc")
+    assert [row["id"] for row in rows] == [proposal(1).id]
+    assert "[USDC]" in rows[0]["snippet"]
+    assert cursor is None
+    # FTS syntax in user input is matched literally
+    assert archive.search('audit" OR "treasury') == ([], None)
+    assert archive.search("   ") == ([], None)
+
+    # The index follows updated titles
+    archive.record_proposals([proposal(2, title="Grant for translators", body="Fund translations")])
+    assert archive.search("audit") == ([], None)
+    assert [row["id"] for row in archive.search("translators")[0]] == [proposal(2).id]
+
+
+def test_votes_and_verdicts_are_listed_with_the_proposals(archive):
+    archive.record_verdict(proposal(1), "Approve", "Approve - funds a needed audit.")
+    archive.record_verdict(proposal(1), "Reject")
+    archive.record_vote(proposal(1).id, WALLET, "no", tx_hash="0xabc", source="snapshot")
+    archive.record_vote("7", WALLET, "yes")
+
+    assert archive.list_proposals()[0][0]["recommendation"] == "Reject"
+    votes, _ = archive.list_votes(WALLET.upper())
+    assert [(vote["id"], vote["choice"], vote["title"]) for vote in votes] == [
+        ("7", "yes", None), (proposal(1).id, "no", "Proposal 1")]
+    _, cursor = archive.list_votes(WALLET, limit=1)
+    assert archive.list_votes(WALLET, limit=1, cursor=cursor)[0] == votes[1:]
+
+
+def test_my_proposals_are_answered_from_the_archive(archived):
+    tenant = Tenant.from_dict({"id": "dao", "space": "standin.eth"})
+    with use_tenant(tenant):
+        record_verdict(proposal(1, author=WALLET), "Approve")
+        record_vote(proposal(2).id, WALLET, "yes")
+        summary = my_proposals_summary(WALLET)
+    assert summary == ("Here are your submitted proposals:\n"
+                       "- Proposal 1 (active, recommendation: Approve)\n"
+                       "Your recent votes:\n"
+                       f"- Proposal {proposal(2).id}: yes")
+    # Other tenants do not see them
+    assert my_proposals_summary(WALLET) is None
+
+
+def test_show_my_proposals_falls_back_to_the_client_list(archived, monkeypatch):
+    from src.archive import get_archive
+    from src.main import handle_openai_queries
+
+    record_verdict(proposal(1, author=WALLET), "Approve")
+    assert "Proposal 1" in handle_openai_queries("show my proposals", None, WALLET, ["Client proposal"])
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(get_archive(), "list_proposals", locked)
+    assert handle_openai_queries("show my proposals", None, WALLET, ["Client proposal"]) == \
+        "Here are your submitted proposals: ['Client proposal']"
+    assert handle_openai_queries("Show my proposals", None, WALLET, []) == \
+        "You have no submitted proposals at the moment."
@@ -0,0 +1,84 @@
+import pytest
+
+from benchmarks.standins import ChainStandin, FakeLLM, FakeSequencer, FakeSnapshot
+
+SIGNER_KEY = "0x" + "11" * 32
+REPLY = ("Proposal 1: Approve - funds a needed audit.\n"
+         "Proposal 2: Reject - the budget is not justified.\n"
+         "Project feedback: The third proposal needs more detail.")
+
+
+@pytest.fixture
+def upstreams(monkeypatch, fresh_state):
+    with FakeSnapshot(proposal_count=3) as snapshot, FakeLLM(reply=REPLY) as llm, FakeSequencer() as sequencer:
+        monkeypatch.setenv("SNAPSHOT_GRAPHQL_URL", f"{snapshot.url}/graphql")
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        monkeypatch.setenv("OPENAI_API_BASE", f"{llm.url}/v1")
+        monkeypatch.setenv("SNAPSHOT_SEQUENCER_URL", sequencer.url)
+        monkeypatch.setenv("SNAPSHOT_SIGNER_KEYS", SIGNER_KEY)
+        # The stand-in proposals are near-identical; analyze each of them
+        monkeypatch.setenv("SIMILARITY_REUSE_THRESHOLD", "1.1")
+        yield sequencer
+
+
+@pytest.fixture(scope="module")
+def chain():
+    with ChainStandin(proposal_count=2) as standin:
+        yield standin
+
+
+def onchain_job(chain, abi):
+    wallet = chain.accounts[1]
+    return {"job_id": f"governor:{wallet}", "entry": {"id": "governor", "abi": abi, "infura_url": chain.url,
+                                                       "contract_address": chain.governor_address,
+                                                       "wallet_address": wallet}}
+
+
+def job():
+    from eth_account import Account
+
+    wallet = Account.from_key(SIGNER_KEY).address
+    return {"job_id": f"dao:{wallet}", "entry": {"id": "dao", "space": "standin.eth", "wallet_address": wallet}}
+
+
+def test_votes_follow_each_proposals_verdict(upstreams):
+    from src.batch import run_job
+
+    result = run_job(job(), vote=True)
+    assert result["status"] == "ok"
+    assert list(result["verdicts"].values()) == ["Approve", "Reject", None]
+    # The proposal without a verdict is not voted on
+    assert [(vote["proposal_id"], vote["choice"]) for vote in result["votes"]] == [
+        (f"0x{0:064x}", 1), (f"0x{1:064x}", 2)]
+    assert upstreams.accepted == 2
+    assert result["vote_errors"] == []
+
+
+def test_failed_votes_are_recorded_without_failing_the_job(upstreams):
+    from src.batch import run_job
+
+    upstreams.inject_faults(error_rate=1.0, status=400)
+    result = run_job(job(), vote=True)
+    assert result["status"] == "ok"
+    assert result["votes"] == []
+    assert [error["proposal_id"] for error in result["vote_errors"]] == [f"0x{0:064x}", f"0x{1:064x}"]
+
+
+def test_onchain_proposals_are_voted_on_by_transaction(upstreams, chain):
+    from src.batch import run_job
+
+    result = run_job(onchain_job(chain, chain.governor_abi), vote=True)
+    assert result["status"] == "ok"
+    assert result["verdicts"] == {"0": "Approve", "1": "Reject"}
+    assert [(vote["proposal_id"], vote["choice"]) for vote in result["votes"]] == [("0", "yes"), ("1", "no")]
+
+
+def test_proposal_count_before_the_getters_fails_clearly(upstreams, chain):
+    from src.batch import run_job
+
+    # proposalCount is the first proposal function, so the contract answers with a number instead of proposals
+    abi = sorted(chain.governor_abi, key=lambda item: item["name"] != "proposalCount")
+    result = run_job(onchain_job(chain, abi), vote=True)
+    assert result["status"] == "error"
+    assert "Expected a list of proposals, got int 2" in result["error"]
+    assert result["votes"] == []
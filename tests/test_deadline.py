@@ -0,0 +1,128 @@
+import pytest
+
+from src import deadline as deadlines
+from src.deadline import DeadlineExceeded, check, deadline, remaining, upstream_timeout
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(deadlines.time, "monotonic", fake.monotonic)
+    monkeypatch.setenv("UPSTREAM_TIMEOUT", "30")
+    monkeypatch.setenv("REQUEST_DEADLINE", "60")
+    return fake
+
+
+def test_upstream_timeout_is_capped_without_a_deadline(clock):
+    assert remaining() is None
+    assert upstream_timeout() == 30
+    assert upstream_timeout(5) == 5
+    check()
+
+
+def test_upstream_timeout_is_the_time_left(clock):
+    with deadline(45):
+        assert upstream_timeout() == 30
+        clock.now += 40
+        assert upstream_timeout() == pytest.approx(5)
+        assert upstream_timeout(2) == 2
+
+
+def test_deadline_exceeded_once_the_deadline_passes(clock):
+    with deadline(10):
+        clock.now += 10
+        with pytest.raises(DeadlineExceeded):
+            upstream_timeout()
+        with pytest.raises(DeadlineExceeded, match="before the vote"):
+            check("the vote")
+    # The deadline ends with its block
+    assert upstream_timeout() == 30
+
+
+def test_nested_deadlines_never_extend_the_outer_one(clock):
+    with deadline(10):
+        with deadline(60):
+            assert remaining() == pytest.approx(10)
+        with deadline(3):
+            assert remaining() == pytest.approx(3)
+        assert remaining() == pytest.approx(10)
+
+
+@pytest.fixture
+def client(clock):
+    from flask import Flask, jsonify
+
+    app = Flask(__name__)
+    deadlines.register_flask(app)
+
+    @app.route("/remaining")
+    def remaining_route():
+        return jsonify({"remaining": remaining()})
+
+    @app.route("/slow")
+    def slow():
+        clock.now += 61
+        upstream_timeout()
+        return jsonify({"done": True})
+
+    return app.test_client()
+
+
+@pytest.mark.parametrize("header, expected", [(None, 60), ("5", 5), ("600", 60), ("soon", 60), ("-1", 0)])
+def test_request_timeout_header_only_shortens_the_deadline(client, header, expected):
+    headers = {deadlines.DEADLINE_HEADER: header} if header is not None else {}
+    response = client.get("/remaining", headers=headers)
+    assert response.get_json()["remaining"] == pytest.approx(expected)
+    # The deadline does not outlive the request
+    assert remaining() is None
+
+
+def test_late_flask_requests_get_a_504(client):
+    response = client.get("/slow")
+    assert response.status_code == 504
+    assert response.get_json() == {"error": "Request deadline exceeded"}
+
+
+def query_proposals(monkeypatch, handle, seconds):
+    """
+    Run on_user_query over proposals A, B and C, handled by `handle`, within a deadline of `seconds`.
+    """
+    from src import interaction
+
+    monkeypatch.setattr(interaction, "get_user_inputs", lambda: {
+        "infura_url": "http://rpc", "wallet_address": "0x1", "contract_address": "0x2", "abi": []})
+    monkeypatch.setattr(interaction, "connect_to_web3", lambda url: object())
+    monkeypatch.setattr(interaction, "fetch_active_proposals", lambda: ["A", "B", "C"])
+    monkeypatch.setattr(interaction, "handle_new_proposal", handle)
+    monkeypatch.setattr(interaction, "analyze_proposals", lambda: pytest.fail("analyzed after the deadline"))
+    with deadline(seconds):
+        return interaction.on_user_query("show the proposals")
+
+
+def test_on_user_query_returns_the_proposals_handled_in_time(clock, monkeypatch):
+    def handle(proposal, *args):
+        clock.now += 10
+        return f"Handled {proposal}"
+
+    response = query_proposals(monkeypatch, handle, seconds=15)
+    assert response.split("\n\n") == ["Handled A", "Handled B",
+                                      "Stopped after 2 of 3 proposals: the request deadline passed."]
+
+
+def test_on_user_query_keeps_results_when_an_upstream_call_runs_out_of_time(clock, monkeypatch):
+    def handle(proposal, *args):
+        clock.now += 10
+        if proposal == "B":
+            upstream_timeout()
+        return f"Handled {proposal}"
+
+    response = query_proposals(monkeypatch, handle, seconds=15)
+    assert response.split("\n\n") == ["Handled A", "The request deadline passed before all proposals were handled."]
@@ -0,0 +1,25 @@
+import json
+import logging
+
+from src.logging_config import JsonFormatter
+
+
+def format_record(msg, *args, max_field_chars=2000):
+    record = logging.LogRecord("dao_voting_agent", logging.INFO, __file__, 1, msg, args, None)
+    return json.loads(JsonFormatter(max_field_chars=max_field_chars).format(record))
+
+
+def test_numeric_placeholders_keep_their_arguments():
+    entry = format_record("Retrying %s %s in %.2fs (attempt %d)", "llm", "chat_completion", 0.1234, 2)
+    assert entry["message"] == "Retrying llm chat_completion in 0.12s (attempt 2)"
+    assert entry["event"] == "Retrying %s %s in %.2fs (attempt %d)"
+
+
+def test_long_arguments_are_capped():
+    entry = format_record("Response: %s after %.0fs", "x" * 50, 3.4, max_field_chars=10)
+    assert entry["message"] == "Response: xxxxxxxxxx...(+40 chars) after 3s"
+
+
+def test_mismatched_placeholder_still_logs():
+    entry = format_record("Balance %d ETH", "not a number")
+    assert "not a number" in entry["message"]
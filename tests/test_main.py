@@ -0,0 +1,10 @@
+import os
+import subprocess
+import sys
+
+
+def test_theoriq_is_not_imported_with_main():
+    code = "import sys, src.main; print('theoriq' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout.strip() == "False"
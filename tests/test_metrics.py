@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code, env):
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT,
+                          env=env).stdout
+
+
+def test_metrics_of_every_worker_are_reported(tmp_path):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    worker = ("from src.metrics import UPSTREAM_RETRIES, UPSTREAM_LATENCY, CIRCUIT_STATE\n"
+              "UPSTREAM_RETRIES.labels('llm').inc(int(sys.argv[1]))\n"
+              "UPSTREAM_LATENCY.labels('llm', 'chat').observe(0.2)\n"
+              "CIRCUIT_STATE.labels('llm').set(int(sys.argv[1]))\n"
+              "print(os.getpid())\n")
+    pids = [int(subprocess.run([sys.executable, "-c", "import os, sys\n" + worker, retries], capture_output=True,
+                               text=True, check=True, cwd=ROOT, env=env).stdout) for retries in ("2", "3")]
+    scrape = "from src.metrics import render_latest; print(render_latest().decode())"
+
+    lines = run(scrape, env).splitlines()
+    assert 'dao_agent_upstream_retries_total{upstream="llm"} 5.0' in lines
+    assert 'dao_agent_upstream_request_seconds_count{operation="chat",upstream="llm"} 2.0' in lines
+    assert 'dao_agent_upstream_request_seconds_bucket{le="0.25",operation="chat",upstream="llm"} 2.0' in lines
+    # The worst circuit state of the live workers
+    assert 'dao_agent_circuit_state{upstream="llm"} 3.0' in lines
+
+    # As gunicorn.conf.py does when a worker exits: its counters are kept, its gauges are no longer reported
+    from prometheus_client import multiprocess
+
+    for pid in pids:
+        multiprocess.mark_process_dead(pid, str(tmp_path))
+    lines = run(scrape, env).splitlines()
+    assert 'dao_agent_upstream_retries_total{upstream="llm"} 5.0' in lines
+    assert not any(line.startswith("dao_agent_circuit_state{") for line in lines)
+
+
+def test_metrics_of_a_single_process():
+    from src.metrics import REQUESTS_IN_FLIGHT, record_cache, render_latest
+
+    record_cache("abi", hit=True)
+    REQUESTS_IN_FLIGHT.inc()
+    try:
+        lines = render_latest().decode().splitlines()
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+    assert any(line.startswith('dao_agent_cache_requests_total{cache="abi",result="hit"}') for line in lines)
+    assert "dao_agent_http_requests_in_flight 1.0" in lines
+    assert any(line.startswith("dao_agent_log_queue_depth ") for line in lines)
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from src.proposal_model import COMPRESS_MIN_CHARS, Proposal, as_proposal
+
+SNAPSHOT_ENTRY = {"id": "0xabc", "title": "Fund the audit", "body": "Audit the governor contracts. " * 20,
+                  "choices": ["For", "Against", "Abstain"], "start": 1700000000, "end": 1700600000,
+                  "space": {"id": "uniswap"}, "author": "0x1", "state": "active"}
+GETTER_OUTPUTS = ("id", "proposer", "description", "startBlock", "endBlock", "forVotes")
+
+
+def test_snapshot_dicts_and_json_strings_round_trip():
+    proposal = as_proposal(SNAPSHOT_ENTRY)
+    expected = dict(SNAPSHOT_ENTRY, space="uniswap")
+    assert proposal.to_dict() == expected
+    assert as_proposal(json.dumps(SNAPSHOT_ENTRY)) == proposal
+    # A serialized proposal normalizes back to an equal one
+    assert as_proposal(json.dumps(proposal.to_dict())) == proposal
+    assert as_proposal(proposal) is proposal
+    assert proposal.source == "snapshot"
+
+
+def test_long_bodies_are_compressed():
+    proposal = as_proposal(SNAPSHOT_ENTRY)
+    assert isinstance(proposal._body, bytes)
+    assert len(proposal._body) < len(SNAPSHOT_ENTRY["body"])
+    assert proposal.body == SNAPSHOT_ENTRY["body"]
+
+    short = Proposal("1", "Short", body="x" * (COMPRESS_MIN_CHARS - 1))
+    assert short._body == "x" * (COMPRESS_MIN_CHARS - 1)
+    unicode_body = "Répartition du trésor ✓ " * 20
+    assert Proposal("2", "Unicode", body=unicode_body).body == unicode_body
+
+
+def test_onchain_tuples_with_output_names():
+    values = (7, "0x2", "Raise the quorum", 100, 200, 5)
+    proposal = as_proposal(values, field_names=GETTER_OUTPUTS)
+    assert proposal.to_dict() == {"id": 7, "title": "On-chain proposal 7", "body": "Raise the quorum", "choices": [],
+                                  "start": 100, "end": 200, "space": None, "author": "0x2", "state": None}
+    assert proposal.data == values
+    assert proposal.source == "onchain"
+    assert Proposal.from_onchain(list(values), index=7, field_names=GETTER_OUTPUTS) == proposal
+
+
+def test_onchain_tuples_without_output_names():
+    proposal = as_proposal([3, 12])
+    assert (proposal.id, proposal.data) == (3, (3, 12))
+    # Untitled on-chain proposals are named after their id
+    assert proposal.title == "On-chain proposal 3"
+    assert proposal.to_dict()["title"] == "On-chain proposal 3"
+    # The index stands in for a missing id when the getter names its outputs
+    assert Proposal.from_onchain((0, 12), index=4, field_names=("", "votes")).id == 4
+    assert Proposal.from_onchain(9, index=1).id == 9
+
+
+def test_dict_style_access():
+    proposal = as_proposal(SNAPSHOT_ENTRY)
+    assert proposal["title"] == "Fund the audit"
+    assert proposal["body"] == SNAPSHOT_ENTRY["body"]
+    assert proposal.get("space") == "uniswap"
+    assert proposal.get("missing", "default") == "default"
+    assert Proposal("1", "No body").get("body", "") == ""
+    assert list(proposal.keys()) == list(Proposal.fields)
+    assert dict((key, proposal[key]) for key in proposal.keys())["choices"] == ("For", "Against", "Abstain")
+    with pytest.raises(KeyError):
+        proposal["data"]
+
+
+def test_choice_sets_are_shared():
+    first = as_proposal(dict(SNAPSHOT_ENTRY, id="0x1"))
+    second = as_proposal(dict(SNAPSHOT_ENTRY, id="0x2"))
+    assert first.choices is second.choices
+
+
+def test_fingerprint_follows_content_not_state():
+    proposal = as_proposal(SNAPSHOT_ENTRY)
+    assert as_proposal(dict(SNAPSHOT_ENTRY, state="closed")).fingerprint() == proposal.fingerprint()
+    assert as_proposal(dict(SNAPSHOT_ENTRY, body="Changed")).fingerprint() != proposal.fingerprint()
+    assert as_proposal(dict(SNAPSHOT_ENTRY, end=1700700000)).fingerprint() != proposal.fingerprint()
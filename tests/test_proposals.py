@@ -0,0 +1,30 @@
+import pytest
+
+from benchmarks.standins import FakeSnapshot
+
+
+@pytest.fixture
+def snapshot(monkeypatch, fresh_state):
+    with FakeSnapshot(proposal_count=2) as standin:
+        monkeypatch.setenv("SNAPSHOT_GRAPHQL_URL", f"{standin.url}/graphql")
+        yield standin
+
+
+def test_repeated_fetches_are_served_from_the_cache(snapshot):
+    from src.proposals import fetch_snapshot_proposals
+
+    first = fetch_snapshot_proposals("standin.eth")
+    assert fetch_snapshot_proposals("standin.eth") == first
+    assert [proposal.title for proposal in first] == ["Standin proposal 0", "Standin proposal 1"]
+    assert snapshot.calls["graphql"] == 1
+
+
+def test_uncached_fetches_always_ask_snapshot(snapshot):
+    from src.proposals import fetch_snapshot_proposals
+
+    fetch_snapshot_proposals("standin.eth", use_cache=False)
+    fetch_snapshot_proposals("standin.eth", use_cache=False)
+    assert snapshot.calls["graphql"] == 2
+    # ... and still refresh the cache for everyone else
+    fetch_snapshot_proposals("standin.eth")
+    assert snapshot.calls["graphql"] == 2
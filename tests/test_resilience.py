@@ -0,0 +1,164 @@
+import pytest
+
+from benchmarks.standins import FakeRPC
+from src import resilience
+from src.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen, RetryBudget, UpstreamUnavailable
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(resilience.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(resilience.time, "sleep", fake.sleep)
+    return fake
+
+
+@pytest.fixture(autouse=True)
+def breaker_settings(monkeypatch, fresh_state):
+    monkeypatch.setenv("UPSTREAM_MAX_RETRIES", "2")
+    monkeypatch.setenv("CIRCUIT_FAILURE_THRESHOLD", "5")
+
+
+def failing(calls, error=ConnectionError("connection refused")):
+    def function():
+        calls.append(1)
+        raise error
+    return function
+
+
+def test_breaker_opens_probes_and_closes(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30, half_open_probes=1)
+    for _ in range(2):
+        assert breaker.acquire() is False
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.acquire()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.available()
+    with pytest.raises(CircuitOpen) as raised:
+        breaker.acquire()
+    assert raised.value.retry_after == 30
+
+    clock.now += 29
+    assert breaker.retry_after() == pytest.approx(1)
+    with pytest.raises(CircuitOpen):
+        breaker.acquire()
+
+    clock.now += 1
+    assert breaker.available()
+    assert breaker.acquire() is True
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(CircuitOpen):
+        breaker.acquire()
+    breaker.record_success(probe=True)
+    assert breaker.state == CLOSED
+    assert breaker.acquire() is False
+
+
+def test_failed_probe_reopens_and_released_probe_is_given_back(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10)
+    breaker.acquire()
+    breaker.record_failure()
+    clock.now += 10
+    probe = breaker.acquire()
+    breaker.release(probe)
+    probe = breaker.acquire()
+    assert probe is True
+    breaker.record_failure(probe)
+    assert breaker.state == OPEN
+    assert breaker.retry_after() == 10
+
+
+def test_successes_reset_the_failure_count(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_retry_budget_accounting():
+    budget = RetryBudget(ratio=0.5, reserve=2)
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+    for _ in range(10):
+        budget.deposit()
+    assert budget.balance == 2
+
+
+def test_transient_failures_are_retried_then_reported(clock):
+    calls = []
+    with pytest.raises(UpstreamUnavailable):
+        resilience.call("test", "op", failing(calls))
+    assert len(calls) == 3
+    assert len(clock.sleeps) == 2
+    # Every attempt counted against the breaker
+    assert resilience.get_breaker("test")._failures == 3
+
+
+def test_retries_stop_when_the_budget_is_spent(clock, monkeypatch):
+    monkeypatch.setenv("RETRY_BUDGET_RESERVE", "1")
+    calls = []
+    with pytest.raises(UpstreamUnavailable, match="retry budget spent"):
+        resilience.call("test", "op", failing(calls))
+    assert len(calls) == 2
+    assert resilience.get_retry_budget("test").balance < 1
+
+
+def test_non_idempotent_calls_are_never_retried(clock):
+    calls = []
+    with pytest.raises(UpstreamUnavailable):
+        resilience.call("test", "op", failing(calls), idempotent=False)
+    assert len(calls) == 1
+    assert clock.sleeps == []
+
+
+def test_other_errors_are_raised_unchanged_and_do_not_count(clock):
+    calls = []
+    with pytest.raises(ValueError):
+        resilience.call("test", "op", failing(calls, ValueError("reverted")))
+    assert len(calls) == 1
+    assert resilience.get_breaker("test")._failures == 0
+
+
+def test_open_breaker_fails_fast_without_calling(clock, monkeypatch):
+    monkeypatch.setenv("CIRCUIT_FAILURE_THRESHOLD", "3")
+    calls = []
+    with pytest.raises(UpstreamUnavailable):
+        resilience.call("test", "op", failing(calls))
+    with pytest.raises(CircuitOpen):
+        resilience.call("test", "op", failing(calls))
+    assert len(calls) == 3
+
+
+def test_vote_broadcasts_are_never_retried(clock):
+    from src.web3_integration import new_web3
+
+    with FakeRPC() as rpc:
+        rpc.inject_faults(error_rate=1.0, status=503)
+        provider = new_web3(rpc.url).provider
+        with pytest.raises(UpstreamUnavailable):
+            provider.make_request("eth_sendRawTransaction", ["0x00"])
+        assert rpc.calls["injected_error"] == 1
+        with pytest.raises(UpstreamUnavailable):
+            provider.make_request("eth_blockNumber", [])
+        assert rpc.calls["injected_error"] == 1 + 3
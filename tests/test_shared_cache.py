@@ -0,0 +1,151 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src import shared_cache
+from src.shared_cache import LocalCache, SharedCache, get_cache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_SIZE = 4096
+VALUE = "x" * 200
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(shared_cache.time, "time", fake.time)
+    return fake
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SharedCache(str(tmp_path / "cache"), data_size=DATA_SIZE, entries=1024)
+
+
+def fill(cache, until):
+    """
+    Write filler entries until the ring's head passes `until`.
+    """
+    count = 0
+    while cache._head() <= until:
+        cache.set(f"filler-{count}", VALUE, 60)
+        count += 1
+
+
+@pytest.mark.parametrize("make_cache", [lambda path: SharedCache(path, data_size=DATA_SIZE), lambda path: LocalCache()])
+def test_entries_expire_after_their_ttl(tmp_path, clock, make_cache):
+    cache = make_cache(str(tmp_path / "cache"))
+    assert cache.set("proposals:uniswap", [{"id": "0x1"}], 30)
+    assert cache.set("balance:0xabc", 1.5, 10)
+    assert not cache.set("analysis:disabled", "text", 0)
+
+    clock.now += 10.5
+    assert cache.get("proposals:uniswap") == [{"id": "0x1"}]
+    assert cache.get("balance:0xabc") is None
+    assert cache.get("analysis:disabled") is None
+    clock.now += 20
+    assert cache.get("proposals:uniswap") is None
+
+
+def test_values_round_trip_and_are_deleted(cache):
+    cache.set("a", {"nested": [1, 2.5, None]}, 60)
+    cache.set("a", {"nested": []}, 60)
+    assert cache.get("a") == {"nested": []}
+    cache.delete("a")
+    assert cache.get("a") is None
+    cache.set("b", 1, 60)
+    cache.clear()
+    assert cache.get("b") is None
+    assert cache._head() == 0
+
+
+def test_oldest_entries_are_overwritten_when_the_ring_wraps_around(cache):
+    for number in range(60):
+        assert cache.set(f"key-{number}", f"{number}:{VALUE}", 60)
+    assert cache._head() > 3 * DATA_SIZE
+    assert cache.get("key-0") is None
+    assert cache.get("key-40") is None
+    # The newest entries fit in the ring
+    assert [cache.get(f"key-{number}") for number in range(50, 60)] == [f"{number}:{VALUE}" for number in
+                                                                         range(50, 60)]
+
+
+def test_entries_read_before_they_are_overwritten_move_to_the_front(cache):
+    cache.set("kept", "read often", 60)
+    cache.set("dropped", "never read", 60)
+    fill(cache, until=DATA_SIZE * 3 // 4)
+    # Still intact, but in the oldest quarter of the ring: reading it copies it to the head
+    assert cache.get("kept") == "read often"
+    # Past the original positions of both entries, but not yet past the copy
+    fill(cache, until=DATA_SIZE + DATA_SIZE // 4)
+    assert cache.get("kept") == "read often"
+    assert cache.get("dropped") is None
+
+
+def test_oversized_values_are_not_cached(cache):
+    assert not cache.set("large", "x" * (DATA_SIZE // 8), 60)
+    assert cache.get("large") is None
+    assert cache._head() == 0
+
+
+def test_processes_share_the_file(cache):
+    code = ("import sys\n"
+            "from src.shared_cache import SharedCache\n"
+            "cache = SharedCache(sys.argv[1], data_size=int(sys.argv[2]), entries=1024)\n"
+            "print(cache.get('from parent'))\n"
+            "cache.set('from child', {'pid': 'child'}, 60)\n")
+    cache.set("from parent", [1, 2, 3], 60)
+    result = subprocess.run([sys.executable, "-c", code, cache.path, str(DATA_SIZE)], capture_output=True, text=True,
+                            check=True, cwd=ROOT)
+    assert result.stdout.strip() == "[1, 2, 3]"
+    assert cache.get("from child") == {"pid": "child"}
+
+
+def _set_in_child(cache):
+    cache.set("from fork", "child value", 60)
+
+
+def test_forked_workers_share_the_parents_cache(cache):
+    child = multiprocessing.get_context("fork").Process(target=_set_in_child, args=(cache,))
+    child.start()
+    child.join(10)
+    assert child.exitcode == 0
+    assert cache.get("from fork") == "child value"
+
+
+def test_files_other_users_can_read_are_refused(tmp_path):
+    path = tmp_path / "cache"
+    path.write_bytes(b"")
+    path.chmod(0o644)
+    with pytest.raises(PermissionError):
+        SharedCache(str(path), data_size=DATA_SIZE)
+
+
+def test_local_cache_without_a_shared_cache_path(monkeypatch):
+    monkeypatch.setenv("SHARED_CACHE_PATH", "")
+    get_cache.cache_clear()
+    try:
+        assert isinstance(get_cache(), LocalCache)
+    finally:
+        get_cache.cache_clear()
+
+
+def test_local_cache_evicts_the_least_recently_used_entry():
+    cache = LocalCache(maxsize=2)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    assert cache.get("a") == 1
+    cache.set("c", 3, 60)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
@@ -0,0 +1,129 @@
+import pytest
+
+from benchmarks.standins import FakeLLM, FakeRPC, FakeSequencer
+from src.snapshot_voting import (SnapshotVote, VoteRejected, cast_snapshot_vote, cast_snapshot_votes, choice_number,
+                                 sign_votes, signing_key)
+
+SIGNER_KEY = "0x" + "11" * 32
+OTHER_KEY = "0x" + "22" * 32
+PROPOSAL_ID = "0x" + "ab" * 32
+
+
+@pytest.fixture
+def signer(monkeypatch, fresh_state):
+    from eth_account import Account
+
+    monkeypatch.setenv("SNAPSHOT_SIGNER_KEYS", SIGNER_KEY)
+    return Account.from_key(SIGNER_KEY).address
+
+
+@pytest.fixture
+def sequencer(monkeypatch, fresh_state):
+    with FakeSequencer() as standin:
+        monkeypatch.setenv("SNAPSHOT_SEQUENCER_URL", standin.url)
+        yield standin
+
+
+def eth_account_signature(vote, key):
+    from eth_account import Account
+    from eth_account.messages import encode_typed_data
+
+    data = vote.typed_data()
+    domain_type = [{"name": "name", "type": "string"}, {"name": "version", "type": "string"}]
+    return Account.sign_message(encode_typed_data(full_message={
+        "types": dict(data["types"], EIP712Domain=domain_type), "primaryType": "Vote", "domain": data["domain"],
+        "message": data["message"]}), key).signature.hex().removeprefix("0x")
+
+
+@pytest.mark.parametrize("proposal, choice", [
+    (PROPOSAL_ID, 1), (PROPOSAL_ID, [1, 3]), ("QmWbpCtwdLzxuLKnMW4Vv4MPFd2pdPX71YBKPasfZxqLUS", 2)])
+def test_signatures_match_eth_account(signer, proposal, choice):
+    vote = SnapshotVote(signer, "standin.eth", proposal, choice, reason="looks good", timestamp=1700000000)
+    assert sign_votes([vote])[0].removeprefix("0x") == eth_account_signature(vote, SIGNER_KEY)
+
+
+def test_choice_mapping():
+    assert choice_number("yes", ("For", "Against", "Abstain")) == 1
+    assert choice_number("no", ("Yae", "Nay")) == 2
+    assert choice_number("abstain", ("For", "Against", "Abstain")) == 3
+    assert choice_number("Option B", ("Option A", "Option B")) == 2
+    assert choice_number("2", ("Option A", "Option B")) == 2
+    assert choice_number("no") == 2
+    with pytest.raises(ValueError):
+        choice_number("abstain", ("For", "Against"))
+    with pytest.raises(ValueError):
+        choice_number(3, ("For", "Against"))
+    with pytest.raises(ValueError):
+        choice_number(0)
+
+
+def test_addresses_without_a_key_cannot_sign(signer):
+    from eth_account import Account
+
+    with pytest.raises(ValueError, match="SNAPSHOT_SIGNER_KEYS"):
+        signing_key(Account.from_key(OTHER_KEY).address)
+
+
+def test_votes_are_accepted_by_the_sequencer(signer, sequencer):
+    receipt = cast_snapshot_vote(signer, "standin.eth", PROPOSAL_ID, "no", ("For", "Against", "Abstain"))
+    assert receipt == f"0x{1:064x}"
+    assert sequencer.votes == {(signer.lower(), "standin.eth", PROPOSAL_ID): 2}
+
+
+def test_votes_signed_by_another_key_are_refused(signer, sequencer):
+    from eth_keys import keys
+
+    vote = SnapshotVote(signer, "standin.eth", PROPOSAL_ID, 1)
+    wrong_key = keys.PrivateKey(bytes.fromhex(OTHER_KEY[2:]))
+    [result] = cast_snapshot_votes([vote], keys={signer: wrong_key})
+    assert isinstance(result["error"], VoteRejected)
+    assert sequencer.accepted == 0
+
+
+def test_sequencer_outage_is_reported_per_vote(signer, sequencer, monkeypatch):
+    from src.resilience import UpstreamUnavailable
+
+    monkeypatch.setenv("RETRY_BACKOFF_BASE", "0")
+    sequencer.inject_faults(error_rate=1.0, status=503)
+    results = cast_snapshot_votes([SnapshotVote(signer, "standin.eth", PROPOSAL_ID, 1)])
+    assert isinstance(results[0]["error"], UpstreamUnavailable)
+    with pytest.raises(UpstreamUnavailable):
+        cast_snapshot_vote(signer, "standin.eth", PROPOSAL_ID, "yes")
+
+
+@pytest.fixture
+def handled(signer, sequencer, monkeypatch):
+    """
+    Run agent.handle_new_proposal on a Snapshot proposal with the given LLM reply.
+    """
+    from src.agent import handle_new_proposal
+    from src.shared_cache import get_cache
+    from src.web3_integration import new_web3
+
+    with FakeRPC() as rpc, FakeLLM() as llm:
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        monkeypatch.setenv("OPENAI_API_BASE", f"{llm.url}/v1")
+        monkeypatch.setenv("SIMILARITY_REUSE_THRESHOLD", "1.1")
+        proposal = {"id": PROPOSAL_ID, "title": "Fund the audit", "body": "", "space": "standin.eth",
+                    "choices": ["For", "Against", "Abstain"]}
+
+        def handle(reply):
+            llm.reply = reply
+            get_cache().clear()
+            return handle_new_proposal(proposal, new_web3(rpc.url), signer, None, None)
+
+        yield handle
+
+
+def test_automatic_snapshot_votes_are_opt_in(handled, sequencer, monkeypatch):
+    handled("Proposal 1: Approve - funds a needed audit.")
+    assert sequencer.accepted == 0
+    monkeypatch.setenv("SNAPSHOT_AUTO_VOTE", "true")
+    handled("Proposal 1: Reject - the budget is not justified.")
+    assert list(sequencer.votes.values()) == [2]
+
+
+def test_no_automatic_vote_without_a_verdict(handled, sequencer, monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_AUTO_VOTE", "true")
+    handled("The project looks fine.")
+    assert sequencer.accepted == 0
@@ -0,0 +1,136 @@
+import json
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from src.tenants import (Tenant, TenantRegistry, current_tenant, get_registry, is_interactive, load_entries,
+                         theoriq_sender, use_tenant)
+
+ABI = [{"type": "function", "name": "proposalCount", "inputs": [], "outputs": [{"name": "", "type": "uint256"}],
+        "stateMutability": "view"}]
+ENTRIES = [
+    {"id": "uniswap", "api_key": "key-1", "agent_id": "0xAbC1", "space": "uniswap", "abi": ABI,
+     "contract_address": "0x01", "infura_url": "http://rpc-1", "wallet_address": "0xw1"},
+    {"id": "aave", "api_keys": ["key-2", "key-3"], "agent_ids": ["0xdef2"], "space": "aave"},
+]
+
+
+def write_tenants(path, extension):
+    path = path / f"tenants{extension}"
+    if extension == ".json":
+        path.write_text(json.dumps({"tenants": ENTRIES}))
+    elif extension == ".yaml":
+        import yaml
+
+        path.write_text(yaml.safe_dump(ENTRIES))
+    else:
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE tenants (id, api_key, agent_id, space, abi, contract_address, infura_url, "
+                           "wallet_address)")
+        connection.executemany("INSERT INTO tenants VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [
+            (entry["id"], entry.get("api_key", entry.get("api_keys", [None])[0]),
+             entry.get("agent_id", entry.get("agent_ids", [None])[0]), entry["space"],
+             json.dumps(entry["abi"]) if "abi" in entry else None, entry.get("contract_address"),
+             entry.get("infura_url"), entry.get("wallet_address"))
+            for entry in ENTRIES])
+        connection.commit()
+        connection.close()
+    return str(path)
+
+
+@pytest.mark.parametrize("extension", [".json", ".yaml", ".sqlite"])
+def test_registry_is_loaded_from_file(tmp_path, monkeypatch, fresh_state, extension):
+    monkeypatch.setenv("TENANTS_FILE", write_tenants(tmp_path, extension))
+    registry = get_registry()
+    assert len(registry) == 2
+    assert get_registry() is registry
+
+    uniswap = registry.tenants["uniswap"]
+    assert uniswap.abi == ABI
+    assert uniswap.user_inputs == {"space": "uniswap", "abi": ABI, "contract_address": "0x01",
+                                   "infura_url": "http://rpc-1", "wallet_address": "0xw1"}
+    assert registry.by_api_key("key-1") is uniswap
+    assert registry.by_api_key("key-2") is registry.tenants["aave"]
+
+
+def test_registry_is_empty_without_tenants_file(monkeypatch, fresh_state):
+    monkeypatch.setenv("TENANTS_FILE", "")
+    assert len(get_registry()) == 0
+    assert get_registry().by_agent_id("0xabc1") is None
+
+
+def test_lookups():
+    registry = TenantRegistry(Tenant.from_dict(entry) for entry in ENTRIES)
+    uniswap, aave = registry.tenants["uniswap"], registry.tenants["aave"]
+    assert registry.by_api_key("key-3") is aave
+    assert registry.by_api_key("unknown") is None
+    assert registry.by_api_key(None) is None
+    # Agent ids are addresses, matched case-insensitively
+    assert registry.by_agent_id("0xabc1") is uniswap
+    assert registry.by_agent_id("0xDEF2") is aave
+    assert registry.by_agent_id("0x999") is None
+    assert registry.by_agent_id(None) is None
+
+
+def test_duplicate_keys_are_rejected():
+    with pytest.raises(ValueError, match="Duplicate tenant id"):
+        TenantRegistry([Tenant.from_dict(ENTRIES[0]), Tenant.from_dict(ENTRIES[0])])
+    with pytest.raises(ValueError, match="already assigned"):
+        TenantRegistry([Tenant.from_dict(ENTRIES[0]), Tenant.from_dict({"id": "copy", "api_key": "key-1"})])
+
+
+def test_sqlite_abi_is_parsed(tmp_path):
+    tenant = Tenant.from_dict(load_entries(write_tenants(tmp_path, ".sqlite"))[0])
+    assert tenant.abi == ABI
+
+
+def test_theoriq_sender_is_read_from_the_request_facts():
+    facts = SimpleNamespace(from_addr="0xAbC1", req_id="request-1")
+    context = SimpleNamespace(_request_biscuit=SimpleNamespace(request_facts=facts))
+    registry = TenantRegistry(Tenant.from_dict(entry) for entry in ENTRIES)
+    assert theoriq_sender(context) == "0xAbC1"
+    assert registry.by_agent_id(theoriq_sender(context)) is registry.tenants["uniswap"]
+
+
+def test_requests_are_not_interactive():
+    tenant = Tenant.from_dict(ENTRIES[0])
+    assert current_tenant() is None
+    assert is_interactive()
+    with use_tenant(tenant):
+        assert current_tenant() is tenant
+        assert not is_interactive()
+        with use_tenant(None, interactive=True):
+            assert current_tenant() is None
+            assert is_interactive()
+        assert current_tenant() is tenant
+    assert current_tenant() is None
+    assert is_interactive()
+
+
+def test_each_tenant_has_its_own_conversation_history(monkeypatch, fresh_state):
+    from src import analyze
+
+    class FakeOpenAI:
+        def __init__(self):
+            self.ChatCompletion = self
+
+        def create(self, messages, **kwargs):
+            return {"choices": [{"message": {"content": f"{len(messages)} messages"}}]}
+
+    monkeypatch.setattr(analyze, "get_openai", FakeOpenAI)
+    monkeypatch.setattr(analyze, "conversation_history", [dict(analyze.conversation_history[0])])
+    monkeypatch.setattr(analyze, "tenant_conversation_histories", {})
+    uniswap, aave = Tenant.from_dict(ENTRIES[0]), Tenant.from_dict(ENTRIES[1])
+
+    with use_tenant(uniswap):
+        assert analyze.chat_with_openai_conversational("first") == "2 messages"
+        assert analyze.chat_with_openai_conversational("second") == "4 messages"
+    with use_tenant(aave):
+        assert analyze.chat_with_openai_conversational("first") == "2 messages"
+
+    histories = analyze.tenant_conversation_histories
+    assert [message["content"] for message in histories["uniswap"][1:]] == [
+        "first", "2 messages", "second", "4 messages"]
+    assert [message["content"] for message in histories["aave"][1:]] == ["first", "2 messages"]
+    assert len(analyze.conversation_history) == 1
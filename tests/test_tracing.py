@@ -0,0 +1,155 @@
+import json
+
+import pytest
+
+from src import tracing
+from src.tracing import NOOP_SPAN, JsonFileExporter, OtlpJsonExporter, collapse, current_trace_id, span, traced
+
+
+@pytest.fixture
+def exported(tmp_path, monkeypatch, fresh_state):
+    """
+    Trace every root span and collect the finished traces instead of exporting them in the background.
+    """
+    monkeypatch.setenv("TRACE_EXPORTER", "json")
+    monkeypatch.setenv("TRACE_FILE", str(tmp_path / "traces.jsonl"))
+    monkeypatch.setenv("TRACE_SAMPLE_RATE", "1")
+    traces = []
+    monkeypatch.setattr(tracing, "_export_async", traces.append)
+    return traces
+
+
+@traced()
+def fetch_active_proposals():
+    with span("rpc eth_call", upstream="rpc", retried=False):
+        return current_trace_id()
+
+
+def test_nested_spans_form_one_trace(exported):
+    with span("POST /user_query", route="/user_query") as root:
+        trace_id = current_trace_id()
+        assert fetch_active_proposals() == trace_id
+        assert current_trace_id() == trace_id
+    assert current_trace_id() is None
+
+    [trace] = exported
+    spans = {s.name: s for s in trace.spans}
+    # Children finish (and are recorded) before their parents
+    assert [s.name for s in trace.spans] == ["rpc eth_call", "fetch_active_proposals", "POST /user_query"]
+    assert spans["POST /user_query"] is root and root.parent_id is None
+    assert spans["fetch_active_proposals"].parent_id == root.span_id
+    assert spans["rpc eth_call"].parent_id == spans["fetch_active_proposals"].span_id
+    assert {f"{s.trace.trace_id:032x}" for s in trace.spans} == {trace_id}
+    assert all(s.end_ns >= s.start_ns for s in trace.spans)
+
+
+def test_sampling_is_decided_once_at_the_root(exported, monkeypatch):
+    monkeypatch.setenv("TRACE_SAMPLE_RATE", "0.5")
+    draws = iter([0.7, 0.3])
+    calls = []
+
+    def random():
+        calls.append(1)
+        return next(draws)
+
+    monkeypatch.setattr(tracing.random, "random", random)
+    with span("unsampled") as root:
+        with span("child") as child:
+            assert current_trace_id() is None
+    assert root is NOOP_SPAN and child is NOOP_SPAN
+    # Children of an unsampled root draw no random number
+    assert len(calls) == 1
+    assert exported == []
+
+    with span("sampled"):
+        with span("child"):
+            pass
+    assert len(calls) == 2
+    assert [s.name for s in exported[0].spans] == ["child", "sampled"]
+
+
+def test_tracing_is_off_without_an_exporter(exported, monkeypatch):
+    monkeypatch.delenv("TRACE_EXPORTER")
+    with span("request") as root:
+        assert root is NOOP_SPAN
+    assert exported == []
+
+
+def test_errors_are_recorded_on_the_span(exported):
+    with pytest.raises(ValueError):
+        with span("request"):
+            with span("llm chat"):
+                raise ValueError("bad request")
+    assert [s.error for s in exported[0].spans] == ["ValueError: bad request"] * 2
+
+
+def finished_trace(exported):
+    with span("request", route="/user_query", attempt=2, cached=False, ratio=0.5, note=None):
+        with span("llm chat", text="x" * 300) as child:
+            child.error = "RuntimeError: timeout"
+    return exported[0]
+
+
+def test_json_export(exported, tmp_path):
+    trace = finished_trace(exported)
+    JsonFileExporter(str(tmp_path / "traces.jsonl")).export([trace])
+    [record] = [json.loads(line) for line in (tmp_path / "traces.jsonl").read_text().splitlines()]
+    child, root = record["spans"]
+    assert record["trace_id"] == root["trace_id"] == child["trace_id"]
+    assert child["parent_id"] == root["span_id"] and root["parent_id"] is None
+    assert root["attributes"] == {"route": "/user_query", "attempt": 2, "cached": False, "ratio": 0.5, "note": None}
+    # Long attribute values are truncated
+    assert child["attributes"]["text"] == "x" * 256 + "..."
+
+
+def test_otlp_export_shape(exported):
+    trace = finished_trace(exported)
+    payload = OtlpJsonExporter().payload([trace])
+    [resource] = payload["resourceSpans"]
+    assert resource["resource"]["attributes"] == [{"key": "service.name",
+                                                   "value": {"stringValue": "dao-voting-agent"}}]
+    [scope] = resource["scopeSpans"]
+    assert scope["scope"] == {"name": "src.tracing"}
+    child, root = scope["spans"]
+
+    assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+    assert child["traceId"] == root["traceId"] and child["parentSpanId"] == root["spanId"]
+    assert "parentSpanId" not in root
+    assert root["kind"] == 1
+    assert int(root["endTimeUnixNano"]) >= int(root["startTimeUnixNano"])
+    assert root["attributes"] == [
+        {"key": "route", "value": {"stringValue": "/user_query"}},
+        {"key": "attempt", "value": {"intValue": "2"}},
+        {"key": "cached", "value": {"boolValue": False}},
+        {"key": "ratio", "value": {"doubleValue": 0.5}},
+        {"key": "note", "value": {"stringValue": ""}},
+    ]
+    assert root["status"] == {"code": 1}
+    assert child["status"] == {"code": 2, "message": "RuntimeError: timeout"}
+
+
+def json_span(span_id, parent_id, name, duration_ms):
+    return {"span_id": span_id, "parent_id": parent_id, "name": name, "duration_ms": duration_ms}
+
+
+def test_collapse_folds_self_time_per_stack():
+    traces = {
+        "slow": [json_span("a", None, "POST /user_query", 100.0), json_span("b", "a", "fetch", 60.0),
+                 json_span("c", "b", "rpc", 20.0), json_span("d", "a", "rpc", 10.0)],
+        "fast": [json_span("e", None, "POST /user_query", 5.0)],
+    }
+    assert collapse(traces) == {"POST /user_query": 35000, "POST /user_query;fetch": 40000,
+                                "POST /user_query;fetch;rpc": 20000, "POST /user_query;rpc": 10000}
+    assert collapse(traces, min_ms=50) == {"POST /user_query": 30000, "POST /user_query;fetch": 40000,
+                                           "POST /user_query;fetch;rpc": 20000, "POST /user_query;rpc": 10000}
+
+
+def test_collapse_reads_json_and_otlp_exports(exported, tmp_path):
+    trace = finished_trace(exported)
+    JsonFileExporter(str(tmp_path / "traces.jsonl")).export([trace])
+    OtlpJsonExporter(path=str(tmp_path / "traces.otlp.jsonl")).export([trace])
+    from_json = collapse(tracing._load_spans(str(tmp_path / "traces.jsonl")))
+    from_otlp = collapse(tracing._load_spans(str(tmp_path / "traces.otlp.jsonl")))
+    assert set(from_json) == set(from_otlp) == {"request", "request;llm chat"}
+    # JSON exports round durations to the microsecond
+    assert all(abs(from_json[stack] - from_otlp[stack]) <= 1 for stack in from_json)
@@ -0,0 +1,88 @@
+import pytest
+
+from benchmarks.standins import ChainStandin
+from src.watcher import ProposalState, ProposalWatcher
+
+
+@pytest.fixture
+def chain():
+    with ChainStandin(proposal_count=3) as standin:
+        yield standin
+
+
+def watch(chain, abi=None):
+    handled = []
+
+    def handler(proposal, web3, wallet_address, contract_address, abi):
+        handled.append(proposal.id)
+
+    user_inputs = {"abi": abi or chain.governor_abi, "contract_address": chain.governor_address,
+                   "infura_url": chain.url, "wallet_address": chain.accounts[1]}
+    watcher = ProposalWatcher(user_inputs, handler=handler, state=ProposalState())
+    watcher._connect()
+    return watcher, handled
+
+
+def eth_calls_during(chain, action):
+    before = dict(chain.calls)
+    result = action()
+    return result, chain.calls.get("eth_call", 0) - before.get("eth_call", 0)
+
+
+def test_blocks_without_new_proposals_only_read_the_count(chain, fresh_state):
+    watcher, handled = watch(chain)
+    assert watcher.scan_onchain()
+    assert handled == [0, 1, 2]
+
+    chain.mine_blocks(3)
+    changed, eth_calls = eth_calls_during(chain, watcher.scan_onchain)
+    assert not changed
+    assert eth_calls == 1
+    assert handled == [0, 1, 2]
+
+
+def test_only_new_proposals_are_read(chain, fresh_state):
+    watcher, handled = watch(chain)
+    watcher.scan_onchain()
+
+    chain.add_proposals(2)
+    changed, eth_calls = eth_calls_during(chain, watcher.scan_onchain)
+    assert changed
+    # proposalCount, then proposals(3) and proposals(4)
+    assert eth_calls == 3
+    assert handled == [0, 1, 2, 3, 4]
+
+
+def test_failed_proposals_are_read_again(chain, fresh_state):
+    watcher, handled = watch(chain)
+    watcher.scan_onchain()
+    failures = {3}
+
+    def flaky(proposal, *args):
+        if proposal.id in failures:
+            failures.discard(proposal.id)
+            raise RuntimeError("LLM unavailable")
+        handled.append(proposal.id)
+
+    watcher.handler = flaky
+    chain.add_proposals(2)
+    watcher.scan_onchain()
+    assert handled == [0, 1, 2, 4]
+    # Proposal 3 is retried from the count on the next block; proposal 4 was already handled
+    changed, eth_calls = eth_calls_during(chain, watcher.scan_onchain)
+    assert changed
+    assert eth_calls == 3
+    assert handled == [0, 1, 2, 4, 3]
+    assert eth_calls_during(chain, watcher.scan_onchain) == (False, 1)
+
+
+def test_abi_with_events_rereads_every_proposal(chain, fresh_state):
+    event = {"type": "event", "name": "ProposalCreated", "anonymous": False,
+             "inputs": [{"name": "proposalId", "type": "uint256", "indexed": False}]}
+    watcher, handled = watch(chain, abi=chain.governor_abi + [event])
+    watcher.scan_onchain()
+
+    changed, eth_calls = eth_calls_during(chain, watcher.scan_onchain)
+    assert not changed
+    # Only governor logs trigger a scan in this mode, so it reads every proposal
+    assert eth_calls == 4